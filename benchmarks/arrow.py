@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+Compare exporting a database to pandas and to Arrow/Parquet.
+
+Usage::
+
+    python benchmarks/arrow.py --songs 1000000
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import tempfile
+
+import mpd_pydb
+from parse import _best, _synthetic_db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--songs", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    filename = _synthetic_db(args.songs)
+    parquet = os.path.join(tempfile.gettempdir(),
+                           "mpd_pydb-bench-%d.parquet" % args.songs)
+    db = mpd_pydb.Database.read_file(filename, columnar=True)
+
+    print("to_dataframe: %.2fs" % _best(db.to_dataframe, args.repeat))
+    print("to_arrow: %.2fs" % _best(db.to_arrow, args.repeat))
+    print("to_parquet: %.2fs" % _best(lambda: db.to_parquet(parquet),
+                                      args.repeat))
+    print("from_parquet(columnar=True): %.2fs (%d MB)" % (
+        _best(lambda: mpd_pydb.Database.from_parquet(parquet, columnar=True),
+              args.repeat),
+        os.path.getsize(parquet) // 1000000))
+    print("read_file(columnar=True): %.2fs" % _best(
+        lambda: mpd_pydb.Database.read_file(filename, columnar=True), 1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+Compare reading the same database uncompressed, gzip- and zstd-compressed.
+
+Usage::
+
+    python benchmarks/compression.py --songs 1000000
+"""
+from __future__ import print_function
+
+import argparse
+import gzip
+import io
+import os
+
+import mpd_pydb
+from mpd_pydb.compression import open_database
+from parse import _best, _synthetic_db, _write_once
+
+
+def _count_lines(db_file):
+    with io.BufferedReader(db_file, 1 << 16) as lines:
+        return sum(1 for _ in lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--songs", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    gzip_filename = _synthetic_db(args.songs)
+    plain_filename = gzip_filename[:-len(".gz")]
+
+    def decompress(target):
+        with gzip.open(gzip_filename, "rb") as source:
+            target.write(source.read())
+    _write_once(plain_filename, decompress)
+    filenames = [("plain", plain_filename), ("gzip", gzip_filename)]
+
+    try:
+        import zstandard
+    except ImportError:
+        print("zstandard is not installed, skipping zstd")
+    else:
+        zstd_filename = plain_filename + ".zst"
+
+        def compress(target):
+            with open(plain_filename, "rb") as source:
+                target.write(zstandard.ZstdCompressor().compress(
+                    source.read()))
+        _write_once(zstd_filename, compress)
+        filenames.append(("zstd", zstd_filename))
+
+    print("gzip.GzipFile lines: %.2fs" % _best(
+        lambda: _count_lines(gzip.open(gzip_filename, "rb")), args.repeat))
+    for name, filename in filenames:
+        lines = _best(lambda: _count_lines(open_database(filename)),
+                      args.repeat)
+        parse = _best(lambda: mpd_pydb.Database.read_file(filename,
+                                                          columnar=True),
+                      args.repeat)
+        print("%s (%d MB): lines %.2fs, read_file(columnar=True) %.2fs" %
+              (name, os.path.getsize(filename) // 1000000, lines, parse))
+
+
+if __name__ == "__main__":
+    main()
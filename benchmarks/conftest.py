@@ -0,0 +1,48 @@
+# coding: utf-8
+# License: MIT, see LICENSE for details
+import gzip
+import tracemalloc
+
+import pytest
+from parse import _synthetic_db
+
+
+def pytest_addoption(parser):
+    parser.addoption("--songs", type=int, default=10000,
+                     help="The number of songs in the benchmark database")
+
+
+@pytest.fixture(scope="session")
+def songs(request):
+    return request.config.getoption("songs")
+
+
+@pytest.fixture(scope="session")
+def database_file(songs):
+    return _synthetic_db(songs)
+
+
+@pytest.fixture(scope="session")
+def lines(database_file):
+    with gzip.open(database_file, "rb") as db_file:
+        return sum(1 for _ in db_file)
+
+
+@pytest.fixture
+def measure(benchmark, songs, lines):
+    """
+    Run ``function`` once while tracing memory allocations, then benchmark
+    it. The peak of the traced memory and the sizes of the database are added
+    to the extra info of the benchmark.
+    """
+    def measure(function, *args, **kwargs):
+        tracemalloc.start()
+        try:
+            function(*args, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info.update(songs=songs, lines=lines,
+                                    peak_memory=peak)
+        return benchmark(function, *args, **kwargs)
+    return measure
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+Measure the time and memory of Database.to_dataframe, with and without
+compact=True.
+
+Usage::
+
+    python benchmarks/dataframe.py --songs 100000 1000000
+"""
+from __future__ import print_function
+
+import argparse
+import random
+
+from mpd_pydb import db as mpd_db
+from parse import _best
+
+
+def _database(songs):
+    rng = random.Random(0)
+    tags = ["Time", "mtime", "path", "Artist", "Track", "Disc"]
+    song_type = mpd_db._song_type(tags)
+    db = mpd_db.Database(mpd_db._SUPPORTED_FORMAT_VERSION, "0.20", tags)
+    for index in range(songs):
+        tracks = rng.randint(8, 14)
+        db.add_song(song_type(rng.uniform(60, 600), 1400000000 + index,
+                              "song%d.flac" % index, "Artist",
+                              "%d/%d" % (rng.randint(1, tracks), tracks),
+                              "1/1" if index % 2 else "1",
+                              None))
+    return db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--songs", type=int, nargs="+",
+                        default=[100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for songs in args.songs:
+        db = _database(songs)
+        for compact in (False, True):
+            best = _best(lambda: db.to_dataframe(compact=compact),
+                         args.repeat)
+            df = db.to_dataframe(compact=compact)
+            memory = df.memory_usage(deep=True).sum()
+            print("%d songs, compact=%s: %.3fs, %.1f MB" %
+                  (songs, compact, best, memory / 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+Write synthetic MPD databases for benchmarking.
+
+Usage::
+
+    python benchmarks/generate.py --songs 1000000 /tmp/mpd.db.gz
+
+Songs are grouped into ``artist/album`` directories, or
+``artist/album/CD n`` directories with ``--discs-per-album``. The database is
+gzip-compressed if the filename ends with ``.gz``, zstd-compressed if it ends
+with ``.zst`` and uncompressed otherwise. The same arguments always produce
+the same database.
+"""
+from __future__ import print_function
+
+import argparse
+import gzip
+import random
+
+#: Incremented whenever the same arguments produce a different database than
+#: before
+GENERATOR_VERSION = 2
+
+_TAGS = ["Artist", "Album", "AlbumArtist", "Title", "Track", "Genre", "Date",
+         "Disc", "MUSICBRAINZ_ARTISTID", "MUSICBRAINZ_ALBUMID",
+         "MUSICBRAINZ_TRACKID"]
+_GENRES = ["Rock", "Pop", "Jazz", "Electronic", "Classical", "Hip-Hop",
+           "Metal", "Folk"]
+
+
+def _uuid(rng):
+    return "%08x-%04x-%04x-%04x-%012x" % (rng.getrandbits(32),
+                                          rng.getrandbits(16),
+                                          rng.getrandbits(16),
+                                          rng.getrandbits(16),
+                                          rng.getrandbits(48))
+
+
+def _tag_values(tags, rng, artist_name, artist_id, album_name, album_id,
+                date, genre, disc, discs, track, tracks, title):
+    """
+    Return the ``(tag, value)`` pairs of a song. Tags that this generator
+    doesn't know get a value that is shared by all songs of an album.
+    """
+    values = {"Artist": artist_name,
+              "Album": album_name,
+              "AlbumArtist": artist_name,
+              "Title": title,
+              "Track": "%d/%d" % (track, tracks),
+              "Genre": genre,
+              "Date": date,
+              "Disc": "%d/%d" % (disc, discs),
+              "MUSICBRAINZ_ARTISTID": artist_id,
+              "MUSICBRAINZ_ALBUMID": album_id}
+    pairs = []
+    for tag in tags:
+        if tag == "MUSICBRAINZ_TRACKID":
+            value = _uuid(rng)
+        else:
+            value = values.get(tag)
+            if value is None:
+                value = "%s of %s" % (tag, album_name)
+        pairs.append((tag, value))
+    return pairs
+
+
+def generate(db_file, songs, tracks_per_album=12, albums_per_artist=4,
+             seed=0, tags=_TAGS, discs_per_album=1, missing=0.0):
+    """
+    Write a format 2 database with ``songs`` songs to the binary file object
+    ``db_file``.
+
+    :param [str] tags: The tags of the songs
+    :param int discs_per_album: With more than one disc, the songs of each
+                                disc are in a subdirectory of the album
+    :param float missing: The probability with which each tag is left out of
+                          a song
+    """
+    rng = random.Random(seed)
+    write = db_file.write
+    write(b"info_begin\nformat: 2\nmpd_version: 0.20\nfs_charset: UTF-8\n")
+    for tag in tags:
+        write(("tag: %s\n" % tag).encode("utf-8"))
+    write(b"info_end\n")
+
+    written = 0
+    artist = 0
+    while written < songs:
+        artist_name = "Artist %d" % artist
+        artist_id = _uuid(rng)
+        lines = ["directory: %s" % artist_name,
+                 "mtime: 1432207800",
+                 "begin: %s" % artist_name]
+        for album in range(albums_per_artist):
+            if written >= songs:
+                break
+            album_name = "Album %d" % album
+            album_dir = "%s/%s" % (artist_name, album_name)
+            album_id = _uuid(rng)
+            date = str(rng.randint(1960, 2017))
+            genre = rng.choice(_GENRES)
+            mtime = 1400000000 + rng.randint(0, 100000000)
+            lines.extend(["directory: %s" % album_name,
+                          "mtime: %d" % mtime,
+                          "begin: %s" % album_dir])
+            for disc in range(1, discs_per_album + 1):
+                if written >= songs:
+                    break
+                disc_dir = album_dir
+                if discs_per_album > 1:
+                    disc_dir = "%s/CD %d" % (album_dir, disc)
+                    lines.extend(["directory: CD %d" % disc,
+                                  "mtime: %d" % mtime,
+                                  "begin: %s" % disc_dir])
+                for track in range(1, tracks_per_album + 1):
+                    if written >= songs:
+                        break
+                    title = "Track %d of %s" % (track, album_name)
+                    lines.extend(["song_begin: %02d - %s.flac" % (track,
+                                                                  title),
+                                  "Time: %.6f" % rng.uniform(60, 600)])
+                    for tag, value in _tag_values(
+                            tags, rng, artist_name, artist_id, album_name,
+                            album_id, date, genre, disc, discs_per_album,
+                            track, tracks_per_album, title):
+                        if missing and rng.random() < missing:
+                            continue
+                        lines.append("%s: %s" % (tag, value))
+                    lines.extend(["mtime: %d" % mtime,
+                                  "song_end"])
+                    written += 1
+                if discs_per_album > 1:
+                    lines.append("end: %s" % disc_dir)
+            lines.append("end: %s" % album_dir)
+        lines.append("end: %s" % artist_name)
+        write(("\n".join(lines) + "\n").encode("utf-8"))
+        artist += 1
+
+
+def open_output(filename):
+    """
+    Open ``filename`` for writing a database, compressed according to its
+    extension.
+    """
+    if filename.endswith(".gz"):
+        return gzip.open(filename, "wb")
+    if filename.endswith(".zst"):
+        import zstandard
+        return zstandard.ZstdCompressor().stream_writer(open(filename, "wb"))
+    return open(filename, "wb")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--songs", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tags", nargs="+", default=_TAGS,
+                        help="The tags of the songs")
+    parser.add_argument("--tracks-per-album", type=int, default=12)
+    parser.add_argument("--albums-per-artist", type=int, default=4)
+    parser.add_argument("--discs-per-album", type=int, default=1)
+    parser.add_argument("--missing", type=float, default=0.0,
+                        help="The probability with which each tag is left "
+                             "out of a song")
+    parser.add_argument("filename")
+    args = parser.parse_args()
+    with open_output(args.filename) as db_file:
+        generate(db_file, args.songs, args.tracks_per_album,
+                 args.albums_per_artist, args.seed, args.tags,
+                 args.discs_per_album, args.missing)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+Measure how Database.read_file scales with the number of workers.
+
+Usage::
+
+    python benchmarks/parallel.py --songs 1000000 --workers 1 2 4 8
+"""
+from __future__ import print_function
+
+import argparse
+import time
+
+import mpd_pydb
+from parse import _synthetic_db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--songs", type=int, default=1000000)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=[1, 2, 4, 8])
+    parser.add_argument("--columnar", action="store_true")
+    args = parser.parse_args()
+
+    filename = _synthetic_db(args.songs)
+    for workers in args.workers:
+        start = time.time()
+        mpd_pydb.Database.read_file(filename, workers=workers,
+                                    columnar=args.columnar)
+        print("%d workers: %.2fs" % (workers, time.time() - start))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+Measure how many database lines per second Database.read_file parses.
+
+Usage::
+
+    python benchmarks/parse.py --songs 1000000
+"""
+from __future__ import print_function
+
+import argparse
+import gzip
+import os
+import tempfile
+import time
+
+import mpd_pydb
+from generate import GENERATOR_VERSION, generate
+from mpd_pydb.cache import _replace
+
+
+def _write_once(filename, write):
+    """
+    Call ``write`` with a binary file object to create ``filename`` unless it
+    already exists. The file is written under another name and only renamed
+    to ``filename`` once it is complete, so an interrupted run doesn't leave
+    a truncated file behind that later runs would use.
+    """
+    if os.path.exists(filename):
+        return
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(filename),
+                                     suffix=".tmp", delete=False) as target:
+        try:
+            write(target)
+        except BaseException:
+            target.close()
+            os.remove(target.name)
+            raise
+    _replace(target.name, filename)
+
+
+def _write_synthetic_db(target, songs):
+    with gzip.GzipFile(fileobj=target, mode="wb") as db_file:
+        generate(db_file, songs)
+
+
+def _synthetic_db(songs):
+    # The version of the generator is part of the name, so databases of an
+    # older generator are not reused
+    filename = os.path.join(tempfile.gettempdir(),
+                            "mpd_pydb-bench-v%d-%d.db.gz" %
+                            (GENERATOR_VERSION, songs))
+    _write_once(filename, lambda target: _write_synthetic_db(target, songs))
+    return filename
+
+
+def _best(function, repeat):
+    """
+    Return the shortest time in seconds that ``repeat`` calls of
+    ``function`` took.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        function()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--songs", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    filename = _synthetic_db(args.songs)
+    with gzip.open(filename, "rb") as db_file:
+        lines = sum(1 for _ in db_file)
+
+    best = _best(lambda: mpd_pydb.Database.read_file(filename), args.repeat)
+    print("%d songs, %d lines: %.2fs, %.0f lines/s" %
+          (args.songs, lines, best, lines / best))
+
+
+if __name__ == "__main__":
+    main()
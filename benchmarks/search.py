@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+Measure the latency of text index lookups against a scan over all songs.
+
+Usage::
+
+    python benchmarks/search.py --songs 500000
+"""
+from __future__ import print_function
+
+import argparse
+import time
+
+import mpd_pydb
+from parse import _best, _synthetic_db
+
+_QUERIES = [("complete", "artist 12"),
+            ("prefix", "artist 4711"),
+            ("substring", "ist 4711"),
+            ("substring", "bum 3"),
+            ("fuzzy", "artst 4711")]
+_TAGS = ("Title", "Artist", "Album")
+
+
+def _scan(db, text):
+    text = text.lower()
+    return [song for song in db.songs
+            if any(getattr(song, tag) is not None and
+                   text in getattr(song, tag).lower() for tag in _TAGS)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--songs", type=int, default=500000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    db = mpd_pydb.Database.read_file(_synthetic_db(args.songs))
+    start = time.time()
+    index = db.create_text_index(tags=_TAGS)
+    print("%d songs: building the index took %.2fs" %
+          (args.songs, time.time() - start))
+    for method, text in _QUERIES:
+        elapsed = _best(lambda: getattr(index, method)(text), args.repeat)
+        print("%s(%r): %.3fms" % (method, text, elapsed * 1000))
+    elapsed = _best(lambda: _scan(db, "ist 4711"), 1)
+    print("scanning all songs for 'ist 4711': %.3fms" % (elapsed * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+A pytest-benchmark suite for parsing, querying and converting databases.
+
+Usage::
+
+    pytest benchmarks --songs 100000 --benchmark-autosave
+    pytest benchmarks --songs 100000 --benchmark-compare
+
+The database is generated by :mod:`generate` with a fixed seed, so results of
+runs with the same ``--songs`` can be compared across commits. Every
+benchmark records the peak memory traced while running it once in its extra
+info.
+"""
+import pytest
+pytest.importorskip("pytest_benchmark")
+
+import mpd_pydb
+
+from mpd_pydb.query import PathPrefix, TagEquals
+
+
+@pytest.fixture(scope="module")
+def db(database_file):
+    return mpd_pydb.Database.read_file(database_file)
+
+
+@pytest.fixture(scope="module")
+def columnar_db(database_file):
+    return mpd_pydb.Database.read_file(database_file, columnar=True)
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"compact": True}, {"columnar": True}],
+                         ids=["default", "compact", "columnar"])
+def test_read_file(measure, database_file, kwargs):
+    measure(mpd_pydb.Database.read_file, database_file, **kwargs)
+
+
+def test_iter_songs(measure, database_file):
+    def iterate():
+        for _ in mpd_pydb.Database.iter_songs(database_file):
+            pass
+    measure(iterate)
+
+
+def test_read_file_tags(measure, database_file):
+    measure(mpd_pydb.Database.read_file, database_file,
+            tags=["Artist", "Title"])
+
+
+@pytest.mark.parametrize("where", [[PathPrefix("Artist 1")],
+                                   [TagEquals("Genre", "Jazz")]],
+                         ids=["PathPrefix", "TagEquals"])
+def test_read_file_where(measure, database_file, where):
+    measure(mpd_pydb.Database.read_file, database_file, where=where)
+
+
+@pytest.mark.parametrize("columnar", [False, True],
+                         ids=["default", "columnar"])
+def test_read_file_cached(measure, database_file, tmpdir, columnar):
+    cache_dir = str(tmpdir)
+    mpd_pydb.Database.read_file(database_file, cache_dir=cache_dir)
+    measure(mpd_pydb.Database.read_file, database_file, cache_dir=cache_dir,
+            columnar=columnar)
+
+
+@pytest.mark.parametrize("tag", ["Artist", "mtime", "path"])
+def test_create_index(measure, db, tag):
+    def create_index():
+        db._indexes.clear()
+        db.create_index(tag)
+    measure(create_index)
+
+
+def test_find(measure, db):
+    db.create_index("Artist")
+    measure(db.find, "Artist", "Artist 1")
+
+
+def test_select(measure, db):
+    measure(db.select, TagEquals("Genre", "Jazz"))
+
+
+@pytest.mark.parametrize("compact", [False, True],
+                         ids=["default", "compact"])
+@pytest.mark.parametrize("columnar", [False, True],
+                         ids=["list", "columnar"])
+def test_to_dataframe(measure, db, columnar_db, columnar, compact):
+    pytest.importorskip("pandas")
+    database = columnar_db if columnar else db
+    measure(database.to_dataframe, compact=compact)
+
+
+def test_to_arrow(measure, columnar_db):
+    pytest.importorskip("pyarrow")
+    measure(columnar_db.to_arrow)
+
+
+def test_create_text_index(measure, db):
+    def create_text_index():
+        db._text_index = None
+        db.create_text_index()
+    measure(create_text_index)
+
+
+@pytest.mark.parametrize("method, text", [("complete", "artist 1"),
+                                          ("prefix", "artist 1"),
+                                          ("substring", "ist 1"),
+                                          ("fuzzy", "artst 1")])
+def test_text_search(measure, db, method, text):
+    measure(getattr(db.create_text_index(), method), text)
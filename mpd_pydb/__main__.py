@@ -0,0 +1,8 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+import sys
+
+from .cli import main
+
+sys.exit(main())
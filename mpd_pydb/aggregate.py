@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+Aggregates
+==========
+
+Aggregates sum up the songs of a database per album, artist, genre or
+directory, so that questions like "how long is each album" or "which
+directories changed most recently" don't need a pass over all songs. They are
+created with :meth:`~mpd_pydb.db.Database.aggregate`, by passing
+``aggregates`` to :meth:`~mpd_pydb.db.Database.read_file`, which creates all
+of them in a single pass, or on first use. Afterwards, they are kept up to
+date by :meth:`~mpd_pydb.db.Database.add_song` and
+:meth:`~mpd_pydb.db.Database.update_from`.
+
+The songs are grouped by:
+
+``album``
+    ``(artist, Album)``, where the artist is the ``AlbumArtist`` of a song or
+    its ``Artist`` if it has no ``AlbumArtist``
+``artist``
+    the ``AlbumArtist`` of a song or its ``Artist`` if it has no
+    ``AlbumArtist``
+``genre``
+    ``Genre``
+``directory``
+    the directory of a song inside of MPDs music directory, ``None`` for
+    MPDs music root
+
+Songs without a value for the key of an aggregate are not part of it. Each
+group is summed up in a :class:`Rollup`::
+
+    >>> db.aggregate("artist")["Anamanaguchi"]
+    Rollup(songs=2, time=463.649, albums=1, newest=1432207829)
+"""
+from collections import Counter, namedtuple
+from operator import attrgetter
+
+from .db import _MTIME, _PATH, _TIME, _posix
+
+#: The summary of a group of songs: the number of ``songs``, their total
+#: ``Time`` in seconds, the number of distinct ``albums`` they are on and the
+#: ``newest`` ``mtime`` of them, ``None`` if no song has one
+Rollup = namedtuple("Rollup", ["songs", "time", "albums", "newest"])
+
+
+def _none(song):
+    return None
+
+
+def _getter(supported_tags, tag):
+    """
+    Return a function that returns the value of ``tag`` of a song, or
+    ``None`` if ``tag`` is not supported.
+    """
+    if tag in supported_tags:
+        return attrgetter(tag)
+    return _none
+
+
+def _artist_key(supported_tags):
+    album_artist = _getter(supported_tags, "AlbumArtist")
+    artist = _getter(supported_tags, "Artist")
+
+    def key(song):
+        value = album_artist(song)
+        if value is None:
+            return artist(song)
+        return value
+    return key
+
+
+def _album_key(supported_tags):
+    artist = _artist_key(supported_tags)
+    album = _getter(supported_tags, "Album")
+
+    def key(song):
+        value = album(song)
+        if value is None:
+            return None
+        return artist(song), value
+    return key
+
+
+def _genre_key(supported_tags):
+    return _getter(supported_tags, "Genre")
+
+
+def _directory_key(supported_tags):
+    def key(song):
+        directory, _, _ = _posix(song.path).rpartition("/")
+        return directory or None
+    return key
+
+
+# The key functions of all aggregates and the tags one of which has to be
+# supported to use them
+_KEYS = {"album": (_album_key, ("Album",)),
+         "artist": (_artist_key, ("AlbumArtist", "Artist")),
+         "genre": (_genre_key, ("Genre",)),
+         "directory": (_directory_key, (_PATH,))}
+
+
+class _Group(object):
+    __slots__ = ("songs", "time", "albums", "newest", "stale")
+
+    def __init__(self):
+        self.songs = 0
+        self.time = 0.0
+        self.albums = Counter()
+        # The newest mtime, or an upper limit of it if stale is set
+        self.newest = None
+        # Whether the song with the newest mtime was removed
+        self.stale = False
+
+
+class Aggregate(object):
+    def __init__(self, name, supported_tags, songs):
+        """
+        The :class:`Rollup` of each group of the aggregate ``name``.
+
+        :param str name: ``album``, ``artist``, ``genre`` or ``directory``
+        :param [str] supported_tags: The supported tags of the songs
+        :param songs: The songs of the database, which are searched again if
+                      the song with the newest ``mtime`` of a group is
+                      removed
+        :raises ValueError: If ``name`` is not an aggregate or none of the tags
+                            it needs is supported
+        """
+        if name not in _KEYS:
+            raise ValueError("{name} is not an aggregate".format(name=name))
+        key, tags = _KEYS[name]
+        if not any(tag in supported_tags for tag in tags):
+            raise ValueError("The {name} aggregate needs {tags}".format(
+                name=name, tags=" or ".join(tags)))
+        #: The name of this aggregate
+        self.name = name
+        self._album = _album_key(supported_tags)
+        self._key = self._album if name == "album" else key(supported_tags)
+        self._time = _getter(supported_tags, _TIME)
+        self._mtime = _getter(supported_tags, _MTIME)
+        self._songs = songs
+        self._groups = {}
+        # The keys of the groups whose newest mtime has to be searched again
+        self._stale = set()
+
+    def add(self, song):
+        self._add(self._key(song), self._time(song), self._album(song),
+                  self._mtime(song))
+
+    def _add(self, key, time, album, mtime):
+        if key is None:
+            return
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = _Group()
+        group.songs += 1
+        if time is not None:
+            group.time += time
+        if album is not None:
+            albums = group.albums
+            albums[album] = albums.get(album, 0) + 1
+        if mtime is not None and (group.newest is None or
+                                  mtime >= group.newest):
+            group.newest = mtime
+            if group.stale:
+                group.stale = False
+                self._stale.discard(key)
+
+    def remove(self, song):
+        key = self._key(song)
+        group = self._groups.get(key)
+        if group is None:
+            return
+        group.songs -= 1
+        if not group.songs:
+            del self._groups[key]
+            self._stale.discard(key)
+            return
+        time = self._time(song)
+        if time is not None:
+            group.time -= time
+        album = self._album(song)
+        if album is not None:
+            group.albums[album] -= 1
+            if not group.albums[album]:
+                del group.albums[album]
+        mtime = self._mtime(song)
+        if mtime is not None and mtime == group.newest:
+            group.stale = True
+            self._stale.add(key)
+
+    def _refresh(self):
+        """
+        Search the newest mtime of all stale groups in one pass over the
+        songs.
+        """
+        newest = dict.fromkeys(self._stale)
+        key = self._key
+        get_mtime = self._mtime
+        for song in self._songs:
+            song_key = key(song)
+            if song_key in newest:
+                mtime = get_mtime(song)
+                if mtime is not None and (newest[song_key] is None or
+                                          mtime > newest[song_key]):
+                    newest[song_key] = mtime
+        for song_key, mtime in newest.items():
+            group = self._groups[song_key]
+            group.newest = mtime
+            group.stale = False
+        self._stale.clear()
+
+    def get(self, key, default=None):
+        """
+        Return the :class:`Rollup` of the songs whose key is ``key`` or
+        ``default`` if there are none.
+        """
+        group = self._groups.get(key)
+        if group is None:
+            return default
+        if group.stale:
+            self._refresh()
+        return Rollup(group.songs, group.time, len(group.albums),
+                      group.newest)
+
+    def __getitem__(self, key):
+        rollup = self.get(key)
+        if rollup is None:
+            raise KeyError(key)
+        return rollup
+
+    def __contains__(self, key):
+        return key in self._groups
+
+    def __iter__(self):
+        return iter(self._groups)
+
+    def __len__(self):
+        return len(self._groups)
+
+    def keys(self):
+        """
+        Return the keys of all groups.
+
+        :rtype: list
+        """
+        return list(self._groups)
+
+    def items(self):
+        """
+        Return the ``(key, rollup)`` pairs of all groups.
+
+        :rtype: list
+        """
+        if self._stale:
+            self._refresh()
+        return [(key, Rollup(group.songs, group.time, len(group.albums),
+                             group.newest))
+                for key, group in self._groups.items()]
+
+
+def create_aggregates(names, supported_tags, songs):
+    """
+    Create the aggregates ``names`` over ``songs`` in one pass.
+
+    :rtype: [:class:`Aggregate`]
+    """
+    aggregates = [Aggregate(name, supported_tags, songs) for name in names]
+    if not aggregates:
+        return aggregates
+    # The values all aggregates need are only looked up once per song
+    first = aggregates[0]
+    get_album = first._album
+    get_time = first._time
+    get_mtime = first._mtime
+    adders = [(aggregate._key, aggregate._add) for aggregate in aggregates]
+    for song in songs:
+        album = get_album(song)
+        time = get_time(song)
+        mtime = get_mtime(song)
+        for key, add in adders:
+            add(album if key is get_album else key(song), time, album, mtime)
+    return aggregates
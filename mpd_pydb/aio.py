@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+asyncio support
+===============
+
+:meth:`~mpd_pydb.db.Database.aread_file` and
+:meth:`~mpd_pydb.db.Database.aiter_songs` read databases without blocking
+the event loop. The file is decompressed and parsed in an executor, so the
+event loop keeps running other tasks while a database is being read.
+
+:meth:`~mpd_pydb.db.Database.aread_file` reads the whole database in a single
+call of :meth:`~mpd_pydb.db.Database.read_file` in the executor. By default,
+that is the default executor of the event loop, a thread pool. Parsing holds
+the GIL most of the time, so other tasks run a bit slower while a database is
+read in a thread. A :class:`concurrent.futures.ProcessPoolExecutor` avoids
+that, but the database has to be sent back to the event loop's process, which
+only works for columnar databases.
+
+:class:`AsyncSongReader` reads chunks of songs in the executor and returns
+control to the event loop after every chunk.
+"""
+import asyncio
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+
+#: The number of songs :class:`AsyncSongReader` reads at a time
+CHUNK_SIZE = 1000
+
+
+def aread_file(database_class, filename, executor=None, **kwargs):
+    """
+    Read the database in ``filename`` in ``executor``.
+
+    The other parameters are the same as the ones of
+    :meth:`~mpd_pydb.db.Database.read_file`.
+
+    :rtype: :class:`asyncio.Future`
+    :raises ValueError: If ``executor`` is a
+                        :class:`~concurrent.futures.ProcessPoolExecutor` and
+                        ``columnar`` is not set
+    """
+    if isinstance(executor, ProcessPoolExecutor) and \
+            not kwargs.get("columnar"):
+        raise ValueError("Only columnar databases can be read in a "
+                         "ProcessPoolExecutor")
+    loop = asyncio.get_event_loop()
+    return loop.run_in_executor(executor,
+                                partial(database_class.read_file, filename,
+                                        **kwargs))
+
+
+class AsyncSongReader(object):
+    def __init__(self, database_class, filename, executor=None,
+                 chunk_size=CHUNK_SIZE, **kwargs):
+        """
+        An asynchronous iterator over the songs in an MPD database file.
+
+        The file is opened when the first song is requested, and
+        :attr:`reader` is set once it has been opened. Songs are read in
+        chunks of ``chunk_size`` songs in ``executor``, which has to be a
+        thread pool, because the file stays open between chunks.
+
+        The file is closed once all songs have been read. Use :meth:`aclose`
+        (or an ``async with`` statement) to close it earlier.
+
+        The other parameters are the same as the ones of
+        :meth:`~mpd_pydb.db.Database.iter_songs`.
+        """
+        #: The :class:`~mpd_pydb.db.SongReader` used to read the file, or
+        #: ``None`` if it has not been opened yet
+        self.reader = None
+
+        self._open = partial(database_class.iter_songs, filename, **kwargs)
+        self._executor = executor
+        self._chunk_size = chunk_size
+        self._songs = deque()
+        self._done = False
+        self._closed = False
+        # The future of the chunk that is currently being read
+        self._chunk = None
+
+    def _read_chunk(self):
+        if self.reader is None:
+            self.reader = self._open()
+        songs = list(islice(self.reader, self._chunk_size))
+        if len(songs) < self._chunk_size:
+            self.reader.close()
+        return songs
+
+    def _pop(self):
+        if self._songs:
+            return self._songs.popleft()
+        raise StopAsyncIteration
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        if self._chunk is not None:
+            raise RuntimeError("anext() called while another call is "
+                               "reading songs")
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+
+        def resolve():
+            try:
+                future.set_result(self._pop())
+            except StopAsyncIteration as e:
+                future.set_exception(e)
+
+        if self._songs or self._done:
+            resolve()
+            return future
+
+        def chunk_read(chunk):
+            self._chunk = None
+            try:
+                songs = chunk.result()
+            except BaseException as e:
+                self._done = True
+                if not future.cancelled():
+                    future.set_exception(e)
+                return
+            if len(songs) < self._chunk_size:
+                self._done = True
+            # Songs are kept even if future was cancelled, so that the next
+            # call returns them instead of skipping them
+            if not self._closed:
+                self._songs.extend(songs)
+            if not future.cancelled():
+                resolve()
+
+        self._chunk = loop.run_in_executor(self._executor, self._read_chunk)
+        self._chunk.add_done_callback(chunk_read)
+        return future
+
+    def __aenter__(self):
+        future = asyncio.get_event_loop().create_future()
+        future.set_result(self)
+        return future
+
+    def __aexit__(self, *exc_info):
+        return self.aclose()
+
+    def aclose(self):
+        """
+        Close the underlying database file.
+
+        :rtype: :class:`asyncio.Future`
+        """
+        self._done = self._closed = True
+        self._songs.clear()
+        future = asyncio.get_event_loop().create_future()
+
+        def close(chunk=None):
+            if self.reader is not None:
+                self.reader.close()
+            future.set_result(None)
+
+        # The reader can't be closed while a chunk is read in another thread
+        if self._chunk is not None:
+            self._chunk.add_done_callback(close)
+        else:
+            close()
+        return future
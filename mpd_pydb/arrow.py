@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+Arrow and Parquet
+=================
+
+:meth:`~mpd_pydb.db.Database.to_arrow` converts a database to a
+:class:`pyarrow.Table` with one column per tag. The columns of a columnar
+database are handed to Arrow without creating song objects: the numbers in
+``Time`` and ``mtime`` columns are shared with Arrow unless a value is
+missing, and all other tags except ``path`` become dictionary-encoded string
+columns built from the codes and values of their
+:class:`~mpd_pydb.columnar.StringColumn`. Databases that store songs in a
+list are made columnar first.
+
+:meth:`~mpd_pydb.db.Database.to_parquet` writes that table to a Parquet file,
+which :meth:`~mpd_pydb.db.Database.from_parquet` reads back into a database.
+The format and MPD version of the database are stored in the metadata of the
+table. Other programs can read the file with :func:`pyarrow.parquet.read_table`
+directly, which also memory-maps it with ``memory_map=True``.
+
+This requires `pyarrow <https://arrow.apache.org/docs/python/>`_.
+"""
+from array import array
+
+from .columnar import (_MISSING_INT, ColumnarSongs, _columnar_songs,
+                       _ndarray)
+from .db import _MTIME, _PATH, _TIME, _gc_paused, _project, _song_type
+
+_FORMAT_VERSION_KEY = b"mpd_pydb.format_version"
+_MPD_VERSION_KEY = b"mpd_pydb.mpd_version"
+
+
+def _numeric_array(column):
+    import pyarrow as pa
+    values = _ndarray(column.data)
+    if values.dtype.kind == "f":
+        return pa.array(values, from_pandas=True)
+    missing = values == _MISSING_INT
+    return pa.array(values, mask=missing if missing.any() else None)
+
+
+def _dictionary_array(column):
+    import pyarrow as pa
+    codes = _ndarray(column.codes)
+    missing = codes < 0
+    return pa.DictionaryArray.from_arrays(
+        pa.array(codes, mask=missing if missing.any() else None),
+        pa.array(column.values, type=pa.string()))
+
+
+def _path_array(column):
+    import pyarrow as pa
+    directories = [directory + "/" for directory in
+                   column.directories.values] + [""]
+    return pa.array([directories[code] + filename
+                     for code, filename in zip(column.directories.codes,
+                                               column.filenames)],
+                    type=pa.string())
+
+
+def to_arrow(db, tags=None):
+    """
+    Convert the database ``db`` to a :class:`pyarrow.Table`.
+
+    :param tags: The names of the tags to convert. ``path`` is always
+                 included. By default, all supported tags are converted.
+    :rtype: :class:`pyarrow.Table`
+    """
+    import pyarrow as pa
+    tags = _project(db.supported_tags, tags)
+    songs = _columnar_songs(db, tags)
+    arrays = []
+    for tag, column in songs.columns.items():
+        if tag == _PATH:
+            arrays.append(_path_array(column))
+        elif tag in (_TIME, _MTIME):
+            arrays.append(_numeric_array(column))
+        else:
+            arrays.append(_dictionary_array(column))
+    metadata = {_FORMAT_VERSION_KEY: str(db.format_version).encode("utf-8"),
+                _MPD_VERSION_KEY: db.mpd_version.encode("utf-8")}
+    return pa.Table.from_arrays(arrays, names=tags, metadata=metadata)
+
+
+def _fill_numeric(column, array_, missing):
+    import pyarrow.compute as pc
+    column.data = array(column.data.typecode)
+    column.data.frombytes(pc.fill_null(array_, missing).to_numpy().
+                          astype(column.data.typecode).tobytes())
+
+
+def _fill_strings(column, array_):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    if not pa.types.is_dictionary(array_.type):
+        array_ = array_.dictionary_encode()
+    values = array_.dictionary.to_pylist()
+    codes = array(column.codes.typecode)
+    codes.frombytes(pc.fill_null(array_.indices, -1).to_numpy().
+                    astype(codes.typecode).tobytes())
+    column.__setstate__({"codes": codes, "values": values})
+
+
+def _fill_paths(column, array_):
+    for path in array_.to_pylist():
+        directory, _, filename = path.rpartition("/")
+        column.append_parts(directory or None, filename)
+
+
+def from_arrow(database_class, table, music_dir=None, compact=False,
+               columnar=False, tags=None):
+    """
+    Create a database from the :class:`pyarrow.Table` ``table``, which was
+    created by :func:`to_arrow`.
+
+    The other parameters are the same as the ones of
+    :meth:`~mpd_pydb.db.Database.read_file`.
+
+    :raises ValueError: If the metadata of ``table`` does not contain the
+                        format and MPD version of the database, if both
+                        ``compact`` and ``columnar`` are set or if ``tags``
+                        contains a tag that is not in ``table``
+    """
+    if compact and columnar:
+        raise ValueError("compact and columnar can't be used together")
+    metadata = table.schema.metadata or {}
+    if _FORMAT_VERSION_KEY not in metadata or _MPD_VERSION_KEY not in metadata:
+        raise ValueError("The table was not created by to_arrow")
+    tags = _project(table.column_names, tags)
+    db = database_class(int(metadata[_FORMAT_VERSION_KEY]),
+                        metadata[_MPD_VERSION_KEY].decode("utf-8"),
+                        tags)
+
+    table = table.select(tags).unify_dictionaries()
+    songs = ColumnarSongs(_song_type(tags), music_dir)
+    for tag, column in songs.columns.items():
+        array_ = table.column(tag).combine_chunks()
+        if tag == _PATH:
+            _fill_paths(column, array_)
+        elif tag == _TIME:
+            _fill_numeric(column, array_, float("nan"))
+        elif tag == _MTIME:
+            _fill_numeric(column, array_, _MISSING_INT)
+        else:
+            _fill_strings(column, array_)
+
+    if columnar:
+        db.songs = songs
+    else:
+        with _gc_paused():
+            if compact:
+                db.songs = songs.to_compact_songs()
+            else:
+                db.songs = list(songs)
+    return db
+
+
+def to_parquet(db, filename, tags=None, **kwargs):
+    """
+    Write the database ``db`` to the Parquet file ``filename``.
+
+    :param tags: The names of the tags to write, see :func:`to_arrow`
+    :param kwargs: Passed on to :func:`pyarrow.parquet.write_table`
+    """
+    import pyarrow.parquet as pq
+    pq.write_table(to_arrow(db, tags), filename, **kwargs)
+
+
+def from_parquet(database_class, filename, music_dir=None, compact=False,
+                 columnar=False, tags=None):
+    """
+    Read a database from the Parquet file ``filename``, which was written by
+    :func:`to_parquet`.
+
+    The other parameters are the same as the ones of :func:`from_arrow`.
+    """
+    import pyarrow.parquet as pq
+    columns = None
+    if tags is not None:
+        columns = _project(pq.read_schema(filename).names, tags)
+    table = pq.read_table(filename, columns=columns, memory_map=True)
+    return from_arrow(database_class, table, music_dir, compact, columnar,
+                      tags)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+Database cache
+==============
+
+:meth:`~mpd_pydb.db.Database.read_file` can keep the parsed database in a
+cache directory by passing ``cache_dir``. The database is stored as a pickle
+of its :class:`~mpd_pydb.columnar.ColumnarSongs`, which loads a lot faster
+than the database file can be decompressed and parsed.
+
+A cache entry is only used if the path, size and modification time of the
+database file and the version of the cache format are the same as when it was
+written. Otherwise, the database file is parsed again and the entry replaced.
+If the entry can't be written, the parsed database is returned all the same.
+"""
+import os
+import pickle
+import stat
+
+from hashlib import sha1
+from tempfile import NamedTemporaryFile
+
+from .db import _gc_paused, _project
+from .stats import _NO_STATS
+
+#: The version of the format of cache entries
+CACHE_VERSION = 1
+
+_replace = getattr(os, "replace", os.rename)
+
+
+def _file_mode(filename):
+    """
+    Return the permissions of ``filename``, or the ones a new file gets if it
+    doesn't exist.
+    """
+    try:
+        return stat.S_IMODE(os.stat(filename).st_mode)
+    except OSError:
+        # The umask can only be read by setting it
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def _cache_key(filename):
+    stat = os.stat(filename)
+    mtime = getattr(stat, "st_mtime_ns", stat.st_mtime)
+    return (CACHE_VERSION, os.path.abspath(filename), stat.st_size, mtime)
+
+
+def cache_filename(filename, cache_dir):
+    """
+    Return the path of the cache entry for the database in ``filename``.
+
+    :param str filename: The path to the database file
+    :param str cache_dir: The cache directory
+    :rtype: str
+    """
+    name = sha1(os.path.abspath(filename).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, name + ".pickle")
+
+
+def _load(path, key):
+    try:
+        with open(path, "rb") as cache_file:
+            entry = pickle.load(cache_file)
+    except (IOError, OSError, EOFError, pickle.UnpicklingError,
+            AttributeError, ImportError, IndexError, KeyError, TypeError,
+            ValueError):
+        # Python 2 raises KeyError for some invalid opcodes
+        return None
+    if not isinstance(entry, dict) or entry.get("key") != key:
+        return None
+    return entry
+
+
+def _store(path, entry):
+    cache_dir = os.path.dirname(path)
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    # Write to a temporary file first so that readers never see partially
+    # written entries
+    with NamedTemporaryFile(dir=cache_dir, delete=False) as cache_file:
+        try:
+            pickle.dump(entry, cache_file, pickle.HIGHEST_PROTOCOL)
+        except BaseException:
+            cache_file.close()
+            os.remove(cache_file.name)
+            raise
+    _replace(cache_file.name, path)
+
+
+def read_cached(database_class, filename, cache_dir, music_dir=None,
+                compact=False, columnar=False, tags=None, workers=None,
+                stats=_NO_STATS):
+    """
+    Read the database in ``filename`` from the cache in ``cache_dir`` if it is
+    up to date, otherwise parse it and update the cache.
+
+    The parameters are the same as the ones of
+    :meth:`~mpd_pydb.db.Database.read_file`.
+    """
+    key = _cache_key(filename)
+    path = cache_filename(filename, cache_dir)
+    with _gc_paused(), stats.phase("load_cache"):
+        entry = _load(path, key)
+    if entry is None:
+        db = database_class._read(filename, None, False, True, None, None,
+                                  workers, stats)
+        entry = {"key": key,
+                 "format_version": db.format_version,
+                 "mpd_version": db.mpd_version,
+                 "supported_tags": db.supported_tags,
+                 "songs": db.songs}
+        with stats.phase("store_cache"):
+            try:
+                _store(path, entry)
+            except (IOError, OSError, pickle.PicklingError):
+                # The cache only makes loading faster
+                pass
+
+    songs = entry["songs"]
+    songs.music_dir = music_dir
+    supported_tags = _project(entry["supported_tags"], tags)
+    if tags is not None:
+        songs = songs.project(supported_tags)
+    db = database_class(entry["format_version"], entry["mpd_version"],
+                        supported_tags)
+    if columnar:
+        db.songs = songs
+    else:
+        with _gc_paused(), stats.phase("convert"):
+            if compact:
+                db.songs = songs.to_compact_songs()
+            else:
+                db.songs = list(songs)
+        if tags is None:
+            db._source = (filename, music_dir, compact)
+    return db
@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+Command line
+============
+
+The ``mpd-pydb`` command writes the songs of a database to stdout as JSON
+Lines, CSV or TSV, for example to feed them into other programs::
+
+    mpd-pydb /var/lib/mpd/database --columns path,Artist,Title \\
+        --where Genre=Chiptune --range mtime=1700000000: --format csv
+
+Each song is written as soon as it has been parsed, so the output starts
+right away and only one song is held in memory at a time, no matter how large
+the database is. The options are:
+
+``--columns TAG,...``
+    The tags that are written, in this order. By default, all supported tags
+    are written. Tags that are neither written nor filtered on are not parsed
+    at all.
+``--where TAG=VALUE``
+    Only write songs whose ``TAG`` is ``VALUE``, see
+    :class:`~mpd_pydb.query.TagEquals`
+``--path PREFIX``
+    Only write songs in the directory ``PREFIX``, see
+    :class:`~mpd_pydb.query.PathPrefix`. Other directories are skipped
+    without parsing them.
+``--range TAG=MIN:MAX``
+    Only write songs whose ``Time`` or ``mtime`` is between ``MIN`` and
+    ``MAX``, both inclusive and both optional, see
+    :class:`~mpd_pydb.query.Range`
+``--format jsonl|csv|tsv``
+    The output format, ``jsonl`` by default. CSV and TSV start with a header
+    line unless ``--no-header`` is passed. Songs without a value for a tag
+    have ``null`` in JSON Lines and an empty field in CSV and TSV.
+``--stats``
+    Write the :class:`~mpd_pydb.stats.LoadStats` of reading the database and
+    the throughput to stderr once all songs have been written
+
+Filters can be given more than once, and songs have to match all of them.
+The output is always encoded as UTF-8. A database file name of ``-`` reads
+an uncompressed database from stdin.
+"""
+import argparse
+import csv
+import errno
+import io
+import json
+import os
+import sys
+
+from collections import OrderedDict
+from operator import attrgetter
+
+from .db import Database, _MTIME, _PATH, _PY2, _TIME, _posix
+from .query import PathPrefix, Range, TagEquals
+from .stats import LoadStats, _timer
+
+_FORMATS = ("jsonl", "csv", "tsv")
+# The types of the values of the tags that can be used with --range
+_RANGE_TYPES = {_TIME: float, _MTIME: int}
+
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog="mpd-pydb",
+        description="Write the songs of an MPD database to stdout while it "
+                    "is read.")
+    parser.add_argument("database",
+                        help="the path to the database file, - for an "
+                             "uncompressed database on stdin")
+    parser.add_argument("-c", "--columns", metavar="TAG,...",
+                        help="the tags that are written, in this order "
+                             "(default: all supported tags)")
+    parser.add_argument("-w", "--where", metavar="TAG=VALUE",
+                        action="append", default=[],
+                        help="only write songs whose TAG is VALUE")
+    parser.add_argument("-p", "--path", metavar="PREFIX",
+                        action="append", default=[],
+                        help="only write songs in the directory PREFIX")
+    parser.add_argument("-r", "--range", metavar="TAG=MIN:MAX",
+                        action="append", default=[],
+                        help="only write songs whose Time or mtime is between "
+                             "MIN and MAX, which are both optional")
+    parser.add_argument("-f", "--format", choices=_FORMATS, default="jsonl",
+                        help="the output format (default: jsonl)")
+    parser.add_argument("--no-header", action="store_false", dest="header",
+                        help="don't write a header line in CSV and TSV")
+    parser.add_argument("--music-dir",
+                        help="the path to MPDs music directory, which is "
+                             "prepended to the paths of the songs")
+    parser.add_argument("--stats", action="store_true",
+                        help="write statistics about reading the database "
+                             "to stderr")
+    return parser
+
+
+def _split(parser, option, argument):
+    tag, separator, value = argument.partition("=")
+    if not separator or not tag:
+        parser.error("{option} needs TAG=VALUE, not {argument!r}".format(
+            option=option, argument=argument))
+    return tag, value
+
+
+def _predicates(parser, args):
+    """
+    Return the predicates of the filters in ``args``.
+    """
+    predicates = [PathPrefix(prefix) for prefix in args.path]
+    for argument in args.where:
+        tag, value = _split(parser, "--where", argument)
+        if tag == _PATH:
+            parser.error("Use --path to select songs by their path")
+        if tag in _RANGE_TYPES:
+            try:
+                value = _RANGE_TYPES[tag](value)
+            except ValueError:
+                parser.error("{value!r} is not a valid {tag}".format(
+                    value=value, tag=tag))
+        predicates.append(TagEquals(tag, value))
+    for argument in args.range:
+        tag, limits = _split(parser, "--range", argument)
+        if tag not in _RANGE_TYPES:
+            parser.error("--range only supports Time and mtime")
+        minimum, separator, maximum = limits.partition(":")
+        if not separator:
+            parser.error("--range needs TAG=MIN:MAX, not {argument!r}".format(
+                argument=argument))
+        try:
+            predicates.append(Range(
+                tag,
+                _RANGE_TYPES[tag](minimum) if minimum else None,
+                _RANGE_TYPES[tag](maximum) if maximum else None))
+        except ValueError:
+            parser.error("{limits!r} is not a valid range of {tag}".format(
+                limits=limits, tag=tag))
+    return predicates
+
+
+def _columns(parser, args):
+    if args.columns is None:
+        return None
+    columns = [column.strip() for column in args.columns.split(",")]
+    if not all(columns):
+        parser.error("--columns needs a comma-separated list of tags")
+    return list(OrderedDict.fromkeys(columns))
+
+
+def _output():
+    """
+    Return a text stream that writes UTF-8 to stdout, whatever the encoding
+    of the locale is. On Python 2, stdout is returned, and the writers encode
+    what they write.
+    """
+    if _PY2:
+        return sys.stdout
+    return io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", newline="")
+
+
+def _rows(reader, columns, music_dir):
+    """
+    Yield a list of the values of ``columns`` of each song of ``reader``, with
+    paths as strings that start with ``music_dir`` if it is set, like
+    :func:`os.fspath` of the songs does.
+    """
+    values = attrgetter(*columns)
+    if len(columns) == 1:
+        get_values = values
+
+        def values(song):
+            return (get_values(song),)
+    path_index = columns.index(_PATH) if _PATH in columns else None
+    for song in reader:
+        row = list(values(song))
+        if path_index is not None:
+            path = _posix(row[path_index])
+            if music_dir is not None:
+                path = os.path.join(music_dir, path)
+            row[path_index] = path
+        yield row
+
+
+def _write_jsonl(output, columns, rows, header):
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    write = output.write
+    for row in rows:
+        line = encode(OrderedDict(zip(columns, row))) + "\n"
+        if _PY2 and not isinstance(line, bytes):
+            line = line.encode("utf-8")
+        write(line)
+
+
+def _encoded(rows):
+    """
+    Yield the rows with their strings encoded as UTF-8, which Python 2's csv
+    module needs.
+    """
+    text = type(u"")
+    for row in rows:
+        yield [value.encode("utf-8") if isinstance(value, text) else value
+               for value in row]
+
+
+def _write_csv(output, columns, rows, header, delimiter=","):
+    if _PY2:
+        rows = _encoded(rows)
+    writer = csv.writer(output, delimiter=delimiter, lineterminator="\n")
+    if header:
+        writer.writerow(columns)
+    writer.writerows(rows)
+
+
+def _write_tsv(output, columns, rows, header):
+    _write_csv(output, columns, rows, header, delimiter="\t")
+
+
+_WRITERS = {"jsonl": _write_jsonl, "csv": _write_csv, "tsv": _write_tsv}
+
+
+def _write_stats(stats, songs, seconds):
+    values = stats.as_dict()
+    values["songs"] = songs
+    values["seconds"] = seconds
+    if seconds:
+        values["songs_per_second"] = songs / seconds
+        values["bytes_per_second"] = stats.bytes_read / seconds
+    for key, value in values.items():
+        if isinstance(value, float):
+            value = "{value:.3f}".format(value=value)
+        sys.stderr.write("{key}: {value}\n".format(key=key, value=value))
+
+
+def main(argv=None):
+    """
+    Run the ``mpd-pydb`` command with the arguments ``argv``, by default the
+    ones the program was started with.
+
+    :return: The exit status of the program
+    :rtype: int
+    """
+    parser = _parser()
+    args = parser.parse_args(argv)
+    predicates = _predicates(parser, args)
+    columns = _columns(parser, args)
+    stats = LoadStats() if args.stats else None
+    filename = args.database
+    if filename == "-":
+        filename = getattr(sys.stdin, "buffer", sys.stdin)
+    start = _timer()
+    try:
+        reader = Database.iter_songs(filename, where=predicates or None,
+                                     tags=columns, stats=stats)
+    except (EnvironmentError, ValueError) as error:
+        parser.error(str(error))
+    if columns is None:
+        columns = reader.tags
+    # Counts the songs while they are written
+    counted = [0]
+
+    def songs():
+        for song in reader:
+            counted[0] += 1
+            yield song
+
+    rows = _rows(songs(), columns, args.music_dir)
+    output = _output()
+    try:
+        with reader:
+            _WRITERS[args.format](output, columns, rows, args.header)
+            output.flush()
+    except IOError as error:
+        if error.errno != errno.EPIPE:
+            raise
+        # Whatever reads the output stopped early, like head does. Flushing
+        # the rest of the output when the interpreter exits would fail again.
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+    finally:
+        if output is not sys.stdout:
+            output.detach()
+    if stats is not None:
+        _write_stats(stats, counted[0], _timer() - start)
+    return 0
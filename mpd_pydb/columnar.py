@@ -0,0 +1,477 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+Columnar storage
+================
+
+Instead of keeping one object per song, a
+:class:`~mpd_pydb.columnar.ColumnarSongs` stores each tag in its own column:
+``Time`` and ``mtime`` in :class:`~array.array` objects and all other tags
+dictionary-encoded as an array of integer codes plus a table of the distinct
+values. Songs are only created when they are accessed.
+"""
+from array import array
+from collections import OrderedDict
+from itertools import repeat
+from pathlib import Path
+
+from .db import (_MTIME, _PATH, _TIME, _CompactSongBuilder, _SongBuilder,
+                 _song_type)
+
+try:
+    array("q")
+    _INT64 = "q"
+except ValueError:
+    # Python 2
+    _INT64 = "l"
+
+_MISSING_INT = -(1 << 63)
+# The number of songs that are converted at once when iterating
+_CHUNK_SIZE = 1 << 16
+
+
+def _ndarray(data):
+    """
+    Return the numbers in ``data``, an :class:`array.array` or a memoryview
+    of a shared database, as a numpy array that shares their memory.
+    """
+    import numpy as np
+    if isinstance(data, array):
+        # Python 2's arrays don't support memoryview
+        return np.frombuffer(data, dtype=data.typecode)
+    return np.asarray(data)
+
+
+class NumericColumn(object):
+    def __init__(self, typecode, missing):
+        """
+        A column of numbers.
+
+        :param str typecode: The :mod:`array` typecode of the values
+        :param missing: The value that is stored for songs without this tag
+        """
+        #: An :class:`~array.array` containing the values of this column
+        self.data = array(typecode)
+        self._missing = missing
+
+    def append(self, value):
+        self.data.append(self._missing if value is None else value)
+
+    def extend(self, other):
+        """
+        Append the values of the column ``other``.
+        """
+        self.data.extend(other.data)
+
+    def _is_missing(self, value):
+        # NaN is the only value that is not equal to itself
+        return value == self._missing or value != value
+
+    def __getitem__(self, index):
+        value = self.data[index]
+        if self._is_missing(value):
+            return None
+        return value
+
+    def __len__(self):
+        return len(self.data)
+
+    def filter(self, test, indices=None):
+        """
+        Return the indices of all songs whose value, ``None`` for songs
+        without this tag, passes ``test``.
+
+        :param indices: Only these indices are checked, all if ``None``
+        :rtype: [int]
+        """
+        data = self.data
+        is_missing = self._is_missing
+        if indices is None:
+            indices = range(len(data))
+        return [index for index in indices
+                if test(None if is_missing(data[index]) else data[index])]
+
+    def tolist(self, start=0, stop=None):
+        """
+        Return the values of the songs from ``start`` to ``stop`` as a list.
+        """
+        is_missing = self._is_missing
+        return [None if is_missing(value) else value
+                for value in self.data[start:stop]]
+
+    def to_numpy(self, start=0, stop=None):
+        """
+        Convert the values of the songs from ``start`` to ``stop`` to a numpy
+        array. The array shares its memory with :attr:`data` unless a value
+        is missing, in which case a float array containing NaN for the
+        missing values is returned.
+        """
+        import numpy as np
+        values = _ndarray(self.data)[start:stop]
+        if values.dtype.kind == "i":
+            missing = values == self._missing
+            if missing.any():
+                values = values.astype(float)
+                values[missing] = np.nan
+        return values
+
+
+class StringColumn(object):
+    def __init__(self):
+        """
+        A dictionary-encoded column of strings.
+        """
+        #: An :class:`~array.array` with an index into :attr:`values` for
+        #: each song, -1 for songs without this tag
+        self.codes = array("i")
+        #: A :class:`list` of the distinct values in this column
+        self.values = []
+        self._index = {}
+
+    def append(self, value):
+        self.codes.append(-1 if value is None else self._intern(value))
+
+    def extend(self, other):
+        """
+        Append the values of the column ``other``.
+        """
+        # Translate the codes of other to the ones of this column, -1 stays
+        # -1
+        mapping = [self._intern(value) for value in other.values] + [-1]
+        self.codes.extend(array(self.codes.typecode,
+                                [mapping[code] for code in other.codes]))
+
+    def _intern(self, value):
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __getstate__(self):
+        return {"codes": self.codes, "values": self.values}
+
+    def __setstate__(self, state):
+        self.codes = state["codes"]
+        self.values = state["values"]
+        self._index = {value: code for code, value in enumerate(self.values)}
+
+    def code(self, value):
+        """
+        Return the code of ``value`` in this column or ``None`` if no song has
+        this value.
+        """
+        return self._index.get(value)
+
+    def _scan(self, codes, indices):
+        """
+        Return the indices of the songs whose code is in ``codes``.
+        """
+        column_codes = self.codes
+        if indices is None:
+            if len(codes) == 1:
+                code, = codes
+                return [index for index, c in enumerate(column_codes)
+                        if c == code]
+            return [index for index, c in enumerate(column_codes)
+                    if c in codes]
+        return [index for index in indices if column_codes[index] in codes]
+
+    def find(self, value, indices=None):
+        """
+        Return the indices of all songs that have the value ``value``. The
+        value is only looked up once, the codes of the songs are compared to
+        its code.
+
+        :param indices: Only these indices are checked, all if ``None``
+        :rtype: [int]
+        """
+        code = -1 if value is None else self.code(value)
+        if code is None:
+            return []
+        return self._scan({code}, indices)
+
+    def filter(self, test, indices=None):
+        """
+        Return the indices of all songs whose value, ``None`` for songs
+        without this tag, passes ``test``. ``test`` is called once for each
+        distinct value.
+
+        :param indices: Only these indices are checked, all if ``None``
+        :rtype: [int]
+        """
+        codes = {code for code, value in enumerate(self.values)
+                 if test(value)}
+        if test(None):
+            codes.add(-1)
+        return self._scan(codes, indices)
+
+    def __getitem__(self, index):
+        code = self.codes[index]
+        if code < 0:
+            return None
+        return self.values[code]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def tolist(self, start=0, stop=None):
+        """
+        Return the values of the songs from ``start`` to ``stop`` as a list.
+        """
+        # Code -1 picks the trailing None
+        lookup = self.values + [None]
+        return [lookup[code] for code in self.codes[start:stop]]
+
+    def to_numpy(self, start=0, stop=None):
+        """
+        Convert the values of the songs from ``start`` to ``stop`` to a numpy
+        object array.
+        """
+        import numpy as np
+        # Code -1 picks the trailing None
+        lookup = np.array(self.values + [None], dtype=object)
+        return lookup[_ndarray(self.codes)[start:stop]]
+
+    def to_categorical(self, start=0, stop=None):
+        """
+        Convert the values of the songs from ``start`` to ``stop`` to a
+        :class:`pandas.Categorical` whose categories are :attr:`values`.
+        """
+        import pandas as pd
+        codes = _ndarray(self.codes)
+        return pd.Categorical.from_codes(codes[start:stop],
+                                         categories=pd.Index(self.values))
+
+
+class PathColumn(object):
+    def __init__(self):
+        """
+        A column of song paths, stored as a dictionary-encoded
+        :class:`StringColumn` of directories and a list of filenames.
+        """
+        #: The directories of all songs, ``None`` for songs in MPDs music root
+        self.directories = StringColumn()
+        #: The filenames of all songs
+        self.filenames = []
+
+    def append(self, path):
+        directory = path.parent
+        self.append_parts(None if directory == Path() else str(directory),
+                          path.name)
+
+    def append_parts(self, directory, filename):
+        self.directories.append(directory)
+        self.filenames.append(filename)
+
+    def extend(self, other):
+        """
+        Append the paths of the column ``other``.
+        """
+        self.directories.extend(other.directories)
+        self.filenames.extend(other.filenames)
+
+    def __getitem__(self, index):
+        return Path(self.directories[index] or "") / self.filenames[index]
+
+    def __len__(self):
+        return len(self.filenames)
+
+    def tolist(self, start=0, stop=None):
+        """
+        Return the paths of the songs from ``start`` to ``stop`` as a list.
+        """
+        directories = [Path(directory)
+                       for directory in self.directories.values] + [Path()]
+        codes = self.directories.codes
+        return [directories[code] / filename
+                for code, filename in zip(codes[start:stop],
+                                          self.filenames[start:stop])]
+
+    def to_numpy(self, start=0, stop=None):
+        """
+        Convert the paths of the songs from ``start`` to ``stop`` to a numpy
+        object array of :class:`~pathlib:pathlib.Path` objects.
+        """
+        import numpy as np
+        paths = self.tolist(start, stop)
+        array_ = np.empty(len(paths), dtype=object)
+        array_[:] = paths
+        return array_
+
+
+def _column(tag):
+    if tag == _TIME:
+        return NumericColumn("d", float("nan"))
+    if tag == _MTIME:
+        return NumericColumn(_INT64, _MISSING_INT)
+    if tag == _PATH:
+        return PathColumn()
+    return StringColumn()
+
+
+class ColumnarSongs(object):
+    def __init__(self, song_type, music_dir=None):
+        """
+        A sequence of songs that is stored column by column. Indexing and
+        iterating create songs of type ``song_type`` on demand.
+
+        :param type song_type: The namedtuple type of the songs
+        :param str music_dir: The path to MPDs music directory
+        """
+        #: The type of the songs in this sequence
+        self.song_type = song_type
+        #: The path to MPDs music directory
+        self.music_dir = music_dir
+        #: An :class:`~collections.OrderedDict` mapping each tag name to
+        #: its column
+        self.columns = OrderedDict((tag, _column(tag))
+                                   for tag in song_type._fields[:-1])
+
+    def append(self, song):
+        """
+        Append ``song`` to the columns.
+
+        :param namedtuple song:
+        """
+        for column, tag in zip(self.columns.values(), self.columns):
+            column.append(getattr(song, tag))
+
+    def extend(self, other):
+        """
+        Append the songs of the :class:`ColumnarSongs` ``other``, which must
+        have the same columns.
+        """
+        for tag, column in self.columns.items():
+            column.extend(other.columns[tag])
+
+    def to_compact_songs(self):
+        """
+        Convert all songs to :class:`~mpd_pydb.db.CompactSong` objects.
+
+        :rtype: list
+        """
+        builder = _CompactSongBuilder(list(self.columns), self.music_dir)
+        paths = self.columns[_PATH]
+        columns = [(tag, column) for tag, column in self.columns.items()
+                   if tag != _PATH]
+        songs = []
+        for index in range(len(self)):
+            tags = {}
+            for tag, column in columns:
+                value = column[index]
+                if value is not None:
+                    tags[tag] = value
+            songs.append(builder.make(paths.directories[index],
+                                      paths.filenames[index], tags))
+        return songs
+
+    def __getstate__(self):
+        # song_type is created at runtime and can't be pickled
+        return {"columns": self.columns, "music_dir": self.music_dir}
+
+    def __setstate__(self, state):
+        self.columns = state["columns"]
+        self.music_dir = state["music_dir"]
+        self.song_type = _song_type(list(self.columns))
+
+    def _song(self, index):
+        return self.song_type._make([column[index]
+                                     for column in self.columns.values()] +
+                                    [self.music_dir])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._song(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("song index out of range")
+        return self._song(index)
+
+    def __iter__(self):
+        make_song = self.song_type._make
+        music_dir = repeat(self.music_dir)
+        columns = list(self.columns.values())
+        for start in range(0, len(self), _CHUNK_SIZE):
+            stop = start + _CHUNK_SIZE
+            for values in zip(*[column.tolist(start, stop)
+                                for column in columns] + [music_dir]):
+                yield make_song(values)
+
+    def __len__(self):
+        return len(self.columns[_PATH])
+
+    def project(self, tags):
+        """
+        Return a :class:`ColumnarSongs` that shares the columns of ``tags``
+        with this one.
+
+        :param [str] tags: The names of the columns
+        """
+        songs = ColumnarSongs(_song_type(list(tags)), self.music_dir)
+        songs.columns = OrderedDict((tag, self.columns[tag]) for tag in tags)
+        return songs
+
+    def to_arrays(self, tags=None, start=0, stop=None, categorical=False):
+        """
+        Convert the values of the songs from ``start`` to ``stop`` in the
+        columns of ``tags`` to numpy arrays. By default, all columns are
+        converted.
+
+        :param bool categorical: Whether to convert
+                                 :class:`StringColumn` objects to
+                                 :class:`pandas.Categorical` objects instead
+        :rtype: :class:`~collections.OrderedDict`
+        """
+        if tags is None:
+            tags = list(self.columns)
+        arrays = OrderedDict()
+        for tag in tags:
+            column = self.columns[tag]
+            if categorical and isinstance(column, StringColumn):
+                arrays[tag] = column.to_categorical(start, stop)
+            else:
+                arrays[tag] = column.to_numpy(start, stop)
+        return arrays
+
+
+def _columnar_songs(db, tags):
+    """
+    Return the songs of the database ``db`` with the tags ``tags`` as a
+    :class:`ColumnarSongs`, which shares its columns with the songs of ``db``
+    if they are columnar already.
+    """
+    songs = db.songs
+    if isinstance(songs, ColumnarSongs):
+        return songs.project(tags)
+    columnar = ColumnarSongs(_song_type(tags))
+    for song in songs:
+        columnar.append(song)
+    return columnar
+
+
+class _ColumnBuilder(_SongBuilder):
+    """
+    Appends the songs in song blocks to a :class:`ColumnarSongs` instead of
+    creating objects for them.
+    """
+    def __init__(self, tag_names, music_dir, tests=()):
+        _SongBuilder.__init__(self, tag_names, music_dir, tests)
+        self.songs = ColumnarSongs(self.song_type, music_dir)
+        columns = self.songs.columns
+        self._paths = columns[_PATH]
+        self._appenders = [(index, column.append)
+                           for index, (tag, column)
+                           in enumerate(columns.items())
+                           if tag != _PATH]
+
+    def end(self):
+        if not self._accept():
+            return
+        self._paths.append_parts(self._directory, self._filename)
+        values = self._values
+        for index, append in self._appenders:
+            append(values[index])
+        values[:] = self._empty_song
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+Compression
+===========
+
+MPD writes its database either uncompressed or, if it was built with zlib,
+gzip-compressed. :func:`open_database` detects which one a file is from its
+first bytes. Databases compressed with zstd are read as well if the
+`zstandard <https://pypi.org/project/zstandard/>`_ module is installed.
+"""
+import zlib
+
+from io import RawIOBase, open as io_open
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+# The amount of compressed data that is decompressed at once
+_READ_SIZE = 1 << 20
+# Before Python 3.3, decompressors don't tell whether they reached the end of
+# the compressed data
+_HAS_EOF = hasattr(zlib.decompressobj(), "eof")
+
+
+class _GzipStream(RawIOBase):
+    """
+    A raw stream of the decompressed contents of a gzip file.
+    :class:`gzip.GzipFile` decompresses in small blocks with a Python method
+    call per block, this decompresses 1 MiB of input at once.
+    """
+    def __init__(self, filename):
+        self._file = io_open(filename, "rb")
+        self._decompressor = self._new_decompressor()
+        self._buffer = b""
+        self._offset = 0
+
+    @staticmethod
+    def _new_decompressor():
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def readable(self):
+        return True
+
+    @staticmethod
+    def _ended(decompressor):
+        """
+        Return whether ``decompressor`` reached the end of its gzip member.
+        """
+        if _HAS_EOF:
+            return decompressor.eof
+        # Input after the end of a member ends up in unused_data, so the
+        # member ended if a probe does
+        if decompressor.unused_data:
+            return True
+        try:
+            decompressor.decompress(b"\0")
+        except zlib.error:
+            return False
+        return bool(decompressor.unused_data)
+
+    def _fill(self):
+        """
+        Decompress the next block, return ``False`` at the end of the file.
+        """
+        decompressor = self._decompressor
+        data = decompressor.unconsumed_tail
+        if not data:
+            if decompressor.unused_data:
+                # The member ended and another one follows
+                data = decompressor.unused_data
+                decompressor = self._decompressor = self._new_decompressor()
+            else:
+                data = self._file.read(_READ_SIZE)
+                if not data:
+                    if not self._ended(decompressor):
+                        raise EOFError("The gzip stream ended unexpectedly")
+                    return False
+        self._buffer = decompressor.decompress(data, _READ_SIZE * 8)
+        self._offset = 0
+        return True
+
+    def readinto(self, buffer):
+        while self._offset >= len(self._buffer):
+            if not self._fill():
+                return 0
+        size = min(len(buffer), len(self._buffer) - self._offset)
+        buffer[:size] = self._buffer[self._offset:self._offset + size]
+        self._offset += size
+        return size
+
+    def readall(self):
+        chunks = [self._buffer[self._offset:]]
+        self._buffer = b""
+        while self._fill():
+            chunks.append(self._buffer)
+        self._buffer = b""
+        return b"".join(chunks)
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        RawIOBase.close(self)
+
+
+def _open_zstd(filename):
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("{filename} is compressed with zstd, which needs "
+                         "the zstandard module".format(filename=filename))
+    return zstandard.ZstdDecompressor().stream_reader(io_open(filename, "rb"),
+                                                      closefd=True)
+
+
+def open_database(filename):
+    """
+    Open the database in ``filename`` for reading its uncompressed contents.
+
+    :param str filename: The path to a plain, gzip- or zstd-compressed
+                         database file
+    :return: An unbuffered binary file object
+    :raises ValueError: If the file is compressed with zstd and the zstandard
+                        module is not installed
+    """
+    with io_open(filename, "rb") as db_file:
+        magic = db_file.read(len(_ZSTD_MAGIC))
+    if magic.startswith(_GZIP_MAGIC):
+        return _GzipStream(filename)
+    if magic == _ZSTD_MAGIC:
+        return _open_zstd(filename)
+    return io_open(filename, "rb", buffering=0)
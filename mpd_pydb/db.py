@@ -6,26 +6,146 @@
 MPD PyDB
 ========
 """
-from collections import namedtuple
-from gzip import open
+import gc
+import re
+
+from collections import namedtuple, OrderedDict
+from contextlib import contextmanager
+from io import BufferedReader
+from itertools import islice
 from pathlib import Path
+from operator import attrgetter
 from os.path import join
 from sys import version_info
 
+from .compression import open_database
+from .stats import _NO_STATS
+
 _SUPPORTED_FORMAT_VERSION = 2
-_DIRECTORY_BEGIN = "begin"
-_DIRECTORY_END = "end"
-_FORMAT = "format"
-_INFO_END = "info_end"
-_MPD_VERSION = "mpd_version"
+_BUFFER_SIZE = 1 << 16
+_DIRECTORY_BEGIN = b"begin"
+_DIRECTORY_END = b"end"
+_FORMAT = b"format"
+_INFO_END = b"info_end"
+_MPD_VERSION = b"mpd_version"
+_SONG_BEGIN = b"song_begin"
+_SONG_END = b"song_end"
+_TAG = b"tag"
+
 _MTIME = "mtime"
-_SONG_BEGIN = "song_begin"
-_SONG_END = "song_end"
-_TAG = "tag"
+_PATH = "path"
 _TIME = "Time"
 
 _PY2 = version_info < (3,)
 
+# Whether the songs in a directory can match a query, ordered from most to
+# least selective. No song in the directory or its subdirectories can match:
+_SKIP = 0
+# Only songs whose paths are checked individually can match:
+_CHECK = 1
+# All songs in the directory and its subdirectories can match:
+_MATCH = 2
+
+
+def _decode(value):
+    return value.strip().decode("utf-8")
+
+
+_CONVERTERS = {_MTIME: int, _TIME: float}
+# Matches whole values only, \Z because Python 2 has no re.fullmatch
+_NUMBER_RE = re.compile(r"\s*(\d*)\s*(?:/\s*(\d*))?\s*\Z")
+# The columns to_dataframe splits Disc and Track into
+_NUMBER_COLUMNS = ("Disc", "TotalDiscs", "TotalTracks", "Track")
+# The dtypes used for them by to_dataframe(compact=True) and the largest value
+# each one can hold
+_SMALL_INTEGERS = (("UInt8", (1 << 8) - 1), ("UInt16", (1 << 16) - 1),
+                   ("UInt32", (1 << 32) - 1), ("UInt64", (1 << 64) - 1))
+
+
+def _open(filename):
+    """
+    Open the database in ``filename`` for reading its uncompressed contents.
+
+    :param filename: The path to the database file or a binary file object
+                     containing an uncompressed database
+    """
+    if hasattr(filename, "read"):
+        return filename
+    return open_database(filename)
+
+
+def _project(supported_tags, tags):
+    """
+    Return the tags in ``supported_tags`` that are also in ``tags``, in the
+    order of ``supported_tags``. ``path`` is always included because it
+    identifies songs. If ``tags`` is ``None``, all supported tags are
+    returned.
+
+    :raises ValueError: If a tag in ``tags`` is not supported
+    """
+    if tags is None:
+        return list(supported_tags)
+    tags = set(tags)
+    unsupported = tags.difference(supported_tags)
+    if unsupported:
+        raise ValueError("{tags} are not supported tags".
+                         format(tags=", ".join(sorted(unsupported))))
+    tags.add(_PATH)
+    return [tag for tag in supported_tags if tag in tags]
+
+
+def _join(directory, filename):
+    """
+    Join the path of a song inside of MPDs music directory from its directory
+    and filename.
+    """
+    if _PY2 and isinstance(filename, bytes):
+        # See _filename
+        filename = filename.decode("utf-8")
+    if directory is None:
+        return filename
+    return directory + "/" + filename
+
+
+@contextmanager
+def _gc_paused():
+    """
+    Disable the cyclic garbage collector while songs are loaded in bulk.
+    Creating millions of songs triggers lots of full collections, none of
+    which can free anything.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _posix(path):
+    """
+    Return ``path`` as a string with forward slashes, which is unicode on
+    Python 2 as well.
+    """
+    path = path.as_posix()
+    if _PY2 and isinstance(path, bytes):
+        path = path.decode("utf-8")
+    return path
+
+
+def _filename(value):
+    # Python 2's pathlib joins byte strings with unicode directories, so the
+    # filename is only decoded when keys are built from it
+    if _PY2:
+        return value.strip()
+    return _decode(value)
+
+
+#: The changes made by :meth:`Database.update_from`. ``added`` and ``removed``
+#: are lists of songs, ``modified`` is a list of ``(old, new)`` song tuples.
+DatabaseDiff = namedtuple("DatabaseDiff", ["added", "removed", "modified"])
+
 
 class Database(object):
     def __init__(self, format_version, mpd_version, supported_tags, songs=None):
@@ -50,10 +170,17 @@ class Database(object):
         self.format_version = format_version
         #: The version of MPD that created this database
         self.mpd_version = mpd_version
-        #: A :class:`list` of songs in this database
-        self.songs = songs or []
+        #: A :class:`list` of songs in this database, or a
+        #: :class:`~mpd_pydb.columnar.ColumnarSongs` if it was read with
+        #: ``columnar=True``
+        self.songs = songs if songs is not None else []
         #: A :class:`list` containing the names of all supported tags
         self.supported_tags = supported_tags
+        # The arguments of read_file, used by refresh
+        self._source = None
+        self._indexes = {}
+        self._aggregates = {}
+        self._text_index = None
 
     def add_song(self, song):
         """
@@ -62,97 +189,518 @@ class Database(object):
         :param namedtuple song:
         """
         self.songs.append(song)
+        for index in self._indexes.values():
+            index.add(song)
+        for aggregate in self._aggregates.values():
+            aggregate.add(song)
+        if self._text_index is not None:
+            self._text_index.add(song)
+
+    def create_index(self, tag):
+        """
+        Create an index for ``tag`` if there is none yet, see
+        :mod:`mpd_pydb.index`.
+
+        :param str tag: The name of a supported tag
+        :rtype: :class:`~mpd_pydb.index.HashIndex` or
+                :class:`~mpd_pydb.index.SortedIndex`
+        :raises ValueError: If ``tag`` is not supported
+        """
+        index = self._indexes.get(tag)
+        if index is None:
+            if tag not in self.supported_tags:
+                raise ValueError("{tag} is not a supported tag".
+                                 format(tag=tag))
+            from .index import create_index
+            index = self._indexes[tag] = create_index(tag, self.songs)
+        return index
+
+    def aggregate(self, name):
+        """
+        Return the aggregate ``name``, see :mod:`mpd_pydb.aggregate`. It is
+        created on first use.
+
+        :param str name: ``album``, ``artist``, ``genre`` or ``directory``
+        :rtype: :class:`~mpd_pydb.aggregate.Aggregate`
+        :raises ValueError: If ``name`` is not an aggregate or the tags it
+                            needs are not supported
+        """
+        aggregate = self._aggregates.get(name)
+        if aggregate is None:
+            self._create_aggregates([name])
+            aggregate = self._aggregates[name]
+        return aggregate
+
+    def _create_aggregates(self, names):
+        from .aggregate import create_aggregates
+        names = [name for name in names if name not in self._aggregates]
+        for aggregate in create_aggregates(names, self.supported_tags,
+                                           self.songs):
+            self._aggregates[aggregate.name] = aggregate
+
+    def create_text_index(self, tags=None, background=False):
+        """
+        Create an index for searching the values of ``tags`` if there is none
+        for them yet, see :mod:`mpd_pydb.search`. It replaces the text index
+        of other tags.
+
+        :param tags: The names of the tags to index. By default, the
+                     supported ones of :data:`~mpd_pydb.search.SEARCH_TAGS`
+                     are indexed.
+        :param bool background: Whether to build the index in a background
+                                thread. Its lookups wait until it is built.
+        :rtype: :class:`~mpd_pydb.search.TextIndex`
+        :raises ValueError: If a tag in ``tags`` is not supported
+        """
+        from .search import SEARCH_TAGS, TextIndex
+        if tags is None:
+            tags = [tag for tag in SEARCH_TAGS if tag in self.supported_tags]
+        else:
+            unsupported = set(tags).difference(self.supported_tags)
+            if unsupported:
+                raise ValueError("{tags} are not supported tags".
+                                 format(tags=", ".join(sorted(unsupported))))
+        index = self._text_index
+        if index is None or index.tags != tuple(tags):
+            index = self._text_index = TextIndex(self.songs, tags, background)
+        return index
+
+    def find(self, tag, value):
+        """
+        Return all songs whose ``tag`` has the value ``value``. An index for
+        ``tag`` is created on first use.
+
+        :param str tag: The name of a supported tag
+        :param value:
+        :rtype: list
+        """
+        return self.create_index(tag).find(value)
+
+    def find_range(self, tag, minimum=None, maximum=None):
+        """
+        Return all songs whose ``tag`` has a value between ``minimum`` and
+        ``maximum`` (both inclusive), ordered by that value. ``None`` means
+        there is no lower or upper limit. An index for ``tag`` is created on
+        first use.
+
+        :param str tag: ``Time`` or ``mtime``
+        :rtype: list
+        :raises ValueError: If ``tag`` can't be used for range queries
+        """
+        if tag not in (_TIME, _MTIME):
+            raise ValueError("Range queries are only supported for Time and "
+                             "mtime")
+        return self.create_index(tag).range(minimum, maximum)
+
+    def select(self, *predicates):
+        """
+        Return all songs that match all ``predicates``, see
+        :mod:`mpd_pydb.query`. If there is an index for the tag of a
+        :class:`~mpd_pydb.query.TagEquals` predicate, only the songs found in
+        it are checked.
+
+        :rtype: list
+        """
+        from .query import TagEquals, select
+        songs = self.songs
+        for predicate in predicates:
+            if (isinstance(predicate, TagEquals) and
+                    predicate.tag in self._indexes):
+                songs = self._indexes[predicate.tag].find(predicate.value)
+                break
+        return select(songs, predicates)
+
+    def song_at(self, path):
+        """
+        Return the song at ``path`` or ``None`` if there is none. An index of
+        all paths is created on first use.
+
+        :param path: The path of the song inside of MPDs music directory
+        :type path: str or :class:`~pathlib:pathlib.Path`
+        """
+        if isinstance(path, Path):
+            path = _posix(path)
+        songs = self.create_index(_PATH).find(path)
+        return songs[0] if songs else None
+
+    def update_from(self, filename, music_dir=None, compact=False):
+        """
+        Update the songs of this DB to the ones in the database in
+        ``filename``.
+
+        Only songs that are new or whose ``mtime`` changed are parsed, all
+        other songs are kept as they are. If the supported tags differ, all
+        songs are parsed again.
+
+        :param str filename: The path to the database file
+        :param str music_dir: The path to MPDs music directory
+        :param bool compact: Whether to create :class:`CompactSong` objects
+                             for new and modified songs
+        :rtype: :class:`DatabaseDiff`
+        :raises TypeError: If the songs of this DB are not stored in a list
+        """
+        if not isinstance(self.songs, list):
+            raise TypeError("Only databases whose songs are stored in a list "
+                            "can be updated")
+
+        with _gc_paused(), SongReader(filename, music_dir,
+                                      database_class=type(self),
+                                      compact=compact) as reader:
+            old_songs = OrderedDict((_song_key(song), song)
+                                    for song in self.songs)
+            if reader.supported_tags == self.supported_tags:
+                mtimes = {key: song.mtime for key, song in old_songs.items()}
+            else:
+                mtimes = {}
+
+            songs = []
+            added = []
+            modified = []
+            for key, song in reader._read_changes(mtimes):
+                old_song = old_songs.pop(key, None)
+                if song is None:
+                    song = old_song
+                elif old_song is None:
+                    added.append(song)
+                else:
+                    modified.append((old_song, song))
+                songs.append(song)
+
+            self.mpd_version = reader.mpd_version
+            self.supported_tags = reader.supported_tags
+            self.songs[:] = songs
+            self._update_indexes(added, list(old_songs.values()), modified)
+
+        self._source = (filename, music_dir, compact)
+        return DatabaseDiff(added, list(old_songs.values()), modified)
+
+    def _update_indexes(self, added, removed, modified):
+        # Aggregates are updated just like indexes
+        for index in (list(self._indexes.values()) +
+                      list(self._aggregates.values())):
+            for song in removed:
+                index.remove(song)
+            for old_song, song in modified:
+                index.remove(old_song)
+                index.add(song)
+            for song in added:
+                index.add(song)
+        if self._text_index is not None:
+            # The text index refers to songs by their positions, which can
+            # change even if no song changed
+            from .search import TextIndex
+            self._text_index = TextIndex(self.songs, self._text_index.tags)
+
+    def refresh(self):
+        """
+        Update this DB from the file it was read from, see
+        :meth:`update_from`.
+
+        :rtype: :class:`DatabaseDiff`
+        :raises ValueError: If this DB was not read from a file or only
+                            contains some of its songs
+        """
+        if self._source is None:
+            raise ValueError("This database was not read completely from a "
+                             "file")
+        return self.update_from(*self._source)
 
     @classmethod
-    def read_file(cls, filename, music_dir=None):
+    def iter_songs(cls, filename, music_dir=None, compact=False, where=None,
+                   tags=None, stats=None):
+        """
+        Iterate over the songs in the database in ``filename`` without reading
+        the whole file into memory first.
+
+        The header of the database is parsed immediately, so the
+        :attr:`~SongReader.format_version`, :attr:`~SongReader.mpd_version`
+        and :attr:`~SongReader.supported_tags` attributes of the returned
+        object are available before the first song is read.
+
+        :param str filename: The path to the database file
+        :param str music_dir: The path to MPDs music directory
+        :param bool compact: Whether to return :class:`CompactSong` objects
+                             instead of namedtuples
+        :param where: Only return the songs that match all of these
+                      predicates, see :mod:`mpd_pydb.query`
+        :param tags: The names of the tags the songs should have. ``path`` is
+                     always included. By default, songs have all supported
+                     tags.
+        :param stats: A :class:`~mpd_pydb.stats.LoadStats` object that the
+                      sizes of the database file and the time spent
+                      decompressing it are added to
+        :rtype: :class:`SongReader`
+        """
+        return SongReader(filename, music_dir, database_class=cls,
+                          compact=compact, where=where, tags=tags,
+                          stats=stats)
+
+    @classmethod
+    def read_file(cls, filename, music_dir=None, compact=False,
+                  columnar=False, cache_dir=None, indexes=(), where=None,
+                  tags=None, workers=None, stats=None, lazy=False,
+                  aggregates=()):
         """
         Read the database in ``filename``.
 
         :param str filename: The path to the database file
         :param str music_dir: The path to MPDs music directory
+        :param bool compact: Whether to store the songs as
+                             :class:`CompactSong` objects, which need a lot
+                             less memory than the default namedtuples
+        :param bool columnar: Whether to store the songs in a
+                              :class:`~mpd_pydb.columnar.ColumnarSongs`
+                              instead of a list
+        :param str cache_dir: A directory in which the parsed database is
+                              cached, see :mod:`mpd_pydb.cache`
+        :param indexes: The names of the tags to create indexes for, see
+                        :meth:`create_index`
+        :param where: Only read the songs that match all of these predicates,
+                      see :mod:`mpd_pydb.query`
+        :param tags: The names of the tags to read. ``path`` is always
+                     included. Other tags are skipped without decoding them.
+                     By default, all supported tags are read.
+        :param int workers: The number of processes that parse the database
+                            in parallel, see :mod:`mpd_pydb.parallel`
+        :param stats: A :class:`~mpd_pydb.stats.LoadStats` object that
+                      statistics about reading the database are added to
+        :param bool lazy: Whether to only parse songs when they are accessed,
+                          see :mod:`mpd_pydb.lazy`
+        :param aggregates: The names of the aggregates to create in one pass
+                           over the songs, see :meth:`aggregate`
+        :raises ValueError: If both ``compact`` and ``columnar`` or both
+                            ``cache_dir`` and ``where`` are set, or if
+                            ``lazy`` is set together with ``compact``,
+                            ``columnar``, ``cache_dir``, ``where`` or
+                            ``workers``
         """
-        current_directory = None
-        current_song = None
-        current_song_tags = {}
-        db = None
-        format = 0
-        mpd_version = None
-        song_type = None
-        tag_names = ["Time", "mtime", "path"]
-
-        with open(filename, "r") as db_file:
-            for line in db_file.readlines():
-                split_line = line.decode("utf-8").strip().split(":", 1)
-
-                key = split_line[0]
-                if key == _INFO_END:
-                    db = cls(format, mpd_version, tag_names)
-
-                    class Song(namedtuple("Song",
-                                          tag_names + ["music_dir_"])):
-                        def __fspath__(self):
-                            if self.music_dir_ is None:
-                                raise NotImplementedError
-
-                            return join(self.music_dir_, str(self.path))
-
-                    song_type = Song
-                elif key == _DIRECTORY_END:
-                    current_directory = current_directory.parent
-                elif key == _SONG_BEGIN:
-                    current_song_tags = {tag: None for tag in tag_names}
-                elif key == _SONG_END:
-                    current_song = song_type(music_dir_=music_dir,
-                                             **current_song_tags)
-                    db.add_song(current_song)
+        if compact and columnar:
+            raise ValueError("compact and columnar can't be used together")
+        if cache_dir is not None and where is not None:
+            raise ValueError("cache_dir and where can't be used together")
+        if lazy and (compact or columnar or cache_dir is not None or
+                     where is not None or workers is not None):
+            raise ValueError("lazy can't be used together with compact, "
+                             "columnar, cache_dir, where or workers")
 
-                if len(split_line) == 1:
-                    # info_begin or info_end
-                    continue
+        if stats is None:
+            stats = _NO_STATS
+        with stats.tracing():
+            if cache_dir is not None:
+                from .cache import read_cached
+                db = read_cached(cls, filename, cache_dir, music_dir, compact,
+                                 columnar, tags, workers, stats)
+            elif lazy:
+                from .lazy import read_lazy
+                with stats.parsing():
+                    db = read_lazy(cls, filename, music_dir, tags, stats)
+            else:
+                db = cls._read(filename, music_dir, compact, columnar, where,
+                               tags, workers, stats)
 
-                value = split_line[1].strip()
-                if key == _TAG:
-                    tag_names.append(value)
-                elif key == _FORMAT:
-                    format = int(value)
-                elif key == _MPD_VERSION:
-                    mpd_version = value
-                elif key == _DIRECTORY_BEGIN:
-                    current_directory = Path(value)
-                elif key == _SONG_BEGIN:
-                    if _PY2:
-                        filename = value.encode("utf-8")
-                    else:
-                        filename = value
-                    if current_directory is not None:
-                        current_song_tags["path"] = (current_directory /
-                                                     filename)
-                    else:
-                        # Songs in MPDs music root are not in any directory
-                        current_song_tags["path"] = Path(filename)
-                elif key == _TIME:
-                    current_song_tags[key] = float(value)
-                elif key == _MTIME:
-                    current_song_tags[key] = int(value)
-                elif key in tag_names:
-                    current_song_tags[key] = value
+            if indexes:
+                with stats.phase("index"):
+                    for tag in indexes:
+                        db.create_index(tag)
+            if aggregates:
+                with stats.phase("aggregate"):
+                    db._create_aggregates(aggregates)
+        stats.loaded(db)
+        return db
+
+    @classmethod
+    def _read(cls, filename, music_dir, compact, columnar, where, tags,
+              workers, stats):
+        if workers is not None and workers > 1:
+            from .parallel import read_parallel
+            return read_parallel(cls, filename, workers, music_dir, compact,
+                                 columnar, where, tags, stats)
+        return cls._read_file(filename, music_dir, compact, columnar, where,
+                              tags, stats)
+
+    @classmethod
+    def watch(cls, filename, **kwargs):
+        """
+        Read the database in ``filename`` and keep it up to date with the
+        file in a background thread, see :mod:`mpd_pydb.watch`.
+
+        :param kwargs: Passed on to
+                       :class:`~mpd_pydb.watch.DatabaseWatcher`
+        :rtype: :class:`~mpd_pydb.watch.DatabaseWatcher`
+        """
+        from .watch import DatabaseWatcher
+        return DatabaseWatcher(cls, filename, **kwargs).start()
+
+    @classmethod
+    def aread_file(cls, filename, executor=None, **kwargs):
+        """
+        Read the database in ``filename`` in ``executor`` without blocking the
+        event loop, see :mod:`mpd_pydb.aio`::
+
+            db = await Database.aread_file(filename)
+
+        The other parameters are the same as the ones of :meth:`read_file`.
+
+        :param executor: The :class:`concurrent.futures.Executor` to read the
+                         database in. By default, the default executor of the
+                         event loop is used.
+        :rtype: :class:`asyncio.Future`
+        """
+        from .aio import aread_file
+        return aread_file(cls, filename, executor, **kwargs)
+
+    @classmethod
+    def aiter_songs(cls, filename, executor=None, **kwargs):
+        """
+        Asynchronously iterate over the songs in the database in
+        ``filename``, see :mod:`mpd_pydb.aio`::
+
+            async for song in Database.aiter_songs(filename):
+                ...
+
+        The other parameters are the same as the ones of :meth:`iter_songs`
+        and :class:`~mpd_pydb.aio.AsyncSongReader`.
+
+        :param executor: The thread pool to read songs in. By default, the
+                         default executor of the event loop is used.
+        :rtype: :class:`~mpd_pydb.aio.AsyncSongReader`
+        """
+        from .aio import AsyncSongReader
+        return AsyncSongReader(cls, filename, executor, **kwargs)
+
+    @classmethod
+    def _read_file(cls, filename, music_dir, compact, columnar, where, tags,
+                   stats):
+        with _gc_paused(), stats.parsing(), \
+                cls.iter_songs(filename, music_dir, compact, where, tags,
+                               stats) as reader:
+            db = reader.database
+            if columnar:
+                db.songs = reader._read_columns()
+            else:
+                for song in reader:
+                    db.add_song(song)
+                if where is None and tags is None:
+                    db._source = (filename, music_dir, compact)
 
         return db
 
+    def _records_to_dataframe(self, songs, tags):
+        import pandas as pd
+        if tags != self.supported_tags:
+            return pd.DataFrame(OrderedDict((tag, list(map(attrgetter(tag),
+                                                           songs)))
+                                            for tag in tags),
+                                columns=tags)
+        # Songs read from a file have an additional music_dir_ field
+        columns = getattr(songs[0], "_fields", None) if songs else None
+        if songs and not isinstance(songs[0], tuple):
+            # CompactSong objects
+            songs = [tuple(song) for song in songs]
+        elif not isinstance(songs, list):
+            # Older pandas versions only accept lists of tuples, not other
+            # sequences like LazySongs
+            songs = list(songs)
+        df = pd.DataFrame.from_records(songs,
+                                       columns=columns or self.supported_tags)
+        return df[self.supported_tags]
+
     @staticmethod
-    def _extract(series, index):
-        def extractor(value):
-            if value is None:
-                return value
-            if "/" not in value:
-                if index == 0:
-                    return value
-                else:
-                    return None
-            return int(value.split("/", 1)[index])
-        return series.apply(extractor)
+    def _split_numbers(series):
+        """
+        Split values like ``1/12`` in ``series`` into the number and the total
+        and return both as nullable integer series. Both are missing for
+        values that don't have this form.
+
+        Track and disc numbers repeat a lot, so each distinct value is only
+        parsed once.
+        """
+        import pandas as pd
+        codes, uniques = pd.factorize(series)
+        numbers = [[], []]
+        for value in uniques:
+            match = _NUMBER_RE.match(value)
+            groups = match.groups() if match is not None else (None, None)
+            for index, number in enumerate(groups):
+                numbers[index].append(int(number) if number else None)
+        # The code of missing values is -1, which picks the trailing None
+        return [pd.Series(pd.array(values + [None], dtype="Int64").take(codes),
+                          index=series.index)
+                for values in numbers]
 
-    def to_dataframe(self):
+    def _dataframe(self, songs, tags, start=0, stop=None, compact=False,
+                   stats=_NO_STATS):
+        """
+        Convert ``songs[start:stop]`` to a DataFrame with the columns ``tags``
+        and split ``Disc`` and ``Track``.
+        """
+        import pandas as pd
+        with stats.phase("dataframe"):
+            to_arrays = getattr(songs, "to_arrays", None)
+            if to_arrays is not None:
+                df = pd.DataFrame(to_arrays(tags, start, stop, compact),
+                                  columns=tags)
+                if _PY2:
+                    # Like the fields of namedtuples, which are the columns
+                    # of the other DataFrames
+                    df.columns = [str(tag) for tag in tags]
+            else:
+                if start or stop is not None:
+                    songs = songs[start:stop]
+                df = self._records_to_dataframe(songs, tags)
+
+            # pandas can't infer a dtype for columns in which all values are
+            # missing. Use the one of columns with values, so DataFrames of
+            # different songs can be concatenated.
+            string_dtype = pd.Series([""]).dtype
+            for tag in tags:
+                if (tag != _PATH and df[tag].dtype == object and
+                        df[tag].isna().all()):
+                    df[tag] = df[tag].astype(float if tag in (_TIME, _MTIME)
+                                             else string_dtype)
+
+        # Assign the columns one by one so their order is the same across
+        # all Python and pandas versions: Track and Disc are replaced in
+        # place, TotalDiscs and TotalTracks are appended. The DataFrame was
+        # just created, so it can be modified in place instead of copying it
+        # with assign.
+        with stats.phase("split_numbers"):
+            totals = OrderedDict()
+            for tag, total in (("Track", "TotalTracks"),
+                               ("Disc", "TotalDiscs")):
+                if tag in df:
+                    df[tag], totals[total] = self._split_numbers(df[tag])
+            for total in sorted(totals):
+                df[total] = totals[total]
+        if compact:
+            with stats.phase("compact"):
+                self._compact_dataframe(df)
+        return df
+
+    @staticmethod
+    def _compact_dataframe(df):
+        """
+        Convert the columns of ``df`` to the dtypes of
+        ``to_dataframe(compact=True)`` in place.
+        """
+        import pandas as pd
+        for column in df.columns:
+            values = df[column]
+            if column == _TIME:
+                df[column] = values.astype("float32")
+            elif column == _MTIME:
+                df[column] = pd.to_datetime(values, unit="s", utc=True)
+            elif column in _NUMBER_COLUMNS:
+                maximum = values.max()
+                for dtype, limit in _SMALL_INTEGERS:
+                    if pd.isna(maximum) or maximum <= limit:
+                        df[column] = values.astype(dtype)
+                        break
+            elif (column != _PATH and
+                  not isinstance(values.dtype, pd.CategoricalDtype)):
+                df[column] = values.astype("category")
+
+    def to_dataframe(self, tags=None, compact=False, stats=None):
         """
         Convert this database to a pandas DataFrame. In addition to the tags
         already loaded, the two columns ``TotalDiscs`` and ``TotalTracks`` will
@@ -161,20 +709,704 @@ class Database(object):
         information about the total amount of discs and tracks after the
         conversion.
 
+        All four columns are nullable integers. Values that are not a number
+        or a number and a total separated by ``/``, like ``A1`` on vinyl or
+        ``1 of 12``, are missing (``<NA>``) in both columns.
+
+        :param tags: The names of the tags to convert. ``path`` is always
+                     included. ``TotalDiscs`` and ``TotalTracks`` are only
+                     added if ``Disc`` and ``Track`` are converted. By default,
+                     all supported tags are converted.
+        :param bool compact: Whether to use dtypes that need less memory:
+                             ``category`` for all tags except ``path``,
+                             ``Time`` and the numbers, ``float32`` for
+                             ``Time``, ``datetime64`` (UTC) for ``mtime`` and
+                             the smallest nullable unsigned integer type that
+                             fits ``Disc``, ``Track``, ``TotalDiscs`` and
+                             ``TotalTracks``
+        :param stats: A :class:`~mpd_pydb.stats.LoadStats` object that the
+                      time spent converting is added to
         :rtype: :class:`~pd:pandas.DataFrame`
 
         """
+        if stats is None:
+            stats = _NO_STATS
+        with stats.tracing():
+            return self._dataframe(self.songs,
+                                   _project(self.supported_tags, tags),
+                                   compact=compact, stats=stats)
+
+    def iter_dataframes(self, chunksize, tags=None, compact=False):
+        """
+        Convert this database to pandas DataFrames of at most ``chunksize``
+        songs each. The DataFrames have the same columns as the one returned
+        by :meth:`to_dataframe`, and their indices continue where the one of
+        the previous DataFrame ended.
+
+        Use :meth:`SongReader.iter_dataframes` to convert a database file
+        without reading all of its songs first.
+
+        :param int chunksize: The maximum number of songs per DataFrame
+        :param tags: The names of the tags to convert, see
+                     :meth:`to_dataframe`
+        :param bool compact: Whether to use the dtypes of
+                             ``to_dataframe(compact=True)``. The categories of
+                             each DataFrame only contain the values of its
+                             songs unless the database is columnar.
+        :raises ValueError: If ``chunksize`` is less than 1
+        """
+        if chunksize < 1:
+            raise ValueError("chunksize must be at least 1")
+        tags = _project(self.supported_tags, tags)
+        return self._iter_dataframes(chunksize, tags, compact)
+
+    def _iter_dataframes(self, chunksize, tags, compact):
+        import pandas as pd
+        for start in range(0, len(self.songs), chunksize):
+            df = self._dataframe(self.songs, tags, start, start + chunksize,
+                                 compact)
+            df.index = pd.RangeIndex(start, start + len(df))
+            yield df
+
+    def write_file(self, filename, compression=None):
+        """
+        Write this database to ``filename`` in MPDs format, see
+        :mod:`mpd_pydb.writer`.
+
+        :param filename: The path to the database file or a binary file
+                         object
+        :param str compression: ``gzip``, ``zstd`` or ``plain``. By default,
+                                it depends on the extension of
+                                ``filename``.
+        :raises ValueError: If ``compression`` is not supported
+        """
+        from .writer import write_file
+        write_file(self, filename, compression)
+
+    def to_arrow(self, tags=None):
+        """
+        Convert this database to a :class:`pyarrow.Table`, see
+        :mod:`mpd_pydb.arrow`. Unlike :meth:`to_dataframe`, ``Disc`` and
+        ``Track`` are not split.
+
+        :param tags: The names of the tags to convert. ``path`` is always
+                     included. By default, all supported tags are converted.
+        :rtype: :class:`pyarrow.Table`
+        """
+        from .arrow import to_arrow
+        return to_arrow(self, tags)
+
+    def to_parquet(self, filename, tags=None, **kwargs):
+        """
+        Write this database to the Parquet file ``filename``, see
+        :mod:`mpd_pydb.arrow`.
+
+        :param tags: The names of the tags to write, see :meth:`to_arrow`
+        :param kwargs: Passed on to :func:`pyarrow.parquet.write_table`
+        """
+        from .arrow import to_parquet
+        to_parquet(self, filename, tags, **kwargs)
+
+    @classmethod
+    def from_arrow(cls, table, music_dir=None, compact=False, columnar=False,
+                   tags=None):
+        """
+        Create a database from a :class:`pyarrow.Table` created by
+        :meth:`to_arrow`.
+
+        The other parameters are the same as the ones of :meth:`read_file`.
+        """
+        from .arrow import from_arrow
+        return from_arrow(cls, table, music_dir, compact, columnar, tags)
+
+    @classmethod
+    def from_parquet(cls, filename, music_dir=None, compact=False,
+                     columnar=False, tags=None):
+        """
+        Read a database from a Parquet file written by :meth:`to_parquet`.
+
+        The other parameters are the same as the ones of :meth:`read_file`.
+        """
+        from .arrow import from_parquet
+        return from_parquet(cls, filename, music_dir, compact, columnar, tags)
+
+    def to_shared(self, filename, tags=None):
+        """
+        Write this database to ``filename`` so that other processes can open
+        it with :meth:`from_shared` without parsing it, see
+        :mod:`mpd_pydb.shared`.
+
+        :param tags: The names of the tags to write. ``path`` is always
+                     included. By default, all supported tags are written.
+        """
+        from .shared import to_shared
+        to_shared(self, filename, tags)
+
+    @classmethod
+    def from_shared(cls, filename, music_dir=None, tags=None):
+        """
+        Open a database written by :meth:`to_shared`. The file is mapped into
+        memory read-only and shared with all other processes that opened it,
+        see :mod:`mpd_pydb.shared`.
+
+        The other parameters are the same as the ones of :meth:`read_file`.
+        """
+        from .shared import from_shared
+        return from_shared(cls, filename, music_dir, tags)
+
+
+class CompactSong(object):
+    """
+    A song that stores its tags more compactly than the default
+    :func:`~collections.namedtuple` songs do:
+
+    * The directory of a song is shared with all other songs in the same
+      directory and its :attr:`path` is only built when it's first accessed.
+    * Tag values are interned, so each distinct value is only stored once.
+    * Tags that are not set on a song do not take up any space. They are
+      ``None`` when accessed, just like on the default songs.
+
+    Attribute access, iteration and :func:`os.fspath` work like they do on the
+    default songs.
+    """
+    __slots__ = ("_directory", "_filename", "_slots", "_values", "_path")
+
+    #: The names of all fields of this song
+    _fields = ()
+    #: The path to MPDs music directory
+    music_dir_ = None
+
+    def __init__(self, directory, filename, slots, values):
+        """
+        :param str directory: The directory of this song, ``None`` for songs
+                              in MPDs music root
+        :param str filename: The filename of this song
+        :param dict slots: A mapping of tag names to indices in ``values``
+        :param tuple values: The values of all tags that are set on this song
+        """
+        self._directory = directory
+        self._filename = filename
+        self._slots = slots
+        self._values = values
+
+    @property
+    def path(self):
+        """
+        The path to the file inside of MPDs music directory.
+        """
+        try:
+            return self._path
+        except AttributeError:
+            if self._directory is None:
+                path = Path(self._filename)
+            else:
+                path = Path(self._directory) / self._filename
+            self._path = path
+            return path
+
+    def __getattr__(self, name):
+        # Only called if ``name`` is not one of the slots or properties
+        if name.startswith("__") or name == "_slots":
+            # copy and pickle look up special methods on songs whose slots
+            # aren't set yet
+            raise AttributeError(name)
+        slots = self._slots
+        if name in slots:
+            return self._values[slots[name]]
+        if name in self._fields:
+            return None
+        raise AttributeError(name)
+
+    def __fspath__(self):
+        if self.music_dir_ is None:
+            raise NotImplementedError
+
+        return join(self.music_dir_, str(self.path))
+
+    def _asdict(self):
+        return OrderedDict(zip(self._fields, self))
+
+    def __iter__(self):
+        for name in self._fields:
+            yield getattr(self, name)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __getitem__(self, index):
+        return tuple(self)[index]
+
+    def __eq__(self, other):
+        try:
+            return tuple(self) == tuple(other)
+        except TypeError:
+            return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return "{name}({fields})".format(
+            name=type(self).__name__,
+            fields=", ".join("{0}={1!r}".format(name, value)
+                             for name, value in zip(self._fields, self)))
+
+
+def _song_key(song):
+    """
+    Return the path of ``song`` inside of MPDs music directory as a string.
+    """
+    if isinstance(song, CompactSong):
+        return _join(song._directory, song._filename)
+    return _posix(song.path)
+
+
+def _missing(tag_names, tests):
+    """
+    Return the tags of ``tests`` that are not in ``tag_names``.
+    """
+    missing = []
+    for tag, _ in tests:
+        if tag not in tag_names and tag not in missing:
+            missing.append(tag)
+    return missing
+
+
+def _song_type(tag_names):
+    """
+    Create the namedtuple type of songs with the tags in ``tag_names``.
+    """
+    class Song(namedtuple("Song", tag_names + ["music_dir_"])):
+        def __fspath__(self):
+            if self.music_dir_ is None:
+                raise NotImplementedError
+
+            return join(self.music_dir_, str(self.path))
+
+    return Song
+
+
+class _SongBuilder(object):
+    """
+    Builds the default namedtuple songs from the lines of song blocks.
+    """
+    def __init__(self, tag_names, music_dir, tests=()):
+        self.song_type = _song_type(tag_names)
+        self._make = self.song_type._make
+        self._path_index = tag_names.index(_PATH)
+        # Tags that are only needed by tests are stored after music_dir_
+        self._size = len(tag_names) + 1
+        stored_tags = tag_names + ["music_dir_"] + _missing(tag_names, tests)
+        self._empty_song = [None] * len(stored_tags)
+        self._empty_song[len(tag_names)] = music_dir
+        self._values = list(self._empty_song)
+        self._tests = [(stored_tags.index(tag), test) for tag, test in tests]
+        self._directory = None
+        self._directory_path = Path()
+        self._filename = None
+        self.handlers = self._handlers(stored_tags)
+
+    def _handlers(self, tag_names):
+        """
+        Build the handlers for the lines inside of a song block. Each handler
+        converts its value and stores it at the position of its tag in
+        the song.
+        """
+        values = self._values
+
+        def store(index, convert):
+            def handler(value):
+                values[index] = convert(value)
+            return handler
+
+        return {tag.encode("utf-8"): store(index, _CONVERTERS.get(tag,
+                                                                  _decode))
+                for index, tag in enumerate(tag_names)
+                if tag not in (_PATH, "music_dir_")}
+
+    def begin(self, directory, filename):
+        if directory is not self._directory:
+            self._directory = directory
+            self._directory_path = None
+        self._filename = filename
+
+    def _accept(self):
+        """
+        Return whether the current song passes all tests and reset it if it
+        doesn't.
+        """
+        values = self._values
+        for index, test in self._tests:
+            if not test(values[index]):
+                values[:] = self._empty_song
+                return False
+        return True
+
+    def end(self):
+        if not self._accept():
+            return None
+        if self._directory_path is None:
+            self._directory_path = Path(self._directory or "")
+        values = self._values
+        values[self._path_index] = self._directory_path / self._filename
+        if len(values) == self._size:
+            song = self._make(values)
+        else:
+            song = self._make(values[:self._size])
+        values[:] = self._empty_song
+        return song
+
+
+class _CompactSongBuilder(object):
+    """
+    Builds :class:`CompactSong` objects from the lines of song blocks.
+    """
+    def __init__(self, tag_names, music_dir, tests=()):
+        self.song_type = type("Song", (CompactSong,),
+                              {"__slots__": (),
+                               "_fields": tuple(tag_names) + ("music_dir_",),
+                               "music_dir_": music_dir})
+        # Songs that have the same tags share the mapping of tag names to
+        # positions
+        self._slots = {}
+        # Each distinct tag value is only kept once
+        self._strings = {}
+        self._tags = {}
+        self._tests = list(tests)
+        # Tags that are only needed by tests
+        self._test_tags = _missing(tag_names, tests)
+        self._directory = None
+        self._filename = None
+        self.handlers = self._handlers(tag_names + self._test_tags)
+
+    def _handlers(self, tag_names):
+        tags = self._tags
+        intern = self._strings.setdefault
+
+        def store(tag, convert):
+            def handler(value):
+                tags[tag] = convert(value)
+            return handler
+
+        def store_interned(tag):
+            def handler(value):
+                value = _decode(value)
+                tags[tag] = intern(value, value)
+            return handler
+
+        return {tag.encode("utf-8"): (store(tag, _CONVERTERS[tag])
+                                      if tag in _CONVERTERS
+                                      else store_interned(tag))
+                for tag in tag_names
+                if tag != _PATH}
+
+    def begin(self, directory, filename):
+        self._directory = directory
+        self._filename = filename
+
+    def end(self):
+        tags = self._tags
+        for tag, test in self._tests:
+            if not test(tags.get(tag)):
+                tags.clear()
+                return None
+        for tag in self._test_tags:
+            tags.pop(tag, None)
+        song = self.make(self._directory, self._filename, tags)
+        tags.clear()
+        return song
+
+    def make(self, directory, filename, tags):
+        """
+        Create a song.
+
+        :param str directory: The directory of the song
+        :param str filename: The filename of the song
+        :param dict tags: The values of all tags that are set on the song
+        """
+        names = tuple(tags)
+        slots = self._slots.get(names)
+        if slots is None:
+            slots = self._slots[names] = {name: index
+                                          for index, name in enumerate(names)}
+        return self.song_type(directory, filename, slots,
+                              tuple(tags.values()))
+
+
+class SongReader(object):
+    def __init__(self, filename, music_dir=None, database_class=Database,
+                 compact=False, where=None, tags=None, stats=None):
+        """
+        An iterator over the songs in an MPD database file. Lines are read
+        from the file one at a time, so only the song that is currently being
+        parsed is held in memory.
+
+        The file is closed once all songs have been read. Use :meth:`close`
+        (or a ``with`` statement) to close it earlier.
+
+        :param filename: The path to the database file or a binary file
+                         object containing an uncompressed database
+        :param str music_dir: The path to MPDs music directory
+        :param type database_class: The class used for :attr:`database`
+        :param bool compact: Whether to return :class:`CompactSong` objects
+                             instead of namedtuples
+        :param where: Only return the songs that match all of these
+                      predicates, see :mod:`mpd_pydb.query`
+        :param tags: The names of the tags the songs should have, see
+                     :func:`_project`. By default, they have all supported
+                     tags.
+        :param stats: A :class:`~mpd_pydb.stats.LoadStats` object that the
+                      sizes of the database file and the time spent
+                      decompressing it are added to
+        :raises ValueError: If the format_version is not supported, the
+                            mpd_version is missing, the file ends before
+                            the header does or ``where`` or ``tags`` use a
+                            tag that is not supported
+        """
+        #: The database format version
+        self.format_version = 0
+        #: The version of MPD that created this database
+        self.mpd_version = None
+        #: A :class:`list` containing the names of all supported tags
+        self.supported_tags = ["Time", "mtime", "path"]
+        #: A :class:`list` containing the names of the tags of the songs
+        #: returned by this iterator
+        self.tags = None
+        #: The type of the songs returned by this iterator
+        self.song_type = None
+        #: An empty :class:`Database` with the header information of this file
+        #: and :attr:`tags` as its supported tags
+        self.database = None
+
+        self._music_dir = music_dir
+        raw = _open(filename)
+        if stats is not None:
+            raw = stats.wrap(raw)
+        self._file = BufferedReader(raw, _BUFFER_SIZE)
+        self._lines = iter(self._file)
+        self._query = None
+        try:
+            self._read_header()
+            self.tags = _project(self.supported_tags, tags)
+            self.database = database_class(self.format_version,
+                                           self.mpd_version,
+                                           self.tags)
+            if where is not None:
+                from .query import _Query
+                self._query = _Query(where)
+                _project(self.supported_tags,
+                         [tag for tag, _ in self._query.tests])
+        except Exception:
+            self.close()
+            raise
+        tests = self._query.tests if self._query is not None else ()
+        if compact:
+            self._builder = _CompactSongBuilder(self.tags, music_dir, tests)
+        else:
+            self._builder = _SongBuilder(self.tags, music_dir, tests)
+        self.song_type = self._builder.song_type
+        self._songs = self._read_songs(self._builder)
+
+    def _read_header(self):
+        tag_names = self.supported_tags
+        handlers = {
+            _FORMAT: lambda value: setattr(self, "format_version",
+                                           int(value)),
+            _MPD_VERSION: lambda value: setattr(self, "mpd_version",
+                                                _decode(value)),
+            _TAG: lambda value: tag_names.append(_decode(value)),
+        }
+        for line in self._lines:
+            key, _, value = line.strip().partition(b":")
+            if key == _INFO_END:
+                return
+
+            handler = handlers.get(key)
+            if handler is not None:
+                handler(value)
+
+        raise ValueError("The database ended before its header did")
+
+    def _read_columns(self):
+        """
+        Read all songs into a :class:`~mpd_pydb.columnar.ColumnarSongs`
+        without creating an object for each of them. This must be called
+        before iterating over this reader.
+        """
+        from .columnar import _ColumnBuilder
+        tests = self._query.tests if self._query is not None else ()
+        builder = _ColumnBuilder(self.tags, self._music_dir, tests)
+        for _ in self._read_songs(builder):
+            pass
+        return builder.songs
+
+    def _read_songs(self, builder):
+        query = self._query
+        # Songs in MPDs music root are not in any directory
+        directories = [None]
+        # Whether the songs in each directory can match the query
+        states = [_MATCH if query is None else query.directory(None)]
+        begin_song = builder.begin
+        end_song = builder.end
+        song_handlers = builder.handlers
+        in_song = False
+
+        for line in self._lines:
+            key, _, value = line.strip().partition(b":")
+            if in_song:
+                handler = song_handlers.get(key)
+                if handler is not None:
+                    handler(value)
+                elif key == _SONG_END:
+                    song = end_song()
+                    if song is not None:
+                        yield song
+                    in_song = False
+            elif key == _SONG_BEGIN:
+                directory = directories[-1]
+                filename = _filename(value)
+                if (states[-1] == _CHECK and
+                        not query.test_path(_join(directory, filename))):
+                    self._skip_song()
+                    continue
+                begin_song(directory, filename)
+                in_song = True
+            elif key == _DIRECTORY_BEGIN:
+                directory = _decode(value)
+                state = states[-1]
+                if state != _MATCH:
+                    state = query.directory(directory)
+                    if state == _SKIP:
+                        self._skip_directory()
+                        continue
+                directories.append(directory)
+                states.append(state)
+            elif key == _DIRECTORY_END:
+                directories.pop()
+                states.pop()
+
+        self._file.close()
+
+    def _skip_song(self):
+        for line in self._lines:
+            if line.strip() == _SONG_END:
+                return
+
+    def _skip_directory(self):
+        """
+        Skip all lines up to the end of the current directory block,
+        including the blocks of its subdirectories.
+        """
+        depth = 1
+        for line in self._lines:
+            key = line.partition(b":")[0].strip()
+            if key == _DIRECTORY_BEGIN:
+                depth += 1
+            elif key == _DIRECTORY_END:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def _read_changes(self, mtimes):
+        """
+        Like :meth:`_read_songs`, but only create songs that are not in
+        ``mtimes`` or whose mtime is different from the one in there.
+
+        :param dict mtimes: A mapping of song keys (see :func:`_song_key`) to
+                            mtimes
+        :return: An iterator of ``(key, song)`` tuples, ``song`` is ``None``
+                 for songs that have not changed
+        """
+        directories = [None]
+        builder = self._builder
+        song_handlers = builder.handlers
+        mtime_key = _MTIME.encode("utf-8")
+        song_lines = None
+        filename = mtime = None
+
+        for line in self._lines:
+            key, _, value = line.strip().partition(b":")
+            if song_lines is not None:
+                if key == _SONG_END:
+                    directory = directories[-1]
+                    song_key = _join(directory, filename)
+                    if song_key in mtimes and mtimes[song_key] == mtime:
+                        yield song_key, None
+                    else:
+                        builder.begin(directory, filename)
+                        for tag, tag_value in song_lines:
+                            handler = song_handlers.get(tag)
+                            if handler is not None:
+                                handler(tag_value)
+                        yield song_key, builder.end()
+                    song_lines = None
+                else:
+                    if key == mtime_key:
+                        mtime = int(value)
+                    song_lines.append((key, value))
+            elif key == _SONG_BEGIN:
+                filename = _filename(value)
+                mtime = None
+                song_lines = []
+            elif key == _DIRECTORY_BEGIN:
+                directories.append(_decode(value))
+            elif key == _DIRECTORY_END:
+                directories.pop()
+
+        self._file.close()
+
+    def iter_dataframes(self, chunksize, compact=False):
+        """
+        Convert the remaining songs to pandas DataFrames of at most
+        ``chunksize`` songs each, like :meth:`Database.iter_dataframes` does.
+        Only the songs of one DataFrame are held in memory at a time.
+
+        :param int chunksize: The maximum number of songs per DataFrame
+        :param bool compact: Whether to use the dtypes of
+                             ``Database.to_dataframe(compact=True)``
+        :raises ValueError: If ``chunksize`` is less than 1
+        """
+        if chunksize < 1:
+            raise ValueError("chunksize must be at least 1")
+        return self._iter_dataframes(chunksize, compact)
+
+    def _iter_dataframes(self, chunksize, compact):
         import pandas as pd
-        df = pd.DataFrame.from_records(self.songs, columns=self.supported_tags)
-        return df.assign(Track=self._extract(df["Track"], 0),
-                         Disc=self._extract(df["Disc"], 0),
-                         # With Python 3.6, the insertion order of new columns
-                         # changed: They are now inserted in the order of
-                         # **kwargs. Previously, they were inserted in
-                         # alphabetical order. Let's keep the order the same
-                         # across all Python versions here. This is documented
-                         # at
-                         # https://pandas.pydata.org/pandas-docs/stable/generated/pandas.DataFrame.assign.html
-                         TotalDiscs=self._extract(df["Disc"], 1),
-                         TotalTracks=self._extract(df["Track"], 1)
-                         )
+        start = 0
+        while True:
+            songs = list(islice(self, chunksize))
+            if not songs:
+                break
+            df = self.database._dataframe(songs, self.tags, compact=compact)
+            df.index = pd.RangeIndex(start, start + len(df))
+            start += len(df)
+            yield df
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._songs)
+
+    next = __next__
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Close the underlying database file.
+        """
+        self._file.close()
+        songs = getattr(self, "_songs", None)
+        if songs is not None:
+            songs.close()
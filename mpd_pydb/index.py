@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+Indexes
+=======
+
+Indexes speed up looking up songs by the value of a tag or by their path. They
+are created with :meth:`~mpd_pydb.db.Database.create_index`, by passing
+``indexes`` to :meth:`~mpd_pydb.db.Database.read_file` or on the first call of
+:meth:`~mpd_pydb.db.Database.find`, :meth:`~mpd_pydb.db.Database.find_range`
+or :meth:`~mpd_pydb.db.Database.song_at`. Afterwards, they are kept up to date
+by :meth:`~mpd_pydb.db.Database.add_song` and
+:meth:`~mpd_pydb.db.Database.update_from`.
+
+Indexes of columnar and shared databases are built from the columns and store
+the positions of the songs, so songs are only created when they are found.
+"""
+from bisect import bisect_left, bisect_right
+from operator import attrgetter
+
+from .columnar import ColumnarSongs
+from .db import _MTIME, _PATH, _TIME, _join, _song_key
+
+
+def _remove_identical(songs, song):
+    for position, other in enumerate(songs):
+        if other is song:
+            del songs[position]
+            return
+
+
+class HashIndex(object):
+    def __init__(self, tag):
+        """
+        An index for looking up the songs with a specific value of ``tag``.
+
+        :param str tag: The name of the indexed tag
+        """
+        #: The name of the indexed tag
+        self.tag = tag
+        if tag == _PATH:
+            self._key = _song_key
+        else:
+            self._key = attrgetter(tag)
+        self._songs = {}
+
+    def add(self, song):
+        self._add(self._key(song), song)
+
+    def _add(self, key, song):
+        songs = self._songs.get(key)
+        if songs is None:
+            self._songs[key] = [song]
+        else:
+            songs.append(song)
+
+    def remove(self, song):
+        key = self._key(song)
+        songs = self._songs.get(key, [])
+        _remove_identical(songs, song)
+        if not songs:
+            self._songs.pop(key, None)
+
+    def find(self, value):
+        """
+        Return all songs whose tag has the value ``value``.
+
+        :rtype: list
+        """
+        return list(self._songs.get(value, ()))
+
+    def values(self):
+        """
+        Return all distinct values of the indexed tag.
+
+        :rtype: list
+        """
+        return list(self._songs)
+
+
+class SortedIndex(object):
+    def __init__(self, tag):
+        """
+        An index of the songs sorted by the value of ``tag``, which supports
+        range queries. Songs without a value for ``tag`` are not indexed.
+
+        :param str tag: The name of the indexed tag
+        """
+        #: The name of the indexed tag
+        self.tag = tag
+        self._key = attrgetter(tag)
+        self._values = []
+        self._songs = []
+
+    def add(self, song):
+        self._insert(self._key(song), song)
+
+    def _insert(self, value, song):
+        if value is None:
+            return
+        position = bisect_right(self._values, value)
+        self._values.insert(position, value)
+        self._songs.insert(position, song)
+
+    def remove(self, song):
+        value = self._key(song)
+        if value is None:
+            return
+        start = bisect_left(self._values, value)
+        stop = bisect_right(self._values, value)
+        for position in range(start, stop):
+            if self._songs[position] is song:
+                del self._values[position]
+                del self._songs[position]
+                return
+
+    def find(self, value):
+        """
+        Return all songs whose tag has the value ``value``.
+
+        :rtype: list
+        """
+        return self.range(value, value)
+
+    def range(self, minimum=None, maximum=None):
+        """
+        Return all songs whose tag has a value between ``minimum`` and
+        ``maximum`` (both inclusive), ordered by that value. ``None`` means
+        there is no lower or upper limit.
+
+        :rtype: list
+        """
+        start = 0 if minimum is None else bisect_left(self._values, minimum)
+        stop = (len(self._values) if maximum is None
+                else bisect_right(self._values, maximum))
+        return self._songs[start:stop]
+
+
+class _ColumnarHashIndex(HashIndex):
+    """
+    A :class:`HashIndex` over a :class:`~mpd_pydb.columnar.ColumnarSongs`
+    that stores the positions of the songs instead of the songs.
+    """
+    def __init__(self, tag, songs):
+        HashIndex.__init__(self, tag)
+        self._sequence = songs
+        column = songs.columns[tag]
+        if tag == _PATH:
+            directories = column.directories
+            # Code -1 picks MPDs music root
+            names = list(directories.values) + [None]
+            for position, (code, filename) in enumerate(
+                    zip(directories.codes, column.filenames)):
+                self._add(_join(names[code], filename), position)
+        else:
+            positions = [[] for _ in range(len(column.values) + 1)]
+            for position, code in enumerate(column.codes):
+                positions[code].append(position)
+            # Code -1 picks the trailing None
+            self._songs = {value: found for value, found
+                           in zip(list(column.values) + [None], positions)
+                           if found}
+
+    def add(self, song):
+        # Database.add_song appends the song before adding it to the indexes
+        self._add(self._key(song), len(self._sequence) - 1)
+
+    def find(self, value):
+        sequence = self._sequence
+        return [sequence[position] for position in self._songs.get(value, ())]
+
+
+class _ColumnarSortedIndex(SortedIndex):
+    """
+    A :class:`SortedIndex` over a :class:`~mpd_pydb.columnar.ColumnarSongs`
+    that stores the positions of the songs instead of the songs.
+    """
+    def __init__(self, tag, songs):
+        SortedIndex.__init__(self, tag)
+        self._sequence = songs
+        pairs = sorted((value, position) for position, value
+                       in enumerate(songs.columns[tag].tolist())
+                       if value is not None)
+        self._values = [value for value, _ in pairs]
+        self._songs = [position for _, position in pairs]
+
+    def add(self, song):
+        # Database.add_song appends the song before adding it to the indexes
+        self._insert(self._key(song), len(self._sequence) - 1)
+
+    def range(self, minimum=None, maximum=None):
+        sequence = self._sequence
+        return [sequence[position]
+                for position in SortedIndex.range(self, minimum, maximum)]
+
+
+def create_index(tag, songs):
+    """
+    Create the appropriate index for ``tag`` over ``songs``: a
+    :class:`SortedIndex` for ``Time`` and ``mtime``, a :class:`HashIndex`
+    for all other tags.
+    """
+    if isinstance(songs, ColumnarSongs):
+        if tag in (_TIME, _MTIME):
+            return _ColumnarSortedIndex(tag, songs)
+        return _ColumnarHashIndex(tag, songs)
+    if tag in (_TIME, _MTIME):
+        index = SortedIndex(tag)
+        key = index._key
+        pairs = sorted(((key(song), position, song)
+                        for position, song in enumerate(songs)
+                        if key(song) is not None))
+        index._values = [value for value, _, _ in pairs]
+        index._songs = [song for _, _, song in pairs]
+    else:
+        index = HashIndex(tag)
+        for song in songs:
+            index.add(song)
+    return index
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+Lazy songs
+==========
+
+With ``lazy=True``, :meth:`~mpd_pydb.db.Database.read_file` keeps the
+decompressed database in memory and only scans it for the blocks of songs and
+directories. A :class:`LazySongs` stores where the block of each song starts
+and where each directory block begins and ends. A song is only parsed when it is
+accessed for the first time, and then kept, so later accesses return the same
+object. Songs can be accessed from several threads at once.
+
+Counting songs doesn't parse any of them, and looking at a few of them only
+parses those. Iterating, creating indexes or converting the database to a
+DataFrame parse all songs, which takes about as long as reading the database
+without ``lazy``.
+"""
+import re
+import threading
+
+from array import array
+from bisect import bisect_right
+
+from .db import _decode, _filename
+
+_SONG_BEGIN_RE = re.compile(br"\nsong_begin: ")
+_SONG_END = b"\nsong_end"
+# Lines that begin or end directory blocks. Their paths are relative to MPDs
+# music root.
+_DIRECTORY_RE = re.compile(br"\n(begin|end): ([^\n]*)")
+# The longest first line _find_all looks at
+_MAX_LINE = 1 << 16
+
+try:
+    array("q")
+    _INT64 = "q"
+except ValueError:
+    # Python 2
+    _INT64 = "l"
+
+
+def _find_all(text, pattern):
+    """
+    Return the matches of ``pattern``, which has to start with a newline, at
+    the beginnings of all lines of ``text``.
+    """
+    # The first line is not preceded by a newline
+    first = pattern.match(b"\n" + text[:_MAX_LINE])
+    if first is not None:
+        yield first, 0
+    for match in pattern.finditer(text):
+        yield match, match.start() + 1
+
+
+class LazySongs(object):
+    def __init__(self, text, builder):
+        """
+        A sequence of songs that are parsed from ``text`` when they are
+        accessed.
+
+        :param bytes text: The song and directory blocks of a database
+        :param builder: The builder that parses the songs
+        """
+        self._text = text
+        self._builder = builder
+        # The directories of the songs, None for MPDs music root
+        self._directories = [None]
+        # The offsets of the song_begin lines of all songs
+        self._starts = array(_INT64, [start for _, start in
+                                      _find_all(text, _SONG_BEGIN_RE)])
+        # The offsets of the begin and end lines of all directory blocks and
+        # the index in _directories of the directory the lines after each of
+        # them are in
+        self._directory_offsets = array(_INT64)
+        self._directory_codes = array("i")
+        # The songs that have been parsed so far
+        self._songs = [None] * len(self._starts)
+        # The builder keeps the song it builds, so only one thread at a time
+        # may parse songs
+        self._lock = threading.Lock()
+        self._scan_directories()
+
+    def _scan_directories(self):
+        directories = self._directories
+        add_offset = self._directory_offsets.append
+        add_code = self._directory_codes.append
+        stack = [0]
+        for match, offset in _find_all(self._text, _DIRECTORY_RE):
+            if match.group(1) == b"begin":
+                stack.append(len(directories))
+                directories.append(_decode(match.group(2)))
+            else:
+                stack.pop()
+            add_offset(offset)
+            add_code(stack[-1])
+
+    def _directory(self, offset):
+        """
+        Return the directory of the line at ``offset``.
+        """
+        index = bisect_right(self._directory_offsets, offset) - 1
+        if index < 0:
+            return None
+        return self._directories[self._directory_codes[index]]
+
+    def _parse(self, index):
+        builder = self._builder
+        handlers = builder.handlers
+        start = self._starts[index]
+        text = self._text
+        lines = text[start:text.find(_SONG_END, start)].split(b"\n")
+        builder.begin(self._directory(start),
+                      _filename(lines[0].partition(b":")[2]))
+        for line in lines[1:]:
+            key, _, value = line.strip().partition(b":")
+            handler = handlers.get(key)
+            if handler is not None:
+                handler(value)
+        return builder.end()
+
+    def _song(self, index):
+        song = self._songs[index]
+        if song is None:
+            with self._lock:
+                # Another thread may have parsed it in the meantime
+                song = self._songs[index]
+                if song is None:
+                    song = self._songs[index] = self._parse(index)
+        return song
+
+    def append(self, song):
+        """
+        Append ``song``, which is kept as it is.
+        """
+        self._songs.append(song)
+
+    def parsed(self):
+        """
+        Return the number of songs that have been parsed or appended.
+        """
+        return sum(1 for song in self._songs if song is not None)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._song(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("song index out of range")
+        return self._song(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._song(index)
+
+    def __len__(self):
+        return len(self._songs)
+
+
+def read_lazy(database_class, filename, music_dir=None, tags=None,
+              stats=None):
+    """
+    Read the database in ``filename`` into a :class:`LazySongs`.
+
+    The other parameters are the same as the ones of
+    :meth:`~mpd_pydb.db.Database.read_file`.
+    """
+    with database_class.iter_songs(filename, music_dir, tags=tags,
+                                   stats=stats) as reader:
+        db = reader.database
+        text = reader._file.read()
+        db.songs = LazySongs(text, reader._builder)
+    return db
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+Parallel parsing
+================
+
+With ``workers`` set, :meth:`~mpd_pydb.db.Database.read_file` decompresses the
+database, splits it into chunks at the ends of top-level directory blocks and
+parses the chunks in a :class:`multiprocessing.Pool`. Every chunk starts in
+MPDs music root, so the workers don't need to know anything about the
+directories before their chunk. Each worker returns its songs as a
+:class:`~mpd_pydb.columnar.ColumnarSongs`, and the results are merged in the
+order of the chunks, which makes the database identical to one read by a
+single process.
+"""
+import re
+
+from io import BytesIO
+from multiprocessing import Pool
+
+from .db import _gc_paused, _open
+from .stats import _NO_STATS
+
+# Chunks per worker, so that workers that finish early can pick up more work
+_CHUNKS_PER_WORKER = 4
+_DIRECTORY_END = b"\nend: "
+_INFO_END_RE = re.compile(br"^\s*info_end\s*$\n?", re.MULTILINE)
+
+
+def _top_level_end(text, position):
+    """
+    Return the offset after the first line at or after ``position`` that ends
+    a top-level directory block, or ``None`` if there is none.
+    """
+    while True:
+        position = text.find(_DIRECTORY_END, position - 1)
+        if position == -1:
+            return None
+        line_end = text.find(b"\n", position + 1)
+        if line_end == -1:
+            line_end = len(text)
+        # The path in begin and end lines is relative to MPDs music root, so
+        # only the ones of top-level directories contain no slash
+        if b"/" not in text[position + len(_DIRECTORY_END):line_end]:
+            return line_end + 1
+        position = line_end + 1
+
+
+def _split(text, start, chunk_size):
+    """
+    Return the ``(start, end)`` offsets of chunks of about ``chunk_size``
+    bytes of ``text``, starting at ``start``. Chunks only end after the end of
+    a top-level directory block.
+    """
+    chunks = []
+    while True:
+        end = _top_level_end(text, max(start + chunk_size, 1))
+        if end is None or end >= len(text):
+            break
+        chunks.append((start, end))
+        start = end
+    chunks.append((start, len(text)))
+    return chunks
+
+
+def _parse_chunk(args):
+    database_class, header, chunk, music_dir, where, tags = args
+    with database_class.iter_songs(BytesIO(header + chunk), music_dir,
+                                   where=where, tags=tags) as reader:
+        return reader._read_columns()
+
+
+def read_parallel(database_class, filename, workers, music_dir=None,
+                  compact=False, columnar=False, where=None, tags=None,
+                  stats=_NO_STATS):
+    """
+    Read the database in ``filename`` with ``workers`` processes.
+
+    The other parameters are the same as the ones of
+    :meth:`~mpd_pydb.db.Database.read_file`.
+    """
+    with stats.wrap(_open(filename)) as db_file:
+        text = db_file.read()
+
+    info_end = _INFO_END_RE.search(text)
+    if info_end is None:
+        raise ValueError("The database ended before its header did")
+    header = text[:info_end.end()]
+    with database_class.iter_songs(BytesIO(header), music_dir,
+                                   tags=tags) as reader:
+        db = reader.database
+
+    chunk_size = (len(text) - len(header)) // (workers * _CHUNKS_PER_WORKER)
+    chunks = [(database_class, header, text[start:end], music_dir, where,
+               tags)
+              for start, end in _split(text, len(header), chunk_size)]
+    del text
+
+    songs = None
+    with stats.phase("parse"):
+        pool = Pool(workers)
+        try:
+            for part in pool.imap(_parse_chunk, chunks):
+                if songs is None:
+                    songs = part
+                else:
+                    songs.extend(part)
+        finally:
+            pool.close()
+            pool.join()
+
+    songs.music_dir = music_dir
+    if columnar:
+        db.songs = songs
+    else:
+        with _gc_paused(), stats.phase("convert"):
+            if compact:
+                db.songs = songs.to_compact_songs()
+            else:
+                db.songs = list(songs)
+        if where is None and tags is None:
+            db._source = (filename, music_dir, compact)
+    return db
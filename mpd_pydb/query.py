@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+Queries
+=======
+
+The predicates in this module select songs, either while a database is read
+by passing them as ``where`` to :meth:`~mpd_pydb.db.Database.read_file` and
+:meth:`~mpd_pydb.db.Database.iter_songs`, or from a database that has already
+been read with :meth:`~mpd_pydb.db.Database.select`. A song is selected if it
+matches all predicates.
+
+When reading a database, songs that don't match are never created, and
+directories that can't contain a song matching a :class:`PathPrefix` are
+skipped without parsing them. Selecting from columnar and shared databases
+checks the predicates on the columns, so only the songs that match are
+created there as well.
+"""
+from pathlib import PurePath
+
+from .columnar import ColumnarSongs, StringColumn
+from .db import _CHECK, _MATCH, _PATH, _SKIP, _join, _posix, _song_key
+
+
+class TagEquals(object):
+    def __init__(self, tag, value):
+        """
+        Match songs whose ``tag`` has the value ``value``.
+
+        :param str tag: The name of a supported tag other than ``path``
+        :param value:
+        """
+        if tag == _PATH:
+            raise ValueError("Use PathPrefix to select songs by their path")
+        #: The name of the tag
+        self.tag = tag
+        #: The value of the tag
+        self.value = value
+
+    def test(self, value):
+        return value == self.value
+
+    def matches(self, song):
+        return self.test(getattr(song, self.tag))
+
+
+class Range(object):
+    def __init__(self, tag, minimum=None, maximum=None):
+        """
+        Match songs whose ``tag`` has a value between ``minimum`` and
+        ``maximum``, both inclusive. ``None`` means there is no lower or upper
+        limit. Songs without a value for ``tag`` never match.
+
+        :param str tag: The name of a supported tag other than ``path``,
+                        usually ``Time`` or ``mtime``
+        """
+        if tag == _PATH:
+            raise ValueError("Use PathPrefix to select songs by their path")
+        #: The name of the tag
+        self.tag = tag
+        #: The lower limit
+        self.minimum = minimum
+        #: The upper limit
+        self.maximum = maximum
+
+    def test(self, value):
+        if value is None:
+            return False
+        if self.minimum is not None and value < self.minimum:
+            return False
+        if self.maximum is not None and value > self.maximum:
+            return False
+        return True
+
+    def matches(self, song):
+        return self.test(getattr(song, self.tag))
+
+
+class PathPrefix(object):
+    def __init__(self, prefix):
+        """
+        Match songs whose path is ``prefix`` or inside of the directory
+        ``prefix``.
+
+        :param prefix: A path inside of MPDs music directory
+        :type prefix: str or :class:`~pathlib:pathlib.PurePath`
+        """
+        if isinstance(prefix, PurePath):
+            prefix = _posix(prefix)
+        #: The prefix as a string
+        self.prefix = prefix.strip("/")
+        self._directory_prefix = self.prefix + "/"
+
+    def test_path(self, path):
+        """
+        :param str path: The path of a song as a string
+        """
+        return (not self.prefix or path == self.prefix or
+                path.startswith(self._directory_prefix))
+
+    def matches(self, song):
+        return self.test_path(_song_key(song))
+
+    def _directory(self, directory):
+        if directory is None:
+            # MPDs music root
+            return _CHECK if self.prefix else _MATCH
+        if self.test_path(directory):
+            return _MATCH
+        if self._directory_prefix.startswith(directory + "/"):
+            # An ancestor of the prefix
+            return _CHECK
+        return _SKIP
+
+
+class _Query(object):
+    """
+    The predicates of a query, split by how the parser evaluates them.
+    """
+    def __init__(self, predicates):
+        predicates = list(predicates)
+        self._paths = [predicate for predicate in predicates
+                       if isinstance(predicate, PathPrefix)]
+        #: ``(tag, test)`` tuples of all predicates on tag values
+        self.tests = [(predicate.tag, predicate.test)
+                      for predicate in predicates
+                      if not isinstance(predicate, PathPrefix)]
+
+    def directory(self, directory):
+        """
+        Return whether the songs in ``directory`` can match, ``None`` being
+        MPDs music root.
+        """
+        return min([_MATCH] + [predicate._directory(directory)
+                               for predicate in self._paths])
+
+    def test_path(self, path):
+        return all(predicate.test_path(path) for predicate in self._paths)
+
+
+def _filter_paths(paths, predicate, indices):
+    """
+    Return the indices of the songs in the
+    :class:`~mpd_pydb.columnar.PathColumn` ``paths`` that match the
+    :class:`PathPrefix` ``predicate``, only checking ``indices`` unless it is
+    ``None``. Only the paths of songs in ancestors of the prefix are built.
+    """
+    directories = paths.directories
+    states = [predicate._directory(directory)
+              for directory in directories.values]
+    # Code -1 picks MPDs music root
+    states.append(predicate._directory(None))
+    codes = directories.codes
+    filenames = paths.filenames
+    if indices is None:
+        indices = range(len(codes))
+    selected = []
+    for index in indices:
+        code = codes[index]
+        state = states[code]
+        if state == _MATCH or (state == _CHECK and predicate.test_path(
+                _join(directories[index], filenames[index]))):
+            selected.append(index)
+    return selected
+
+
+def _select_columns(songs, predicates):
+    """
+    Return the songs in the :class:`~mpd_pydb.columnar.ColumnarSongs`
+    ``songs`` that match all ``predicates``, checking the predicates on the
+    columns instead of on songs where possible.
+    """
+    columns = songs.columns
+    indices = None
+    others = []
+    # TagEquals only compares codes, so it is checked first
+    predicates = ([predicate for predicate in predicates
+                   if isinstance(predicate, TagEquals)] +
+                  [predicate for predicate in predicates
+                   if not isinstance(predicate, TagEquals)])
+    for predicate in predicates:
+        if isinstance(predicate, PathPrefix):
+            indices = _filter_paths(columns[_PATH], predicate, indices)
+        elif (isinstance(predicate, (TagEquals, Range)) and
+                predicate.tag in columns):
+            column = columns[predicate.tag]
+            if (isinstance(predicate, TagEquals) and
+                    isinstance(column, StringColumn)):
+                indices = column.find(predicate.value, indices)
+            else:
+                indices = column.filter(predicate.test, indices)
+        else:
+            others.append(predicate)
+        if indices == []:
+            return []
+    if indices is None:
+        indices = range(len(songs))
+    return select([songs[index] for index in indices], others)
+
+
+def select(songs, predicates):
+    """
+    Return the songs in ``songs`` that match all ``predicates``.
+
+    :rtype: list
+    """
+    predicates = list(predicates)
+    if isinstance(songs, ColumnarSongs):
+        return _select_columns(songs, predicates)
+    return [song for song in songs
+            if all(predicate.matches(song) for predicate in predicates)]
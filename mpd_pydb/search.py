@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+Text search
+===========
+
+A :class:`TextIndex` finds songs by parts of their tag values, ignoring case,
+for example to autocomplete what is typed into a search box::
+
+    index = db.create_text_index()
+    index.complete("anama")       # ["Anamanaguchi"]
+    index.prefix("pop")           # songs with a tag value starting with "pop"
+    index.substring("it")         # songs with a tag value containing "it"
+    index.fuzzy("anamanaguxi")    # songs with similar tag values
+
+The index stores each distinct value of the indexed tags once as a term,
+together with the ids of the songs that have it, which are their positions in
+:attr:`~mpd_pydb.db.Database.songs`. The terms are kept sorted for prefix
+lookups, and each trigram, three consecutive characters, points to the terms
+containing it. A substring lookup only checks the terms that contain all
+trigrams of the searched text, and a fuzzy lookup ranks the terms by the
+number of trigrams they share with it.
+
+Building the index takes about as long as a pass over all songs, so it can be
+built in a background thread with ``background=True``. Lookups wait until it
+is complete.
+"""
+import threading
+
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+
+#: The tags that are indexed by default
+SEARCH_TAGS = ("Title", "Artist", "Album", "Composer")
+#: The smallest similarity of the terms found by :meth:`TextIndex.fuzzy`
+FUZZY_THRESHOLD = 0.3
+
+try:
+    _fold = type(u"").casefold
+except AttributeError:
+    # Python 2, where the searched text may be a byte string
+    def _fold(text):
+        if isinstance(text, bytes):
+            text = text.decode("utf-8")
+        return text.lower()
+
+
+def _trigrams(text):
+    return set(text[start:start + 3] for start in range(len(text) - 2))
+
+
+class TextIndex(object):
+    def __init__(self, songs, tags=SEARCH_TAGS, background=False):
+        """
+        An index of the values of ``tags`` of ``songs``.
+
+        :param songs: The songs of a database
+        :param tags: The names of the indexed tags
+        :param bool background: Whether to build the index in a background
+                                thread
+        """
+        #: The names of the indexed tags
+        self.tags = tuple(tags)
+        self._songs = songs
+        # The tag and value of each term, and the value folded to lower case
+        self._terms = []
+        self._folded = []
+        # The ids of the songs that have each term
+        self._postings = []
+        self._term_ids = {}
+        # The folded values and ids of all terms, sorted
+        self._sorted = []
+        # The ids of the terms that contain each trigram and the number of
+        # distinct trigrams of each term
+        self._trigrams = {}
+        self._trigram_counts = array("i")
+        self._ready = threading.Event()
+        if background:
+            thread = threading.Thread(target=self._build,
+                                      name="TextIndex")
+            thread.daemon = True
+            thread.start()
+        else:
+            self._build()
+
+    def _build(self):
+        try:
+            add = self._add
+            for song_id, song in enumerate(self._songs):
+                add(song_id, song)
+            self._sorted.sort()
+        finally:
+            self._ready.set()
+
+    def _add(self, song_id, song):
+        term_ids = self._term_ids
+        for tag in self.tags:
+            value = getattr(song, tag, None)
+            if value is None:
+                continue
+            term_id = term_ids.get((tag, value))
+            if term_id is None:
+                term_id = self._add_term(tag, value)
+            self._postings[term_id].append(song_id)
+
+    def _add_term(self, tag, value):
+        term_id = self._term_ids[tag, value] = len(self._terms)
+        folded = _fold(value)
+        self._terms.append((tag, value))
+        self._folded.append(folded)
+        self._postings.append(array("i"))
+        if self._ready.is_set():
+            insort(self._sorted, (folded, term_id))
+        else:
+            self._sorted.append((folded, term_id))
+        trigrams = _trigrams(folded)
+        for trigram in trigrams:
+            term_ids = self._trigrams.get(trigram)
+            if term_ids is None:
+                term_ids = self._trigrams[trigram] = array("i")
+            term_ids.append(term_id)
+        self._trigram_counts.append(len(trigrams))
+        return term_id
+
+    def add(self, song):
+        """
+        Add ``song``, which has to have been appended to the songs of the
+        index.
+        """
+        self.wait()
+        self._add(len(self._songs) - 1, song)
+
+    def wait(self, timeout=None):
+        """
+        Wait until the index is built and return whether it is.
+        """
+        return self._ready.wait(timeout)
+
+    def _tag_filter(self, tags):
+        if tags is None:
+            return None
+        unknown = set(tags).difference(self.tags)
+        if unknown:
+            raise ValueError("{tags} are not indexed".format(
+                tags=", ".join(sorted(unknown))))
+        return set(tags)
+
+    def _prefix_terms(self, text, tags):
+        """
+        Yield the ids of the terms that start with ``text``, in the order of
+        their folded values.
+        """
+        self.wait()
+        tags = self._tag_filter(tags)
+        prefix = _fold(text)
+        sorted_terms = self._sorted
+        terms = self._terms
+        for position in range(bisect_left(sorted_terms, (prefix,)),
+                              len(sorted_terms)):
+            folded, term_id = sorted_terms[position]
+            if not folded.startswith(prefix):
+                break
+            if tags is None or terms[term_id][0] in tags:
+                yield term_id
+
+    def _substring_terms(self, text, tags):
+        """
+        Return the ids of the terms that contain ``text``.
+        """
+        self.wait()
+        tags = self._tag_filter(tags)
+        text = _fold(text)
+        trigrams = _trigrams(text)
+        if trigrams:
+            postings = sorted((self._trigrams.get(trigram, ())
+                               for trigram in trigrams), key=len)
+            candidates = set(postings[0])
+            for term_ids in postings[1:]:
+                if not candidates:
+                    break
+                candidates.intersection_update(term_ids)
+            candidates = sorted(candidates)
+        else:
+            candidates = range(len(self._terms))
+        folded = self._folded
+        terms = self._terms
+        return [term_id for term_id in candidates
+                if text in folded[term_id] and
+                (tags is None or terms[term_id][0] in tags)]
+
+    def _songs_of(self, term_ids, limit):
+        """
+        Return the songs of the terms ``term_ids``, each song once, in the
+        order of the terms and then the song ids.
+        """
+        seen = set()
+        songs = []
+        for term_id in term_ids:
+            for song_id in self._postings[term_id]:
+                if song_id not in seen:
+                    seen.add(song_id)
+                    songs.append(self._songs[song_id])
+                    if limit is not None and len(songs) >= limit:
+                        return songs
+        return songs
+
+    def complete(self, text, tags=None, limit=10):
+        """
+        Return the distinct values of the indexed tags that start with
+        ``text``, ignoring case, in alphabetical order.
+
+        :param tags: Only return values of these tags. By default, values of
+                     all indexed tags are returned.
+        :param int limit: The largest number of values that are returned,
+                          ``None`` for all of them
+        :rtype: [str]
+        :raises ValueError: If a tag in ``tags`` is not indexed
+        """
+        values = []
+        seen = set()
+        for term_id in self._prefix_terms(text, tags):
+            value = self._terms[term_id][1]
+            if value not in seen:
+                seen.add(value)
+                values.append(value)
+                if limit is not None and len(values) >= limit:
+                    break
+        return values
+
+    def prefix(self, text, tags=None, limit=None):
+        """
+        Return the songs with a value of an indexed tag that starts with
+        ``text``, ignoring case.
+
+        :param tags: Only search values of these tags. By default, all
+                     indexed tags are searched.
+        :param int limit: The largest number of songs that are returned
+        :rtype: list
+        :raises ValueError: If a tag in ``tags`` is not indexed
+        """
+        return self._songs_of(self._prefix_terms(text, tags), limit)
+
+    def substring(self, text, tags=None, limit=None):
+        """
+        Return the songs with a value of an indexed tag that contains
+        ``text``, ignoring case.
+
+        The other parameters are the same as the ones of :meth:`prefix`.
+        """
+        return self._songs_of(self._substring_terms(text, tags), limit)
+
+    def fuzzy(self, text, tags=None, limit=10, threshold=FUZZY_THRESHOLD):
+        """
+        Return the songs with a value of an indexed tag that is similar to
+        ``text``, most similar first. The similarity of two values is the
+        number of trigrams they share divided by the number of distinct
+        trigrams of both. Texts shorter than three characters are looked up
+        with :meth:`prefix`.
+
+        :param float threshold: The smallest similarity of the values that
+                                are returned
+        :raises ValueError: If a tag in ``tags`` is not indexed
+        """
+        self.wait()
+        trigrams = _trigrams(_fold(text))
+        if not trigrams:
+            return self.prefix(text, tags, limit)
+        tag_filter = self._tag_filter(tags)
+        shared = Counter()
+        for trigram in trigrams:
+            shared.update(self._trigrams.get(trigram, ()))
+        counts = self._trigram_counts
+        terms = self._terms
+        scored = []
+        for term_id, count in shared.items():
+            similarity = float(count) / (len(trigrams) + counts[term_id] -
+                                         count)
+            if similarity >= threshold and (tag_filter is None or
+                                            terms[term_id][0] in tag_filter):
+                scored.append((-similarity, term_id))
+        scored.sort()
+        return self._songs_of((term_id for _, term_id in scored), limit)
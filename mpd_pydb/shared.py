@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+Shared databases
+================
+
+A pool of worker processes doesn't have to parse the database once per
+worker. The parent parses it once and writes it with
+:meth:`~mpd_pydb.db.Database.to_shared`, and every worker opens the file with
+:meth:`~mpd_pydb.db.Database.from_shared`::
+
+    db = Database.read_file("/var/lib/mpd/database", columnar=True)
+    db.to_shared("/dev/shm/mpd_pydb")
+
+    # In each worker
+    db = Database.from_shared("/dev/shm/mpd_pydb")
+
+The file stores the columns of a :class:`~mpd_pydb.columnar.ColumnarSongs`
+as plain arrays, and :meth:`~mpd_pydb.db.Database.from_shared` maps it into
+memory read-only instead of reading it. All processes share the same pages,
+so the database is only held in memory once, and opening it takes about as
+long as reading its header. On Linux, a file in ``/dev/shm`` is never written
+to disk, just like :mod:`multiprocessing.shared_memory`, which uses the same
+mechanism.
+
+The songs of a shared database are a :class:`SharedSongs`, which works like
+a :class:`~mpd_pydb.columnar.ColumnarSongs`, so ``songs``, indexes, queries
+and :meth:`~mpd_pydb.db.Database.to_dataframe` behave as with
+``columnar=True``. Strings are decoded when they are accessed. Songs can't be
+added to a shared database.
+
+:meth:`~mpd_pydb.db.Database.to_shared` replaces the file atomically, so
+processes that opened the old one keep using it until they open the file
+again. Pickling a :class:`SharedSongs` only pickles the path of its file,
+which makes it cheap to pass to other processes.
+"""
+import mmap
+import os
+import pickle
+import struct
+
+from array import array
+from collections import OrderedDict
+from tempfile import NamedTemporaryFile
+
+from .cache import _file_mode, _replace
+from .columnar import (_INT64, ColumnarSongs, NumericColumn, PathColumn,
+                       StringColumn, _column, _columnar_songs)
+from .db import _PATH, _PY2, _project, _song_type
+
+#: The version of the format of shared database files
+SHARED_VERSION = 1
+
+_MAGIC = b"MPDPYDB\x00"
+_HEADER_LENGTH = struct.Struct("<Q")
+# The alignment of the arrays in the file
+_ALIGNMENT = 8
+
+
+class _MappedStrings(object):
+    """
+    A read-only sequence of the strings stored in a file that are decoded
+    when they are accessed.
+    """
+    def __init__(self, mapping, start, offsets, decode=True):
+        self._mapping = mapping
+        self._start = start
+        # The offsets of the strings relative to start, followed by the end
+        # of the last one
+        self._offsets = offsets
+        self._decode = decode
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        start = self._start
+        offsets = self._offsets
+        value = self._mapping[start + offsets[index]:
+                              start + offsets[index + 1]]
+        return value.decode("utf-8") if self._decode else value
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+
+class _MappedStringColumn(StringColumn):
+    """
+    A :class:`~mpd_pydb.columnar.StringColumn` whose codes and values are
+    stored in a file.
+    """
+    def __init__(self, codes, values):
+        self.codes = codes
+        self.values = values
+        self._index = None
+
+    def code(self, value):
+        if self._index is None:
+            self._index = {value: code
+                           for code, value in enumerate(self.values)}
+        return self._index.get(value)
+
+    def _lookup(self, codes):
+        """
+        Return a sequence that maps each code in ``codes`` to its value and
+        -1 to ``None``.
+        """
+        values = self.values
+        if len(codes) < len(values):
+            # Only decode the values that are needed
+            return {code: None if code < 0 else values[code]
+                    for code in set(codes)}
+        return list(values) + [None]
+
+    def tolist(self, start=0, stop=None):
+        codes = self.codes[start:stop]
+        lookup = self._lookup(codes)
+        return [lookup[code] for code in codes]
+
+    def to_numpy(self, start=0, stop=None):
+        import numpy as np
+        values = self.tolist(start, stop)
+        array_ = np.empty(len(values), dtype=object)
+        array_[:] = values
+        return array_
+
+    def to_categorical(self, start=0, stop=None):
+        import numpy as np
+        import pandas as pd
+        codes = np.asarray(self.codes)[start:stop]
+        categories = pd.Index(list(self.values))
+        return pd.Categorical.from_codes(codes, categories=categories)
+
+
+class SharedSongs(ColumnarSongs):
+    def __init__(self, filename, music_dir=None, tags=None):
+        """
+        The songs of the shared database in ``filename``, see
+        :func:`from_shared`.
+
+        :raises ValueError: If ``filename`` is not a shared database or a tag
+                            in ``tags`` is not in it
+        """
+        with open(filename, "rb") as shared_file:
+            mapping = mmap.mmap(shared_file.fileno(), 0,
+                                access=mmap.ACCESS_READ)
+        header, start = _read_header(mapping)
+        #: The path to the file the songs are stored in
+        self.filename = filename
+        self._header = header
+        self._mapping = mapping
+        self._tags = tags
+        parts = dict(header["columns"])
+        tags = _project(header["supported_tags"], tags)
+        ColumnarSongs.__init__(self, _song_type(tags), music_dir)
+        self.columns = OrderedDict((tag, _map_column(tag, parts[tag], mapping,
+                                                     start))
+                                   for tag in tags)
+
+    def append(self, song):
+        raise TypeError("The songs of a shared database can't be changed")
+
+    extend = append
+
+    def __getstate__(self):
+        return {"filename": self.filename, "music_dir": self.music_dir,
+                "tags": self._tags}
+
+    def __setstate__(self, state):
+        self.__init__(state["filename"], state["music_dir"], state["tags"])
+
+
+def _data_start(header_length):
+    """
+    Return the offset of the first array in a file whose header is
+    ``header_length`` bytes long.
+    """
+    end = len(_MAGIC) + _HEADER_LENGTH.size + header_length
+    return end + -end % _ALIGNMENT
+
+
+def _read_header(mapping):
+    """
+    Return the header of the shared database in ``mapping`` and the offset of
+    its first array.
+
+    :raises ValueError: If ``mapping`` does not contain a shared database of
+                        version :data:`SHARED_VERSION`
+    """
+    if mapping[:len(_MAGIC)] != _MAGIC:
+        raise ValueError("The file is not a shared database")
+    start = len(_MAGIC) + _HEADER_LENGTH.size
+    length, = _HEADER_LENGTH.unpack_from(mapping, len(_MAGIC))
+    header = pickle.loads(mapping[start:start + length])
+    if header["version"] != SHARED_VERSION:
+        raise ValueError("The shared database has version {version}, not "
+                         "{supported}".format(version=header["version"],
+                                              supported=SHARED_VERSION))
+    return header, _data_start(length)
+
+
+def _map_column(tag, parts, mapping, start):
+    """
+    Return the column of ``tag`` whose arrays are described by ``parts``.
+    """
+    def part(name):
+        offset, typecode, length = parts[name]
+        offset += start
+        if _PY2:
+            # Python 2 can't view the mapping as numbers, so they are copied
+            return array(typecode, mapping[offset:offset + length])
+        return memoryview(mapping)[offset:offset + length].cast(typecode)
+
+    def strings(name, decode=True):
+        return _MappedStrings(mapping, start + parts[name + "_values"][0],
+                              part(name + "_offsets"), decode)
+
+    if tag == _PATH:
+        column = PathColumn()
+        column.directories = _MappedStringColumn(
+            part("directory_codes"), strings("directory"))
+        # Filenames are byte strings on Python 2, see db._filename
+        column.filenames = strings("filename", decode=not _PY2)
+        return column
+    column = _column(tag)
+    if isinstance(column, NumericColumn):
+        column.data = part("data")
+        return column
+    return _MappedStringColumn(part("codes"), strings(""))
+
+
+class _Writer(object):
+    """
+    Collects the arrays of a shared database and their offsets.
+    """
+    def __init__(self):
+        self.arrays = []
+        self.size = 0
+
+    def add(self, data, typecode="B"):
+        """
+        Add the array or bytes ``data`` and return how to map it.
+        """
+        length = len(data) * getattr(data, "itemsize", 1)
+        offset = self.size
+        self.arrays.append((offset, data))
+        self.size += length + -length % _ALIGNMENT
+        return offset, typecode, length
+
+    def add_strings(self, parts, name, values):
+        encoded = [value if isinstance(value, bytes) else value.encode("utf-8")
+                   for value in values]
+        offsets = array(_INT64, [0])
+        position = 0
+        for value in encoded:
+            position += len(value)
+            offsets.append(position)
+        parts[name + "_offsets"] = self.add(offsets, _INT64)
+        parts[name + "_values"] = self.add(b"".join(encoded))
+
+    def add_column(self, tag, column):
+        parts = {}
+        if tag == _PATH:
+            parts["directory_codes"] = self.add(column.directories.codes, "i")
+            self.add_strings(parts, "directory", column.directories.values)
+            self.add_strings(parts, "filename", column.filenames)
+        elif isinstance(column, NumericColumn):
+            parts["data"] = self.add(column.data, column.data.typecode)
+        else:
+            parts["codes"] = self.add(column.codes, "i")
+            self.add_strings(parts, "", column.values)
+        return parts
+
+
+def to_shared(db, filename, tags=None):
+    """
+    Write the database ``db`` to ``filename`` for :func:`from_shared`. An
+    existing file is replaced atomically and keeps its permissions, a new
+    file gets the default permissions of the umask.
+
+    :param tags: The names of the tags to write. ``path`` is always
+                 included. By default, all supported tags are written.
+    """
+    tags = _project(db.supported_tags, tags)
+    songs = _columnar_songs(db, tags)
+    writer = _Writer()
+    columns = [(tag, writer.add_column(tag, column))
+               for tag, column in songs.columns.items()]
+    header = {"version": SHARED_VERSION,
+              "format_version": db.format_version,
+              "mpd_version": db.mpd_version,
+              "supported_tags": tags,
+              "columns": columns}
+    data = pickle.dumps(header, 2)
+    data_start = _data_start(len(data))
+
+    mode = _file_mode(filename)
+    directory = os.path.dirname(os.path.abspath(filename))
+    with NamedTemporaryFile(dir=directory, delete=False) as shared_file:
+        shared_file.write(_MAGIC)
+        shared_file.write(_HEADER_LENGTH.pack(len(data)))
+        shared_file.write(data)
+        for offset, array_ in writer.arrays:
+            shared_file.seek(data_start + offset)
+            shared_file.write(array_)
+        shared_file.truncate(data_start + writer.size)
+    # Temporary files are only readable by their owner, but workers may run
+    # as other users
+    os.chmod(shared_file.name, mode)
+    _replace(shared_file.name, filename)
+
+
+def from_shared(database_class, filename, music_dir=None, tags=None):
+    """
+    Open the shared database in ``filename``, which was written by
+    :func:`to_shared`. The songs of the database are a :class:`SharedSongs`.
+
+    :param str music_dir: The path to MPDs music directory
+    :param tags: The names of the tags to use. ``path`` is always included.
+                 By default, all tags in the file are used.
+    :raises ValueError: If ``filename`` is not a shared database or a tag in
+                        ``tags`` is not in it
+    """
+    songs = SharedSongs(filename, music_dir, tags)
+    header = songs._header
+    return database_class(header["format_version"], header["mpd_version"],
+                          list(songs.columns), songs)
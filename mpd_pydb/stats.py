@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+Load statistics
+===============
+
+Pass a :class:`LoadStats` object as ``stats`` to
+:meth:`~mpd_pydb.db.Database.read_file`,
+:meth:`~mpd_pydb.db.Database.iter_songs` or
+:meth:`~mpd_pydb.db.Database.to_dataframe` to find out where the time of a
+load went::
+
+    stats = LoadStats()
+    db = Database.read_file("/var/lib/mpd/database", stats=stats)
+    df = db.to_dataframe(stats=stats)
+    print(stats.as_dict())
+
+The sizes are counted and the time spent decompressing is measured on the
+blocks read from the database file, so the parser itself runs exactly as fast
+as without statistics. Decoding values, building paths and creating songs
+happen while each line is parsed and are all part of the ``parse`` phase.
+"""
+import time
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from io import RawIOBase
+
+_timer = getattr(time, "perf_counter", time.time)
+_DIRECTORY_BEGIN = b"\nbegin: "
+
+
+class LoadStats(object):
+    def __init__(self, trace_memory=False):
+        """
+        Statistics about loading and converting a database. All numbers add
+        up over all the calls this object is passed to.
+
+        :param bool trace_memory: Whether to record :attr:`peak_memory`.
+                                  Tracing allocations with :mod:`tracemalloc`
+                                  makes loading a lot slower and needs
+                                  Python 3.4 or newer.
+        """
+        #: The number of bytes read from the database file, after
+        #: decompression
+        self.bytes_read = 0
+        #: The number of lines read from the database file
+        self.lines = 0
+        #: The number of directories in the database file
+        self.directories = 0
+        #: The number of songs in the database that was read
+        self.songs = 0
+        #: An :class:`~collections.OrderedDict` mapping the name of each phase
+        #: to the time spent in it, in seconds:
+        #:
+        #: ``decompress``
+        #:     reading and decompressing the database file
+        #: ``parse``
+        #:     parsing lines and creating songs, including merging the
+        #:     songs of all processes with ``workers``
+        #: ``load_cache``, ``store_cache``
+        #:     loading and storing cache entries
+        #: ``convert``
+        #:     converting columnar songs to songs of other types
+        #: ``index``
+        #:     creating indexes
+        #: ``aggregate``
+        #:     creating aggregates
+        #: ``dataframe``, ``split_numbers``, ``compact``
+        #:     the steps of :meth:`~mpd_pydb.db.Database.to_dataframe`
+        self.phases = OrderedDict()
+        #: The peak of the memory allocated while loading, in bytes, if
+        #: ``trace_memory`` was set
+        self.peak_memory = None
+        self._trace_memory = trace_memory
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Add the time spent in the ``with`` block to the phase ``name``.
+        """
+        start = _timer()
+        try:
+            yield
+        finally:
+            self.add_time(name, _timer() - start)
+
+    def add_time(self, name, seconds):
+        """
+        Add ``seconds`` to the time spent in the phase ``name``.
+        """
+        self.phases[name] = self.phases.get(name, 0) + seconds
+
+    @contextmanager
+    def parsing(self):
+        """
+        Add the time spent in the ``with`` block to the ``parse`` phase,
+        except for the time spent in the ``decompress`` phase meanwhile.
+        """
+        decompressed = self.phases.get("decompress", 0)
+        with self.phase("parse"):
+            yield
+        self.add_time("parse",
+                      decompressed - self.phases.get("decompress", 0))
+
+    @contextmanager
+    def tracing(self):
+        """
+        Trace the memory allocated in the ``with`` block if ``trace_memory``
+        was set and update :attr:`peak_memory`.
+        """
+        if not self._trace_memory:
+            yield
+            return
+        import tracemalloc
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        try:
+            yield
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            if started:
+                tracemalloc.stop()
+            self.peak_memory = max(self.peak_memory or 0, peak)
+
+    def wrap(self, raw):
+        """
+        Return a raw stream that reads from ``raw`` and counts what is read.
+        """
+        return _MeasuredStream(raw, self)
+
+    def loaded(self, db):
+        """
+        Record the size of the database ``db`` that was read.
+        """
+        self.songs += len(db.songs)
+
+    def as_dict(self):
+        """
+        Return the statistics as a :class:`dict`, with the phases as
+        ``<name>_seconds`` keys.
+        """
+        values = OrderedDict([("bytes_read", self.bytes_read),
+                              ("lines", self.lines),
+                              ("directories", self.directories),
+                              ("songs", self.songs)])
+        for name, seconds in self.phases.items():
+            values[name + "_seconds"] = seconds
+        if self.peak_memory is not None:
+            values["peak_memory"] = self.peak_memory
+        return values
+
+    def __repr__(self):
+        return "LoadStats({values})".format(
+            values=", ".join("{key}={value!r}".format(key=key, value=value)
+                             for key, value in self.as_dict().items()))
+
+
+class _MeasuredStream(RawIOBase):
+    """
+    Counts the bytes, lines and directories read from a raw stream and the
+    time spent reading them.
+    """
+    def __init__(self, raw, stats):
+        RawIOBase.__init__(self)
+        self._raw = raw
+        self._stats = stats
+        # The end of the previous block, to find directories whose begin
+        # line starts in it
+        self._tail = b""
+
+    def readable(self):
+        return True
+
+    def _count(self, data):
+        stats = self._stats
+        stats.bytes_read += len(data)
+        stats.lines += data.count(b"\n")
+        stats.directories += (data.count(_DIRECTORY_BEGIN) +
+                              (self._tail + data[:len(_DIRECTORY_BEGIN) - 1]).
+                              count(_DIRECTORY_BEGIN))
+        self._tail = data[1 - len(_DIRECTORY_BEGIN):]
+
+    def readinto(self, buffer):
+        start = _timer()
+        read = self._raw.readinto(buffer)
+        self._stats.add_time("decompress", _timer() - start)
+        if read:
+            self._count(memoryview(buffer)[:read].tobytes())
+        return read
+
+    def readall(self):
+        readall = getattr(self._raw, "readall", None)
+        if readall is None:
+            return RawIOBase.readall(self)
+        start = _timer()
+        data = readall()
+        self._stats.add_time("decompress", _timer() - start)
+        self._count(data)
+        return data
+
+    def close(self):
+        self._raw.close()
+        RawIOBase.close(self)
+
+
+class _NoStats(object):
+    """
+    Stands in for a :class:`LoadStats` object if no statistics are wanted.
+    """
+    @contextmanager
+    def _nothing(self, name=None):
+        yield
+
+    phase = parsing = tracing = _nothing
+
+    def add_time(self, name, seconds):
+        pass
+
+    def wrap(self, raw):
+        return raw
+
+    def loaded(self, db):
+        pass
+
+
+_NO_STATS = _NoStats()
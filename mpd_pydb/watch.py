@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+Watching databases
+==================
+
+A :class:`DatabaseWatcher` keeps a database up to date with its file. A
+background thread watches the file and reads it again after MPD changed it::
+
+    with Database.watch("/var/lib/mpd/database", columnar=True) as watcher:
+        ...
+        songs = watcher.database.songs
+
+:attr:`DatabaseWatcher.database` is replaced by the new database once it has
+been read completely, so readers never see a database that is still being
+read and never wait for one. Readers that keep a reference to the old
+database can keep using it.
+
+MPD writes its database in several steps, so the file is only read again once
+it hasn't changed for ``debounce`` seconds. On Linux, changes are noticed with
+inotify. Elsewhere, or if inotify is not available, the modification time,
+size and inode of the file are checked every ``poll_interval`` seconds.
+
+If reading the changed file fails, the old database is kept and the exception
+is stored in :attr:`DatabaseWatcher.error`. The file is read again after its
+next change.
+"""
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+_timer = getattr(time, "monotonic", time.time)
+
+#: The number of seconds the file has to stay unchanged before it is read
+DEBOUNCE = 1.0
+#: The number of seconds between two checks of the file without inotify
+POLL_INTERVAL = 1.0
+
+# From <sys/inotify.h>
+_IN_MODIFY = 0x2
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_CLOEXEC = 0o2000000
+_IN_NONBLOCK = 0o4000
+_EVENT = struct.Struct("iIII")
+
+
+def _signature(filename):
+    """
+    Return what changes when ``filename`` is changed or replaced, ``None`` if
+    it doesn't exist.
+    """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_size,
+            getattr(stat, "st_mtime_ns", stat.st_mtime))
+
+
+class _PollingSource(object):
+    """
+    Notices changes by comparing the signature of the file every
+    ``interval`` seconds.
+    """
+    def __init__(self, filename, interval, stopped):
+        self._filename = filename
+        self._interval = interval
+        self._stopped = stopped
+        self._signature = _signature(filename)
+
+    def wait(self, timeout):
+        """
+        Wait for at most ``timeout`` seconds and return whether the file
+        changed.
+        """
+        if timeout is None:
+            timeout = self._interval
+        self._stopped.wait(min(timeout, self._interval))
+        signature = _signature(self._filename)
+        changed = signature != self._signature
+        self._signature = signature
+        return changed
+
+    def wake(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _InotifySource(object):
+    """
+    Notices changes with inotify. The directory of the file is watched so
+    that replacing the file is noticed as well.
+    """
+    def __init__(self, filename):
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        directory, name = os.path.split(os.path.abspath(filename))
+        self._name = name.encode(sys.getfilesystemencoding())
+        self._fd = libc.inotify_init1(_IN_CLOEXEC | _IN_NONBLOCK)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = (_IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE |
+                _IN_DELETE)
+        if libc.inotify_add_watch(
+                self._fd, directory.encode(sys.getfilesystemencoding()),
+                mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, "inotify_add_watch failed")
+        # Writing to this pipe makes wait return early
+        self._wake_read, self._wake_write = os.pipe()
+
+    def wait(self, timeout):
+        readable, _, _ = select.select([self._fd, self._wake_read], [], [],
+                                       timeout)
+        if self._wake_read in readable:
+            os.read(self._wake_read, 1)
+        if self._fd not in readable:
+            return False
+        return self._name in self._names(os.read(self._fd, 1 << 16))
+
+    @staticmethod
+    def _names(data):
+        """
+        Return the names of the files in the events in ``data``.
+        """
+        names = set()
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            names.add(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+        return names
+
+    def wake(self):
+        os.write(self._wake_write, b"\0")
+
+    def close(self):
+        for fd in (self._fd, self._wake_read, self._wake_write):
+            os.close(fd)
+
+
+def _source(filename, inotify, poll_interval, stopped):
+    """
+    Return an inotify source for ``filename`` if ``inotify`` is set or is
+    ``None`` and inotify is available, otherwise a polling source.
+    """
+    if inotify is None:
+        inotify = sys.platform.startswith("linux")
+        if inotify:
+            try:
+                return _InotifySource(filename)
+            except (AttributeError, OSError):
+                pass
+    elif inotify:
+        return _InotifySource(filename)
+    return _PollingSource(filename, poll_interval, stopped)
+
+
+class DatabaseWatcher(object):
+    def __init__(self, database_class, filename, debounce=DEBOUNCE,
+                 poll_interval=POLL_INTERVAL, inotify=None, callback=None,
+                 **kwargs):
+        """
+        Keeps the database in ``filename`` up to date with the file after
+        :meth:`start` has been called.
+
+        :param float debounce: The number of seconds the file has to stay
+                               unchanged before it is read again
+        :param float poll_interval: The number of seconds between two checks
+                                    of the file if inotify is not used
+        :param inotify: Whether to use inotify. By default, it is used if it
+                        is available.
+        :type inotify: bool or None
+        :param callback: Called with the new database after it replaced the
+                         old one
+        :param kwargs: Passed on to :meth:`~mpd_pydb.db.Database.read_file`
+        """
+        self._database_class = database_class
+        #: The path to the database file
+        self.filename = filename
+        self._debounce = debounce
+        self._poll_interval = poll_interval
+        self._inotify = inotify
+        self._callback = callback
+        self._kwargs = kwargs
+        self._database = None
+        #: The exception raised by the last failed read, ``None`` after a
+        #: successful one
+        self.error = None
+        self._stopped = threading.Event()
+        self._source = None
+        self._thread = None
+
+    @property
+    def database(self):
+        """
+        The database that was read most recently.
+        """
+        return self._database
+
+    def reload(self):
+        """
+        Read the database file and replace :attr:`database` with it.
+
+        :raises: Whatever :meth:`~mpd_pydb.db.Database.read_file` raises, in
+                 which case :attr:`database` is kept
+        """
+        try:
+            database = self._database_class.read_file(self.filename,
+                                                      **self._kwargs)
+        except Exception as error:
+            self.error = error
+            raise
+        self.error = None
+        # Assigning an attribute is atomic, so readers either get the old or
+        # the new database
+        self._database = database
+        if self._callback is not None:
+            self._callback(database)
+        return database
+
+    def start(self):
+        """
+        Read the database and start watching its file in a background thread.
+
+        :raises RuntimeError: If the watcher was started already
+        """
+        if self._thread is not None:
+            raise RuntimeError("The watcher was started already")
+        self._source = _source(self.filename, self._inotify,
+                               self._poll_interval, self._stopped)
+        try:
+            self.reload()
+        except Exception:
+            self._source.close()
+            raise
+        self._thread = threading.Thread(target=self._run,
+                                        name="DatabaseWatcher")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop watching the file and wait for the background thread to finish,
+        including a read that is in progress.
+        """
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._source.wake()
+        self._thread.join()
+        self._source.close()
+        self._thread = None
+
+    def _run(self):
+        # When the file was last changed, None if it was read since then
+        changed = None
+        while not self._stopped.is_set():
+            timeout = None
+            if changed is not None:
+                timeout = max(changed + self._debounce - _timer(), 0)
+            if self._source.wait(timeout):
+                changed = _timer()
+            elif (changed is not None and
+                  _timer() >= changed + self._debounce and
+                  not self._stopped.is_set()):
+                changed = None
+                try:
+                    self.reload()
+                except Exception:
+                    # Kept in self.error, the file is read again after its
+                    # next change
+                    pass
+
+    def __enter__(self):
+        if self._thread is None:
+            self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
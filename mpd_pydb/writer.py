@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+"""
+Writing databases
+=================
+
+:meth:`~mpd_pydb.db.Database.write_file` writes a database in MPDs format 2,
+so that it can be read by :meth:`~mpd_pydb.db.Database.read_file` and by MPD
+itself::
+
+    db.write_file("/tmp/database.gz")
+
+The songs are grouped into nested directory blocks by their ``path``. Within
+each directory, the blocks of its subdirectories come first, followed by its
+songs, just like MPD writes them. Subdirectories and songs are written in the
+order their first song appears in :attr:`~mpd_pydb.db.Database.songs`, so a
+database read from a file written by MPD is written with its songs in the same
+order, and reading it back results in the same songs.
+
+The database does not contain the modification times of directories, so each
+directory gets the newest ``mtime`` of the songs in it and its
+subdirectories. Tags of a song are written in the order of
+:attr:`~mpd_pydb.db.Database.supported_tags`.
+
+Lines are encoded and written in blocks as the directories are traversed, so
+the text of the whole database is never held in memory.
+"""
+import gzip
+import os
+
+from collections import OrderedDict
+from operator import attrgetter
+from tempfile import NamedTemporaryFile
+
+from .cache import _file_mode, _replace
+from .db import _MTIME, _PATH, _TIME, _posix
+
+# The number of lines that are encoded and written at once
+_FLUSH_LINES = 1 << 12
+# The compression level of gzip files, the one zlib uses by default. Higher
+# levels make writing a lot slower, but files only slightly smaller.
+_GZIP_LEVEL = 6
+_COMPRESSIONS = ("gzip", "zstd", "plain")
+
+
+class _Directory(object):
+    __slots__ = ("path", "name", "directories", "songs", "mtime")
+
+    def __init__(self, path, name):
+        self.path = path
+        self.name = name
+        self.directories = OrderedDict()
+        self.songs = []
+        self.mtime = None
+
+
+def _directory_tree(songs):
+    """
+    Return MPDs music root with all directories and ``(filename, song)``
+    pairs of ``songs`` in it.
+    """
+    root = _Directory(None, None)
+    directories = {None: root}
+
+    def directory(path):
+        found = directories.get(path)
+        if found is None:
+            parent, _, name = path.rpartition("/")
+            found = directories[path] = _Directory(path, name)
+            directory(parent or None).directories[name] = found
+        return found
+
+    for song in songs:
+        path, _, filename = _posix(song.path).rpartition("/")
+        directory(path or None).songs.append((filename, song))
+    return root
+
+
+def _format_time(time):
+    # MPD writes six decimal places, which are kept if that is exact
+    text = "%f" % time
+    if float(text) != time:
+        text = repr(time)
+    return text
+
+
+def _compression(filename, compression):
+    if compression is None:
+        if filename.endswith(".gz"):
+            return "gzip"
+        if filename.endswith(".zst"):
+            return "zstd"
+        return "plain"
+    if compression not in _COMPRESSIONS:
+        raise ValueError("{compression} is not one of {compressions}".format(
+            compression=compression, compressions=", ".join(_COMPRESSIONS)))
+    return compression
+
+
+def _open_output(raw, compression):
+    """
+    Return a binary file object that writes to the file object ``raw`` with
+    ``compression``.
+    """
+    if compression == "gzip":
+        # Without a filename, the name of the temporary file would be
+        # stored in the gzip header
+        return gzip.GzipFile(filename="", fileobj=raw, mode="wb",
+                             compresslevel=_GZIP_LEVEL)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("Writing zstd-compressed databases needs the "
+                             "zstandard module")
+        return zstandard.ZstdCompressor().stream_writer(raw,
+                                                        closefd=False)
+    return raw
+
+
+class _Writer(object):
+    """
+    Writes the lines of a database to a binary file object in blocks.
+    """
+    def __init__(self, db_file, supported_tags):
+        self._write = db_file.write
+        self._lines = []
+        self._has_time = _TIME in supported_tags
+        self._has_mtime = _MTIME in supported_tags
+        self._tags = [tag for tag in supported_tags
+                      if tag not in (_TIME, _MTIME, _PATH)]
+        self._prefixes = [tag + ": " for tag in self._tags]
+        # Returns a tuple of the values of all tags, even if there is only
+        # one
+        self._values = attrgetter(*(self._tags + [_PATH]))
+
+    def flush(self):
+        if self._lines:
+            self._lines.append("")
+            self._write("\n".join(self._lines).encode("utf-8"))
+            del self._lines[:]
+
+    def header(self, db):
+        lines = self._lines
+        lines.extend(["info_begin",
+                      "format: " + str(db.format_version),
+                      "mpd_version: " + db.mpd_version,
+                      "fs_charset: UTF-8"])
+        lines.extend("tag: " + tag for tag in self._tags)
+        lines.append("info_end")
+
+    def song(self, filename, song):
+        lines = self._lines
+        lines.append("song_begin: " + filename)
+        if self._has_time and song.Time is not None:
+            lines.append("Time: " + _format_time(song.Time))
+        lines.extend([prefix + value for prefix, value
+                      in zip(self._prefixes, self._values(song))
+                      if value is not None])
+        if self._has_mtime and song.mtime is not None:
+            lines.append("mtime: " + str(song.mtime))
+        lines.append("song_end")
+        if len(lines) >= _FLUSH_LINES:
+            self.flush()
+
+    def directory(self, directory):
+        lines = self._lines
+        for child in directory.directories.values():
+            lines.append("directory: " + child.name)
+            if child.mtime is not None:
+                lines.append("mtime: " + str(child.mtime))
+            lines.append("begin: " + child.path)
+            self.directory(child)
+            lines.append("end: " + child.path)
+        for filename, song in directory.songs:
+            self.song(filename, song)
+
+
+def _set_mtimes(directory, has_mtime):
+    """
+    Set the mtime of ``directory`` and its subdirectories to the newest
+    mtime of their songs.
+    """
+    mtimes = [_set_mtimes(child, has_mtime)
+              for child in directory.directories.values()]
+    if has_mtime:
+        mtimes.extend(song.mtime for _, song in directory.songs)
+    mtimes = [mtime for mtime in mtimes if mtime is not None]
+    directory.mtime = max(mtimes) if mtimes else None
+    return directory.mtime
+
+
+def write_database(db, db_file):
+    """
+    Write the database ``db`` to the binary file object ``db_file``.
+    """
+    root = _directory_tree(db.songs)
+    _set_mtimes(root, _MTIME in db.supported_tags)
+    writer = _Writer(db_file, db.supported_tags)
+    writer.header(db)
+    writer.directory(root)
+    writer.flush()
+
+
+def write_file(db, filename, compression=None):
+    """
+    Write the database ``db`` to ``filename``.
+
+    :param filename: The path to the database file, which is replaced
+                     atomically and keeps its permissions, or a binary file
+                     object
+    :param str compression: ``gzip``, ``zstd`` or ``plain``. By default,
+                            files whose names end with ``.gz`` are
+                            gzip-compressed, files whose names end with
+                            ``.zst`` are zstd-compressed and all other files
+                            and file objects are not compressed.
+    :raises ValueError: If ``compression`` is not supported or is ``zstd``
+                        and the zstandard module is not installed
+    """
+    if hasattr(filename, "write"):
+        db_file = _open_output(filename, _compression("", compression))
+        write_database(db, db_file)
+        if db_file is not filename:
+            # Only writes the end of the compressed data, the file object
+            # stays open
+            db_file.close()
+        return
+    compression = _compression(filename, compression)
+    mode = _file_mode(filename)
+    directory = os.path.dirname(os.path.abspath(filename))
+    with NamedTemporaryFile(dir=directory, delete=False) as raw:
+        try:
+            db_file = _open_output(raw, compression)
+            write_database(db, db_file)
+            if db_file is not raw:
+                db_file.close()
+            # Temporary files are only readable by their owner
+            os.chmod(raw.name, mode)
+        except BaseException:
+            raw.close()
+            os.remove(raw.name)
+            raise
+    _replace(raw.name, filename)
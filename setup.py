@@ -28,8 +28,13 @@ setup(name="mpd_pydb",
       setup_requires=["setuptools_scm", "pytest-runner"],
       use_scm_version={"write_to": "mpd_pydb/version.py"},
       install_requires=requirements,
+      entry_points={
+          'console_scripts': ['mpd-pydb = mpd_pydb.cli:main'],
+      },
       extras_require={
-          'docs': ['sphinx']
+          'arrow': ['pyarrow'],
+          'docs': ['sphinx'],
+          'zstd': ['zstandard'],
       },
       tests_require=["pytest"],
       )
@@ -0,0 +1,10 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+import sys
+
+collect_ignore = []
+if sys.version_info < (3, 6):
+    # The tests use async def and asynchronous comprehensions, which are
+    # syntax errors before Python 3.6
+    collect_ignore.append("test_aio.py")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+import mpd_pydb
+import pytest
+
+from collections import defaultdict
+from mpd_pydb.aggregate import Rollup
+from pathlib import Path, PureWindowsPath
+
+AGGREGATES = ["album", "artist", "directory"]
+
+
+@pytest.fixture(params=[{}, {"compact": True}, {"columnar": True}])
+def db(request):
+    return mpd_pydb.Database.read_file("test/mpd.db.gz", **request.param)
+
+
+def _artist(song):
+    return song.AlbumArtist or song.Artist
+
+
+def _rollups(songs, key):
+    """
+    Sum up ``songs`` per ``key`` with a full pass, like the aggregates do.
+    """
+    groups = defaultdict(list)
+    for song in songs:
+        if key(song) is not None:
+            groups[key(song)].append(song)
+    return {value: Rollup(len(group), sum(song.Time for song in group),
+                          len({(_artist(song), song.Album) for song in group
+                               if song.Album is not None}),
+                          max(song.mtime for song in group))
+            for value, group in groups.items()}
+
+
+KEYS = {"album": lambda song: (None if song.Album is None
+                               else (_artist(song), song.Album)),
+        "artist": _artist,
+        "directory": lambda song: (None if song.path.parent == Path()
+                                   else song.path.parent.as_posix())}
+
+
+def _check(db):
+    for name in AGGREGATES:
+        expected = _rollups(db.songs, KEYS[name])
+        aggregate = db.aggregate(name)
+        assert len(aggregate) == len(expected)
+        for key, rollup in aggregate.items():
+            assert rollup.songs == expected[key].songs
+            assert rollup.time == pytest.approx(expected[key].time)
+            assert rollup.albums == expected[key].albums
+            assert rollup.newest == expected[key].newest
+
+
+def test_aggregates(db):
+    _check(db)
+
+
+def test_album(db):
+    rollup = db.aggregate("album")["_ensnare_", "Impeccable Micro"]
+    assert rollup.songs == 10
+    assert rollup.albums == 1
+    assert db.aggregate("album").get(("nobody", "nothing")) is None
+    with pytest.raises(KeyError):
+        db.aggregate("album")["nobody", "nothing"]
+
+
+def test_artist(db):
+    assert db.aggregate("artist")["Anamanaguchi"] == \
+        Rollup(2, pytest.approx(463.649), 1, 1432207829)
+
+
+def test_directory(db):
+    aggregate = db.aggregate("directory")
+    assert "Anamanaguchi" in aggregate
+    assert aggregate["Anamanaguchi"].songs == 1
+    assert sorted(aggregate, key=str) == \
+        ["Anamanaguchi", "Anamanaguchi/2013 - Meow",
+         "_ensnare_/2011 - Impeccable Micro"]
+
+
+def test_directory_of_windows_path():
+    db = mpd_pydb.Database.read_file("test/mpd.db.gz")
+    aggregate = db.aggregate("directory")
+    db.add_song(db.songs[0]._replace(path=PureWindowsPath(r"new\sub\a.flac")))
+    assert aggregate["new/sub"].songs == 1
+    assert aggregate["_ensnare_/2011 - Impeccable Micro"].songs == 10
+
+
+def test_read_file_aggregates():
+    db = mpd_pydb.Database.read_file("test/mpd.db.gz",
+                                     aggregates=["album", "directory"])
+    assert sorted(db._aggregates) == ["album", "directory"]
+    db.aggregate("artist")
+    assert sorted(db._aggregates) == ["album", "artist", "directory"]
+
+
+def test_unknown_aggregate(db):
+    with pytest.raises(ValueError):
+        db.aggregate("year")
+
+
+def test_unsupported_tags():
+    db = mpd_pydb.Database.read_file("test/mpd.db.gz", tags=["Title"])
+    with pytest.raises(ValueError):
+        db.aggregate("album")
+    assert len(db.aggregate("directory")) == 3
+
+
+def test_add_song_updates_aggregates():
+    db = mpd_pydb.Database.read_file("test/mpd.db.gz")
+    for name in AGGREGATES:
+        db.aggregate(name)
+    song = db.songs[0]._replace(mtime=1500000000, Time=100.0,
+                                path=Path("new/new.flac"))
+    db.add_song(song)
+    db.add_song(song._replace(AlbumArtist="someone", Album="New"))
+    _check(db)
+    assert db.aggregate("directory")["new"].newest == 1500000000
+
+
+def test_update_from_updates_aggregates():
+    db = mpd_pydb.Database.read_file("test/mpd.db.gz",
+                                     aggregates=AGGREGATES)
+    # Pretend that the newest songs are newer than in the file and that a
+    # song was deleted from it
+    newest = max(range(len(db.songs)), key=lambda index: db.songs[index].mtime)
+    db.songs[newest] = db.songs[newest]._replace(mtime=2000000000)
+    db.add_song(db.songs[0]._replace(path=Path("gone/gone.flac"),
+                                     mtime=2000000000))
+    db._aggregates.clear()
+    db._create_aggregates(AGGREGATES)
+    assert db.aggregate("artist")["Anamanaguchi"].newest == 2000000000
+    db.update_from("test/mpd.db.gz")
+    _check(db)
+    assert "gone" not in db.aggregate("directory")
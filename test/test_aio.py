@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+import asyncio
+import mpd_pydb
+import pytest
+
+from concurrent.futures import ProcessPoolExecutor
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+@pytest.fixture
+def db():
+    return mpd_pydb.Database.read_file("test/mpd.db.gz")
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"compact": True},
+                                    {"tags": ["Title"]}])
+def test_aread_file(kwargs):
+    async def read():
+        return await mpd_pydb.Database.aread_file("test/mpd.db.gz", **kwargs)
+
+    db = run(read())
+    assert db.songs == mpd_pydb.Database.read_file("test/mpd.db.gz",
+                                                   **kwargs).songs
+
+
+def test_aread_file_process_pool(db):
+    async def read(executor):
+        return await mpd_pydb.Database.aread_file("test/mpd.db.gz", executor,
+                                                  columnar=True)
+
+    with ProcessPoolExecutor(1) as executor:
+        assert list(run(read(executor)).songs) == db.songs
+
+
+def test_aread_file_process_pool_needs_columnar():
+    async def read(executor):
+        return await mpd_pydb.Database.aread_file("test/mpd.db.gz", executor)
+
+    with ProcessPoolExecutor(1) as executor:
+        with pytest.raises(ValueError):
+            run(read(executor))
+
+
+def test_aread_file_does_not_block_the_event_loop(db):
+    ticks = []
+
+    async def tick():
+        while True:
+            ticks.append(None)
+            await asyncio.sleep(0)
+
+    async def read():
+        ticker = asyncio.ensure_future(tick())
+        db = await mpd_pydb.Database.aread_file("test/mpd.db.gz")
+        ticker.cancel()
+        return db
+
+    assert run(read()).songs == db.songs
+    assert ticks
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 1000])
+def test_aiter_songs(db, chunk_size):
+    async def read():
+        return [song async for song in mpd_pydb.Database.aiter_songs(
+            "test/mpd.db.gz", chunk_size=chunk_size)]
+
+    assert run(read()) == db.songs
+
+
+def test_aiter_songs_yields_between_chunks(db):
+    ticks = []
+
+    async def tick():
+        while True:
+            ticks.append(None)
+            await asyncio.sleep(0)
+
+    async def read():
+        ticker = asyncio.ensure_future(tick())
+        songs = []
+        async for song in mpd_pydb.Database.aiter_songs("test/mpd.db.gz",
+                                                        chunk_size=1):
+            songs.append((song, len(ticks)))
+        ticker.cancel()
+        return songs
+
+    songs = run(read())
+    assert [song for song, _ in songs] == db.songs
+    assert songs[-1][1] > songs[0][1]
+
+
+def test_aiter_songs_reader(db):
+    async def read():
+        songs = mpd_pydb.Database.aiter_songs("test/mpd.db.gz", compact=True)
+        assert songs.reader is None
+        async for song in songs:
+            break
+        return songs.reader
+
+    reader = run(read())
+    assert reader.supported_tags == db.supported_tags
+    assert reader.mpd_version == db.mpd_version
+
+
+def test_aiter_songs_aclose(db):
+    async def read():
+        async with mpd_pydb.Database.aiter_songs("test/mpd.db.gz",
+                                                 chunk_size=1) as songs:
+            first = await songs.__anext__()
+        return first, songs, [song async for song in songs]
+
+    first, songs, rest = run(read())
+    assert first == db.songs[0]
+    assert rest == []
+    assert songs.reader._file.closed
+
+
+def test_aiter_songs_errors():
+    async def read():
+        return [song async for song in mpd_pydb.Database.aiter_songs(
+            "test/does-not-exist.db.gz")]
+
+    with pytest.raises(IOError):
+        run(read())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+import pytest
+pa = pytest.importorskip("pyarrow")
+
+import mpd_pydb
+
+from mpd_pydb import db as mpd_db
+
+
+@pytest.fixture
+def db():
+    return mpd_pydb.Database.read_file("test/mpd.db.gz")
+
+
+@pytest.fixture(params=[{}, {"compact": True}, {"columnar": True}])
+def any_db(request):
+    return mpd_pydb.Database.read_file("test/mpd.db.gz", **request.param)
+
+
+def test_to_arrow(any_db, db):
+    table = any_db.to_arrow()
+    assert table.column_names == db.supported_tags
+    assert table.num_rows == len(db.songs)
+    assert table.column("path").to_pylist() == [str(song.path)
+                                                 for song in db.songs]
+    assert table.column("Time").to_pylist() == [song.Time
+                                                 for song in db.songs]
+    assert table.column("mtime").to_pylist() == [song.mtime
+                                                  for song in db.songs]
+    assert table.column("Artist").to_pylist() == [song.Artist
+                                                   for song in db.songs]
+
+
+def test_to_arrow_dictionary_encodes_strings(any_db):
+    table = any_db.to_arrow()
+    assert pa.types.is_dictionary(table.schema.field("Artist").type)
+    assert pa.types.is_string(table.schema.field("path").type)
+    assert pa.types.is_int64(table.schema.field("mtime").type)
+    assert pa.types.is_float64(table.schema.field("Time").type)
+
+
+def test_to_arrow_tags(db):
+    assert db.to_arrow(tags=["Title"]).column_names == ["path", "Title"]
+
+
+def test_to_arrow_missing_values():
+    db = mpd_db.Database(mpd_db._SUPPORTED_FORMAT_VERSION, "0.20",
+                         ["Artist", "Time", "mtime", "path"])
+    song_type = mpd_db._song_type(db.supported_tags)
+    db.add_song(song_type(None, None, None, mpd_db.Path("a/b.ogg"), None))
+    db.add_song(song_type("A", 1.5, 3, mpd_db.Path("c.ogg"), None))
+    table = db.to_arrow()
+    assert table.to_pydict() == {"Artist": [None, "A"], "Time": [None, 1.5],
+                                 "mtime": [None, 3],
+                                 "path": ["a/b.ogg", "c.ogg"]}
+    assert mpd_pydb.Database.from_arrow(table).songs == db.songs
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"compact": True}, {"columnar": True},
+                                    {"music_dir": "/music"}])
+def test_from_arrow_round_trip(db, kwargs):
+    expected = mpd_pydb.Database.read_file("test/mpd.db.gz", **kwargs)
+    copy = mpd_pydb.Database.from_arrow(db.to_arrow(), **kwargs)
+    assert list(copy.songs) == list(expected.songs)
+    assert copy.supported_tags == db.supported_tags
+    assert copy.mpd_version == db.mpd_version
+    assert copy.format_version == db.format_version
+
+
+def test_from_arrow_chunked(db):
+    table = db.to_arrow()
+    chunked = pa.concat_tables([table.slice(0, 3), table.slice(3)])
+    assert mpd_pydb.Database.from_arrow(chunked).songs == db.songs
+
+
+def test_from_arrow_needs_metadata(db):
+    with pytest.raises(ValueError):
+        mpd_pydb.Database.from_arrow(db.to_arrow().replace_schema_metadata())
+
+
+def test_parquet_round_trip(db, tmpdir):
+    filename = str(tmpdir.join("mpd.parquet"))
+    db.to_parquet(filename)
+    copy = mpd_pydb.Database.from_parquet(filename)
+    assert copy.songs == db.songs
+    assert copy.supported_tags == db.supported_tags
+    assert copy.mpd_version == db.mpd_version
+
+
+def test_from_parquet_tags(db, tmpdir):
+    filename = str(tmpdir.join("mpd.parquet"))
+    db.to_parquet(filename)
+    copy = mpd_pydb.Database.from_parquet(filename, tags=["Title"])
+    expected = mpd_pydb.Database.read_file("test/mpd.db.gz", tags=["Title"])
+    assert copy.supported_tags == ["path", "Title"]
+    assert copy.songs == expected.songs
+    with pytest.raises(ValueError):
+        mpd_pydb.Database.from_parquet(filename, tags=["Unknown"])
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+import csv
+import gzip
+import io
+import json
+import mpd_pydb
+import pytest
+import subprocess
+import sys
+
+from collections import OrderedDict
+from mpd_pydb.cli import main
+from mpd_pydb.db import _posix
+from mpd_pydb.query import PathPrefix, Range, TagEquals
+
+DATABASE = "test/mpd.db.gz"
+
+
+@pytest.fixture
+def db():
+    return mpd_pydb.Database.read_file(DATABASE)
+
+
+def _run(capsys, *argv):
+    assert main([DATABASE] + list(argv)) == 0
+    return capsys.readouterr()
+
+
+def _jsonl(capsys, *argv):
+    out = _run(capsys, *argv).out
+    return [json.loads(line, object_pairs_hook=OrderedDict)
+            for line in out.splitlines()]
+
+
+def _csv(out):
+    lines = out.splitlines()
+    if sys.version_info < (3,):
+        # Python 2's csv module only reads and returns byte strings
+        return [[value.decode("utf-8") for value in row]
+                for row in csv.reader(line.encode("utf-8") for line in lines)]
+    return list(csv.reader(lines))
+
+
+def _path(song):
+    return _posix(song.path)
+
+
+def test_jsonl(capsys, db):
+    rows = _jsonl(capsys)
+    assert len(rows) == len(db.songs)
+    for row, song in zip(rows, db.songs):
+        assert list(row) == db.supported_tags
+        assert row["path"] == _path(song)
+        assert row["Time"] == song.Time
+        assert row["Artist"] == song.Artist
+        assert row["Name"] is None
+
+
+def test_columns(capsys, db):
+    rows = _jsonl(capsys, "--columns", "Title,path")
+    assert rows == [{"Title": song.Title, "path": _path(song)}
+                    for song in db.songs]
+    assert all(list(row) == ["Title", "path"] for row in rows)
+
+
+def test_single_column(capsys, db):
+    assert _jsonl(capsys, "-c", "Artist") == [{"Artist": song.Artist}
+                                              for song in db.songs]
+
+
+def test_csv(capsys, db):
+    out = _run(capsys, "--format", "csv", "-c", "path,Time,Genre").out
+    rows = _csv(out)
+    assert rows[0] == ["path", "Time", "Genre"]
+    assert rows[1:] == [[_path(song), str(song.Time),
+                         song.Genre or ""]
+                        for song in db.songs]
+
+
+def test_tsv_without_header(capsys, db):
+    out = _run(capsys, "-f", "tsv", "--no-header", "-c", "path,Title").out
+    assert out.splitlines() == [_path(song) + "\t" + song.Title
+                                for song in db.songs]
+
+
+def test_filters(capsys, db):
+    mtime = sorted(song.mtime for song in db.songs)[len(db.songs) // 2]
+    expected = db.select(TagEquals("AlbumArtist", "_ensnare_"),
+                         Range("mtime", minimum=mtime),
+                         PathPrefix("_ensnare_"))
+    assert expected
+    rows = _jsonl(capsys, "-c", "path", "--where", "AlbumArtist=_ensnare_",
+                  "--range", "mtime={mtime}:".format(mtime=mtime),
+                  "--path", "_ensnare_")
+    assert [row["path"] for row in rows] == \
+        [_path(song) for song in expected]
+
+
+def test_where_numeric(capsys, db):
+    song = db.songs[0]
+    rows = _jsonl(capsys, "-c", "path",
+                  "-w", "mtime={mtime}".format(mtime=song.mtime))
+    assert {"path": _path(song)} in rows
+
+
+def test_music_dir(capsys, db):
+    rows = _jsonl(capsys, "-c", "path", "--music-dir", "/music")
+    assert rows[0]["path"] == "/music/" + _path(db.songs[0])
+
+
+def test_stats(capsys, db):
+    captured = _run(capsys, "--stats", "-c", "path", "-w", "Artist=_ensnare_")
+    stats = dict(line.split(": ") for line in captured.err.splitlines())
+    songs = len(db.select(TagEquals("Artist", "_ensnare_")))
+    assert int(stats["songs"]) == songs == len(captured.out.splitlines())
+    assert int(stats["bytes_read"]) > 0
+    assert float(stats["songs_per_second"]) > 0
+
+
+def test_stdin(capsys, monkeypatch, db):
+    with gzip.open(DATABASE) as db_file:
+        data = db_file.read()
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(data)))
+    assert main(["-", "-c", "path"]) == 0
+    assert len(capsys.readouterr().out.splitlines()) == len(db.songs)
+
+
+@pytest.mark.parametrize("argv", [
+    ["-c", "Foo"],
+    ["-w", "Foo=bar"],
+    ["-w", "Artist"],
+    ["-w", "path=foo"],
+    ["-w", "mtime=soon"],
+    ["-r", "Artist=a:b"],
+    ["-r", "Time=1"],
+    ["-r", "Time=a:"],
+    ["-c", "path,,Title"],
+    ["-f", "xml"],
+])
+def test_invalid_arguments(capsys, argv):
+    with pytest.raises(SystemExit) as excinfo:
+        main([DATABASE] + argv)
+    assert excinfo.value.code == 2
+    assert "error" in capsys.readouterr().err
+
+
+def test_missing_file(tmpdir, capsys):
+    with pytest.raises(SystemExit):
+        main([str(tmpdir.join("database"))])
+
+
+def test_module(db):
+    out = subprocess.check_output([sys.executable, "-m", "mpd_pydb",
+                                   DATABASE, "-c", "path"])
+    assert len(out.splitlines()) == len(db.songs)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+import mpd_pydb
+import mpd_pydb.cache
+import os
+import pickle
+import pytest
+
+from pathlib import Path
+
+
+@pytest.fixture
+def db():
+    return mpd_pydb.Database.read_file("test/mpd.db.gz")
+
+
+@pytest.fixture
+def columnar_db():
+    return mpd_pydb.Database.read_file("test/mpd.db.gz", columnar=True)
+
+
+def test_songs_match_default(columnar_db, db):
+    assert len(columnar_db.songs) == len(db.songs)
+    assert list(columnar_db.songs) == db.songs
+    assert columnar_db.songs[-1] == db.songs[-1]
+    assert columnar_db.songs[2:4] == db.songs[2:4]
+
+
+def test_string_columns_are_dictionary_encoded(columnar_db):
+    column = columnar_db.songs.columns["AlbumArtist"]
+    assert len(column.values) < len(column)
+    assert column[0] == "_ensnare_"
+    assert column.find("_ensnare_") == list(range(10))
+    assert column[-1] is None
+
+
+def test_missing_values(columnar_db):
+    assert columnar_db.songs[0].Name is None
+    assert columnar_db.songs.columns["Name"].find("foo") == []
+
+
+def test_add_song(columnar_db, db):
+    song = db.songs[3]
+    columnar_db.add_song(song)
+    assert len(columnar_db.songs) == 13
+    assert columnar_db.songs[-1] == song
+    assert columnar_db.songs[-1].path == (Path("_ensnare_") /
+                                          "2011 - Impeccable Micro" /
+                                          song.path.name)
+
+
+def test_compact_and_columnar():
+    with pytest.raises(ValueError):
+        mpd_pydb.Database.read_file("test/mpd.db.gz", compact=True,
+                                    columnar=True)
+
+
+def test_to_arrays(columnar_db, db):
+    pytest.importorskip("numpy")
+    arrays = columnar_db.songs.to_arrays()
+    assert list(arrays) == db.supported_tags
+    assert list(arrays["mtime"]) == [song.mtime for song in db.songs]
+    assert list(arrays["Title"]) == [song.Title for song in db.songs]
+    assert list(arrays["path"]) == [song.path for song in db.songs]
+
+
+@pytest.fixture
+def cache_dir(tmpdir):
+    return str(tmpdir.join("cache"))
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"compact": True}, {"columnar": True}])
+def test_cache_matches_uncached(kwargs, cache_dir, db):
+    for _ in range(2):
+        cached = mpd_pydb.Database.read_file("test/mpd.db.gz",
+                                             cache_dir=cache_dir, **kwargs)
+        assert list(cached.songs) == db.songs
+        assert cached.supported_tags == db.supported_tags
+        assert cached.mpd_version == db.mpd_version
+
+
+def test_cache_is_used(cache_dir, monkeypatch):
+    mpd_pydb.Database.read_file("test/mpd.db.gz", cache_dir=cache_dir)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The database was parsed again")
+
+    monkeypatch.setattr(mpd_pydb.db, "SongReader", fail)
+    db = mpd_pydb.Database.read_file("test/mpd.db.gz", cache_dir=cache_dir,
+                                     music_dir="/music")
+    assert len(db.songs) == 12
+    assert db.songs[0].music_dir_ == "/music"
+
+
+def test_cache_is_invalidated(tmpdir, cache_dir):
+    filename = str(tmpdir.join("mpd.db.gz"))
+    with open("test/mpd.db.gz", "rb") as source:
+        data = source.read()
+    with open(filename, "wb") as target:
+        target.write(data)
+    mpd_pydb.Database.read_file(filename, cache_dir=cache_dir)
+
+    path = mpd_pydb.cache.cache_filename(filename, cache_dir)
+    with open(path, "wb") as entry:
+        entry.write(b"garbage")
+    assert len(mpd_pydb.Database.read_file(filename,
+                                           cache_dir=cache_dir).songs) == 12
+
+    os.utime(filename, (0, 0))
+    key = mpd_pydb.cache._cache_key(filename)
+    mpd_pydb.Database.read_file(filename, cache_dir=cache_dir)
+    assert mpd_pydb.cache._load(path, key) is not None
+
+
+def test_cache_entry_that_is_not_a_dict(cache_dir):
+    path = mpd_pydb.cache.cache_filename("test/mpd.db.gz", cache_dir)
+    os.makedirs(cache_dir)
+    with open(path, "wb") as entry:
+        pickle.dump(["key"], entry)
+    assert mpd_pydb.cache._load(path, None) is None
+    assert len(mpd_pydb.Database.read_file("test/mpd.db.gz",
+                                           cache_dir=cache_dir).songs) == 12
+
+
+def test_cache_dir_is_not_writable(tmpdir, db):
+    # A file where the cache directory should be created
+    cache_dir = tmpdir.join("file").ensure().join("cache")
+    cached = mpd_pydb.Database.read_file("test/mpd.db.gz",
+                                         cache_dir=str(cache_dir))
+    assert cached.songs == db.songs
+
+
+def test_cache_entry_is_not_written(cache_dir, monkeypatch, db):
+    def fail(*args, **kwargs):
+        raise pickle.PicklingError("Not today")
+
+    monkeypatch.setattr(mpd_pydb.cache.pickle, "dump", fail)
+    cached = mpd_pydb.Database.read_file("test/mpd.db.gz", cache_dir=cache_dir)
+    assert cached.songs == db.songs
+    # The temporary file is removed
+    assert os.listdir(cache_dir) == []
+
+
+def test_cache_projection(cache_dir, db):
+    mpd_pydb.Database.read_file("test/mpd.db.gz", cache_dir=cache_dir)
+    projected = mpd_pydb.Database.read_file("test/mpd.db.gz",
+                                            cache_dir=cache_dir,
+                                            tags=["Title"])
+    assert projected.supported_tags == ["path", "Title"]
+    assert [song.Title for song in projected.songs] == [song.Title
+                                                        for song in db.songs]
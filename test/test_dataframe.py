@@ -7,7 +7,10 @@ pytest.importorskip("pandas")
 
 from collections import namedtuple
 from mpd_pydb import db as mpd_db
+import pandas as pd
+
 from pandas import Index
+from pandas.testing import assert_frame_equal, assert_series_equal
 
 
 @pytest.fixture
@@ -48,3 +51,124 @@ def test_columns(db, supported_tags):
     index = Index(supported_tags)
 
     assert df.columns.equals(index)
+
+
+def test_missing_total(db, song_type):
+    db.songs.append(song_type("3", None))
+    df = db.to_dataframe()
+    assert df["Track"].values[0] == 3
+    assert df["TotalTracks"].isna().all()
+    assert df["Disc"].isna().all()
+
+
+@pytest.mark.parametrize("value", ["A1", "1 of 12", "3-5", "1/2/3", "x/12"])
+def test_malformed_numbers(db, song_type, value):
+    db.songs.append(song_type(value, value))
+    df = db.to_dataframe()
+    for column in ["Track", "Disc", "TotalDiscs", "TotalTracks"]:
+        assert df[column].isna().all()
+
+
+def test_numbers_with_spaces(db, song_type):
+    db.songs.append(song_type(" 1 / 12 ", "2/"))
+    df = db.to_dataframe()
+    assert df.loc[0, ["Track", "TotalTracks", "Disc"]].tolist() == [1, 12, 2]
+    assert df["TotalDiscs"].isna().all()
+
+
+def test_nullable_integer_dtypes(db, song_type):
+    db.songs.append(song_type("1/2", "1"))
+    df = db.to_dataframe()
+    for column in ["Track", "Disc", "TotalDiscs", "TotalTracks"]:
+        assert str(df[column].dtype) == "Int64"
+
+
+def test_read_file_to_dataframe():
+    db = mpd_db.Database.read_file("test/mpd.db.gz", music_dir="/music")
+    df = db.to_dataframe()
+    assert len(df) == 12
+    assert list(df.columns[:-2]) == db.supported_tags
+    assert df["Track"].tolist()[-3:-1] == [10, 1]
+    assert df["Track"].isna().tolist()[-1]
+
+
+def test_to_dataframe_tags():
+    db = mpd_db.Database.read_file("test/mpd.db.gz")
+    df = db.to_dataframe(tags=["Title", "Track"])
+    assert list(df.columns) == ["path", "Title", "Track", "TotalTracks"]
+    assert df["Track"].tolist()[:2] == [1, 2]
+
+
+def test_to_dataframe_projected_columnar():
+    db = mpd_db.Database.read_file("test/mpd.db.gz", columnar=True,
+                                   tags=["Artist"])
+    df = db.to_dataframe()
+    assert list(df.columns) == ["path", "Artist"]
+    assert df["Artist"].tolist()[0] == "_ensnare_"
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"compact": True}, {"columnar": True},
+                                    {"tags": ["Title", "Track"]}])
+@pytest.mark.parametrize("chunksize", [1, 5, 12, 100])
+def test_iter_dataframes(kwargs, chunksize):
+    db = mpd_db.Database.read_file("test/mpd.db.gz", **kwargs)
+    expected = db.to_dataframe()
+    chunks = list(db.iter_dataframes(chunksize))
+    assert len(chunks) == -(-12 // chunksize)
+    assert all(len(chunk) <= chunksize for chunk in chunks)
+    assert_frame_equal(pd.concat(chunks), expected)
+
+
+@pytest.mark.parametrize("chunksize", [1, 5, 100])
+def test_song_reader_iter_dataframes(chunksize):
+    expected = mpd_db.Database.read_file("test/mpd.db.gz",
+                                         tags=["Track"]).to_dataframe()
+    with mpd_db.Database.iter_songs("test/mpd.db.gz",
+                                    tags=["Track"]) as reader:
+        chunks = list(reader.iter_dataframes(chunksize))
+    assert all(len(chunk) <= chunksize for chunk in chunks)
+    assert_frame_equal(pd.concat(chunks), expected)
+
+
+def test_iter_dataframes_chunksize(db):
+    with pytest.raises(ValueError):
+        db.iter_dataframes(0)
+    assert list(db.iter_dataframes(10)) == []
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"compact": True}, {"columnar": True}])
+def test_compact_dataframe(kwargs):
+    db = mpd_db.Database.read_file("test/mpd.db.gz", **kwargs)
+    expected = db.to_dataframe()
+    df = db.to_dataframe(compact=True)
+    assert list(df.columns) == list(expected.columns)
+    assert str(df["Time"].dtype) == "float32"
+    assert str(df["mtime"].dtype).startswith("datetime64")
+    assert df["mtime"].iloc[0] == pd.Timestamp(expected["mtime"].iloc[0],
+                                               unit="s", tz="UTC")
+    for column in ["Track", "Disc", "TotalDiscs", "TotalTracks"]:
+        assert str(df[column].dtype) == "UInt8"
+        assert df[column].tolist() == expected[column].tolist()
+    for column in ["Artist", "Album", "Title", "Genre"]:
+        assert isinstance(df[column].dtype, pd.CategoricalDtype)
+        assert_series_equal(df[column].astype(expected[column].dtype),
+                            expected[column])
+    assert df["path"].tolist() == expected["path"].tolist()
+    assert (df.memory_usage(deep=True).sum() <
+            expected.memory_usage(deep=True).sum())
+
+
+def test_compact_dataframe_large_numbers(db, song_type):
+    db.songs.append(song_type("300/1000", None))
+    df = db.to_dataframe(compact=True)
+    assert str(df["Track"].dtype) == "UInt16"
+    assert df["TotalTracks"].tolist() == [1000]
+    assert str(df["Disc"].dtype) == "UInt8"
+
+
+def test_compact_iter_dataframes():
+    db = mpd_db.Database.read_file("test/mpd.db.gz", columnar=True)
+    chunks = list(db.iter_dataframes(5, compact=True))
+    assert all(isinstance(chunk["Artist"].dtype, pd.CategoricalDtype)
+               for chunk in chunks)
+    assert_frame_equal(pd.concat(chunks), db.to_dataframe(compact=True))
@@ -2,7 +2,10 @@
 # coding: utf-8
 # Copyright © 2015, 2016 Wieland Hoffmann
 # License: MIT, see LICENSE for details
+import copy
+import gzip
 import mpd_pydb
+import mpd_pydb.compression
 import pytest
 
 
@@ -117,7 +120,7 @@ def test_format_check(format, monkeypatch):
     if format == mpd_pydb.db._SUPPORTED_FORMAT_VERSION:
         pytest.skip()
 
-    monkeypatch.setattr(mpd_pydb.db, "open", gzip_read_mock(format))
+    monkeypatch.setattr(mpd_pydb.db, "_open", gzip_read_mock(format))
     with pytest.raises(ValueError):
         mpd_pydb.Database.read_file("")
 
@@ -152,3 +155,226 @@ def test_fspath_with_music_dir(db_with_music_dir):
     path = fspath(song)
     assert path == join("/home", "test", "Musik", "_ensnare_",
                         "2011 - Impeccable Micro", "01 - Intro.flac")
+
+
+def test_iter_songs_header():
+    with mpd_pydb.Database.iter_songs("test/mpd.db.gz") as reader:
+        assert reader.format_version == mpd_pydb.db._SUPPORTED_FORMAT_VERSION
+        assert reader.mpd_version == "0.20"
+        assert reader.supported_tags[:3] == ["Time", "mtime", "path"]
+        assert reader.database.songs == []
+
+
+def test_iter_songs_matches_read_file(db):
+    reader = mpd_pydb.Database.iter_songs("test/mpd.db.gz")
+    assert list(reader) == db.songs
+
+
+def test_iter_songs_truncated_header(monkeypatch):
+    monkeypatch.setattr(mpd_pydb.db, "_open",
+                        lambda *args, **kwargs: BytesIO(b"info_begin\n"))
+    with pytest.raises(ValueError):
+        mpd_pydb.Database.iter_songs("")
+
+
+def test_song_block_parsing(monkeypatch):
+    data = b"""info_begin
+format: 2
+mpd_version: 0.20
+tag: Title
+info_end
+directory: a
+mtime: 1
+begin: a
+song_begin: b.flac
+Title: Foo: Bar 
+Unknown: ignored
+song_end
+end: a
+"""
+    monkeypatch.setattr(mpd_pydb.db, "_open",
+                        lambda *args, **kwargs: BytesIO(data))
+    song, = mpd_pydb.Database.read_file("").songs
+    assert song.Title == "Foo: Bar"
+    assert song.mtime is None
+    assert song.path == Path("a") / "b.flac"
+
+
+@pytest.fixture
+def compact_db():
+    return mpd_pydb.Database.read_file("test/mpd.db.gz",
+                                       music_dir="/home/test/Musik",
+                                       compact=True)
+
+
+def test_compact_songs_match_default(compact_db, db_with_music_dir):
+    assert compact_db.songs == db_with_music_dir.songs
+
+
+def test_compact_song_attributes(compact_db):
+    song = compact_db.songs[0]
+    assert song.Title == "Intro"
+    assert song.Name is None
+    assert song.path == (Path("_ensnare_") / "2011 - Impeccable Micro" /
+                         "01 - Intro.flac")
+    with pytest.raises(AttributeError):
+        song.NotATag
+
+
+def test_compact_song_fspath(compact_db):
+    path = fspath(compact_db.songs[0])
+    assert path == join("/home", "test", "Musik", "_ensnare_",
+                        "2011 - Impeccable Micro", "01 - Intro.flac")
+
+
+def test_compact_song_values_are_shared(compact_db):
+    first, second = compact_db.songs[:2]
+    assert first.Album is second.Album
+    assert first._directory is second._directory
+
+
+@pytest.mark.parametrize("copy_song", [copy.copy, copy.deepcopy])
+def test_copy_compact_song(compact_db, copy_song):
+    song = compact_db.songs[0]
+    copied = copy_song(song)
+    assert type(copied) is type(song)
+    assert copied == song
+    assert copied.music_dir_ == song.music_dir_
+    # Copies of songs whose path has been built keep it
+    assert copy_song(song).path == copied.path == song.path
+
+
+def _write_db(path, data):
+    with gzip.open(str(path), "wb") as db_file:
+        db_file.write(data)
+
+
+def test_update_from(tmpdir, db):
+    with gzip.open("test/mpd.db.gz", "rb") as db_file:
+        data = db_file.read()
+    filename = tmpdir.join("mpd.db.gz")
+    _write_db(filename, data)
+    updated = mpd_pydb.Database.read_file(str(filename))
+
+    # Modify the first song, remove the second and add one to the root
+    first, second = data.split(b"song_begin: ", 3)[1:3]
+    new_first = first.replace(b"Title: Intro", b"Title: Outro").replace(
+        b"mtime: 1432207804", b"mtime: 1432207900")
+    data = data.replace(first, new_first).replace(
+        b"song_begin: " + second, b"")
+    data += b"song_begin: new.flac\nTitle: New\nmtime: 1\nsong_end\n"
+    _write_db(filename, data)
+
+    diff = updated.refresh()
+    assert [song.path for song in diff.added] == [Path("new.flac")]
+    assert diff.removed == [db.songs[1]]
+    (old, new), = diff.modified
+    assert old == db.songs[0]
+    assert new.Title == "Outro"
+    assert len(updated.songs) == 12
+    assert updated.songs[0] is new
+    assert updated.songs[1:-1] == db.songs[2:]
+    assert updated.songs[-1] is diff.added[0]
+
+
+def test_update_from_unchanged(db):
+    songs = list(db.songs)
+    diff = db.update_from("test/mpd.db.gz")
+    assert diff == ([], [], [])
+    assert all(new is old for new, old in zip(db.songs, songs))
+
+
+def test_refresh_without_file():
+    db = mpd_pydb.Database(mpd_pydb.db._SUPPORTED_FORMAT_VERSION, "0.20", [])
+    with pytest.raises(ValueError):
+        db.refresh()
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"compact": True}])
+def test_tags_projection(db, kwargs):
+    projected = mpd_pydb.Database.read_file("test/mpd.db.gz",
+                                            tags=["Title", "mtime"], **kwargs)
+    assert projected.supported_tags == ["mtime", "path", "Title"]
+    for song, full_song in zip(projected.songs, db.songs):
+        assert song._fields == ("mtime", "path", "Title", "music_dir_")
+        assert (song.mtime, song.path, song.Title) == (full_song.mtime,
+                                                       full_song.path,
+                                                       full_song.Title)
+        assert not hasattr(song, "Artist")
+
+
+def test_tags_projection_with_where(db):
+    from mpd_pydb.query import TagEquals
+    projected = mpd_pydb.Database.read_file(
+        "test/mpd.db.gz", tags=["Title"],
+        where=[TagEquals("Album", "Impeccable Micro")])
+    assert [song.Title for song in projected.songs] == [
+        song.Title for song in db.songs[:10]]
+
+
+def test_tags_projection_unsupported():
+    with pytest.raises(ValueError):
+        mpd_pydb.Database.read_file("test/mpd.db.gz", tags=["NotATag"])
+
+
+def test_tags_projection_skips_other_tags():
+    with mpd_pydb.Database.iter_songs("test/mpd.db.gz",
+                                      tags=["Title"]) as reader:
+        assert set(reader._builder.handlers) == {b"Title"}
+        assert reader.tags == ["path", "Title"]
+        assert len(reader.supported_tags) == 19
+
+
+@pytest.fixture
+def uncompressed():
+    with gzip.open("test/mpd.db.gz", "rb") as db_file:
+        return db_file.read()
+
+
+def test_read_uncompressed(tmpdir, uncompressed, db):
+    filename = tmpdir.join("mpd.db")
+    filename.write_binary(uncompressed)
+    assert mpd_pydb.Database.read_file(str(filename)).songs == db.songs
+
+
+def _gzip(data):
+    # gzip.compress doesn't exist on Python 2
+    compressed = BytesIO()
+    with gzip.GzipFile(fileobj=compressed, mode="wb") as db_file:
+        db_file.write(data)
+    return compressed.getvalue()
+
+
+@pytest.fixture(params=[True, False])
+def has_eof(request, monkeypatch):
+    """
+    Whether decompressors have an ``eof`` attribute, which they don't before
+    Python 3.3.
+    """
+    if request.param and not mpd_pydb.compression._HAS_EOF:
+        pytest.skip("Decompressors don't have an eof attribute")
+    monkeypatch.setattr(mpd_pydb.compression, "_HAS_EOF", request.param)
+    return request.param
+
+
+def test_read_multiple_gzip_members(tmpdir, uncompressed, db, has_eof):
+    filename = tmpdir.join("mpd.db.gz")
+    half = len(uncompressed) // 2
+    filename.write_binary(_gzip(uncompressed[:half]) +
+                          _gzip(uncompressed[half:]))
+    assert mpd_pydb.Database.read_file(str(filename)).songs == db.songs
+
+
+@pytest.mark.parametrize("cut", [4, 100])
+def test_read_truncated_gzip(tmpdir, uncompressed, has_eof, cut):
+    filename = tmpdir.join("mpd.db.gz")
+    filename.write_binary(_gzip(uncompressed)[:-cut])
+    with pytest.raises(EOFError):
+        mpd_pydb.Database.read_file(str(filename))
+
+
+def test_read_zstd(tmpdir, uncompressed, db):
+    zstandard = pytest.importorskip("zstandard")
+    filename = tmpdir.join("mpd.db.zst")
+    filename.write_binary(zstandard.ZstdCompressor().compress(uncompressed))
+    assert mpd_pydb.Database.read_file(str(filename)).songs == db.songs
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+import mpd_pydb
+import pytest
+
+from mpd_pydb.columnar import ColumnarSongs
+from pathlib import Path
+
+
+@pytest.fixture
+def db():
+    return mpd_pydb.Database.read_file("test/mpd.db.gz",
+                                       indexes=["AlbumArtist", "mtime"])
+
+
+def test_indexes_are_created(db):
+    assert sorted(db._indexes) == ["AlbumArtist", "mtime"]
+
+
+def test_find(db):
+    songs = db.find("AlbumArtist", "_ensnare_")
+    assert songs == [song for song in db.songs
+                     if song.AlbumArtist == "_ensnare_"]
+    assert db.find("AlbumArtist", "nobody") == []
+    assert db.find("AlbumArtist", None) == [db.songs[-1]]
+
+
+def test_find_creates_index_lazily(db):
+    assert "Genre" not in db._indexes
+    db.find("Genre", "Electronic")
+    assert "Genre" in db._indexes
+
+
+def test_find_unsupported_tag(db):
+    with pytest.raises(ValueError):
+        db.find("NotATag", "foo")
+
+
+def test_find_range(db):
+    songs = db.find_range("mtime", 1432207801, 1432207810)
+    assert songs == sorted((song for song in db.songs
+                            if 1432207801 <= song.mtime <= 1432207810),
+                           key=lambda song: song.mtime)
+    assert len(db.find_range("mtime")) == 12
+    assert db.find_range("Time", minimum=1000) == []
+    with pytest.raises(ValueError):
+        db.find_range("Artist")
+
+
+def test_song_at(db):
+    path = Path("Anamanaguchi") / "Pop It.mp3"
+    assert db.song_at(path) is db.songs[-1]
+    assert db.song_at("Anamanaguchi/Pop It.mp3") is db.songs[-1]
+    assert db.song_at("nothing/here.mp3") is None
+
+
+def test_add_song_updates_indexes(db):
+    song = db.songs[0]._replace(AlbumArtist="someone", mtime=1,
+                                path=Path("new.flac"))
+    db.song_at("new.flac")
+    db.add_song(song)
+    assert db.find("AlbumArtist", "someone") == [song]
+    assert db.find_range("mtime", maximum=1) == [song]
+    assert db.song_at("new.flac") is song
+
+
+def test_update_from_updates_indexes(db):
+    song = db.songs[0]
+    db.songs[0] = song._replace(mtime=0)
+    db._indexes.clear()
+    db.create_index("mtime")
+    db.update_from("test/mpd.db.gz")
+    assert db.find_range("mtime", maximum=0) == []
+    assert db.songs[0] in db.find("mtime", song.mtime)
+
+
+@pytest.fixture(params=["columnar", "shared"])
+def columnar_db(request, tmpdir):
+    db = mpd_pydb.Database.read_file("test/mpd.db.gz", columnar=True)
+    if request.param == "shared":
+        filename = str(tmpdir.join("shared"))
+        db.to_shared(filename)
+        db = mpd_pydb.Database.from_shared(filename)
+    return db
+
+
+def test_columnar_indexes(db, columnar_db):
+    for tag, value in [("AlbumArtist", "_ensnare_"), ("AlbumArtist", None),
+                       ("Genre", "nothing"), ("mtime", 1432207800)]:
+        assert columnar_db.find(tag, value) == db.find(tag, value)
+    assert columnar_db.find_range("mtime", 1432207801, 1432207810) == \
+        db.find_range("mtime", 1432207801, 1432207810)
+    assert columnar_db.find_range("Time") == db.find_range("Time")
+    assert columnar_db.song_at(Path("Anamanaguchi") / "Pop It.mp3") == \
+        db.songs[-1]
+    assert columnar_db.song_at("nothing/here.mp3") is None
+
+
+def test_columnar_indexes_create_found_songs(columnar_db, monkeypatch):
+    created = []
+    song = ColumnarSongs._song
+
+    def counting_song(self, index):
+        created.append(index)
+        return song(self, index)
+
+    monkeypatch.setattr(ColumnarSongs, "_song", counting_song)
+    for tag in columnar_db.supported_tags:
+        columnar_db.create_index(tag)
+    assert created == []
+    assert len(columnar_db.find("Artist", "Anamanaguchi")) == 2
+    assert created == [10, 11]
+
+
+def test_columnar_add_song_updates_indexes():
+    db = mpd_pydb.Database.read_file("test/mpd.db.gz", columnar=True,
+                                     indexes=["AlbumArtist", "mtime", "path"])
+    song = db.songs[0]._replace(AlbumArtist="someone", mtime=1,
+                                path=Path("new.flac"))
+    db.add_song(song)
+    assert db.find("AlbumArtist", "someone") == [song]
+    assert db.find_range("mtime", maximum=1) == [song]
+    assert db.song_at("new.flac") == song
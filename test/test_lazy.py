@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+import gzip
+import io
+import mpd_pydb
+import pytest
+import sys
+import threading
+
+from mpd_pydb.lazy import LazySongs
+
+
+@pytest.fixture
+def db():
+    return mpd_pydb.Database.read_file("test/mpd.db.gz")
+
+
+@pytest.fixture
+def lazy_db():
+    return mpd_pydb.Database.read_file("test/mpd.db.gz", lazy=True)
+
+
+def test_lazy_songs(db, lazy_db):
+    assert isinstance(lazy_db.songs, LazySongs)
+    assert len(lazy_db.songs) == len(db.songs)
+    assert lazy_db.songs.parsed() == 0
+    assert list(lazy_db.songs) == db.songs
+    assert lazy_db.supported_tags == db.supported_tags
+    assert lazy_db.mpd_version == db.mpd_version
+
+
+def test_songs_are_parsed_once(db, lazy_db):
+    song = lazy_db.songs[3]
+    assert song == db.songs[3]
+    assert lazy_db.songs.parsed() == 1
+    assert lazy_db.songs[3] is song
+    assert lazy_db.songs[-1] == db.songs[-1]
+    assert lazy_db.songs[2:5] == db.songs[2:5]
+    assert lazy_db.songs.parsed() == 4
+    with pytest.raises(IndexError):
+        lazy_db.songs[len(db.songs)]
+
+
+@pytest.fixture
+def switch_often():
+    # Makes the threads interleave while they parse songs
+    if hasattr(sys, "setswitchinterval"):
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        yield
+        sys.setswitchinterval(interval)
+    else:
+        # Python 2
+        interval = sys.getcheckinterval()
+        sys.setcheckinterval(1)
+        yield
+        sys.setcheckinterval(interval)
+
+
+def test_lazy_threads(db, switch_often):
+    for _ in range(20):
+        lazy_db = mpd_pydb.Database.read_file("test/mpd.db.gz", lazy=True)
+        results = []
+        threads = [threading.Thread(
+            target=lambda: results.append(list(lazy_db.songs)))
+            for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [db.songs] * len(threads)
+        assert list(lazy_db.songs) == db.songs
+
+
+def test_lazy_tags_and_music_dir():
+    expected = mpd_pydb.Database.read_file("test/mpd.db.gz", tags=["Title"],
+                                           music_dir="/music")
+    db = mpd_pydb.Database.read_file("test/mpd.db.gz", tags=["Title"],
+                                     music_dir="/music", lazy=True)
+    assert list(db.songs) == expected.songs
+
+
+def test_lazy_directories():
+    with gzip.open("test/mpd.db.gz", "rb") as db_file:
+        text = db_file.read()
+    header, _, body = text.partition(b"info_end\n")
+    # Songs in the music root before, between and after directories
+    song = b"song_begin: %s.ogg\nTitle: %s\nsong_end\n"
+    text = (header + b"info_end\n" + song % (b"a", b"a") + body +
+            song % (b"b", b"b") + b"begin: c\n" + song % (b"d", b"d") +
+            b"end: c\n" + song % (b"e", b"e"))
+    expected = mpd_pydb.Database.read_file(io.BytesIO(text))
+    db = mpd_pydb.Database.read_file(io.BytesIO(text), lazy=True)
+    assert list(db.songs) == expected.songs
+    assert str(db.songs[0].path) == "a.ogg"
+    assert [str(song.path) for song in db.songs[-3:]] == ["b.ogg", "c/d.ogg",
+                                                          "e.ogg"]
+
+
+def test_lazy_add_song_and_indexes(db, lazy_db):
+    lazy_db.add_song(db.songs[0]._replace(Title="New"))
+    assert len(lazy_db.songs) == len(db.songs) + 1
+    assert lazy_db.find("Title", "New") == [lazy_db.songs[-1]]
+
+
+def test_lazy_to_dataframe(db, lazy_db):
+    pytest.importorskip("pandas")
+    assert lazy_db.to_dataframe().equals(db.to_dataframe())
+
+
+@pytest.mark.parametrize("kwargs", [{"compact": True}, {"columnar": True},
+                                    {"cache_dir": "cache"}, {"where": []},
+                                    {"workers": 2}])
+def test_lazy_conflicts(kwargs):
+    with pytest.raises(ValueError):
+        mpd_pydb.Database.read_file("test/mpd.db.gz", lazy=True, **kwargs)
+
+
+def test_lazy_refresh(lazy_db):
+    with pytest.raises(ValueError):
+        lazy_db.refresh()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+import mpd_pydb
+import pytest
+
+from mpd_pydb.parallel import _split
+from mpd_pydb.query import PathPrefix
+
+
+@pytest.fixture
+def db():
+    return mpd_pydb.Database.read_file("test/mpd.db.gz")
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"compact": True}, {"columnar": True},
+                                    {"tags": ["Title"]},
+                                    {"where": [PathPrefix("Anamanaguchi")]}])
+def test_parallel_matches_serial(kwargs):
+    serial = mpd_pydb.Database.read_file("test/mpd.db.gz", **kwargs)
+    parallel = mpd_pydb.Database.read_file("test/mpd.db.gz", workers=2,
+                                           **kwargs)
+    assert list(parallel.songs) == list(serial.songs)
+    assert parallel.supported_tags == serial.supported_tags
+    assert parallel.mpd_version == serial.mpd_version
+
+
+def test_split_at_top_level_directories():
+    text = (b"begin: a\nbegin: a/b\nsong_begin: x\nsong_end\nend: a/b\n"
+            b"end: a\nsong_begin: y\nsong_end\nbegin: c\nend: c\n")
+    chunks = _split(text, 0, 1)
+    assert [text[start:end] for start, end in chunks] == [
+        b"begin: a\nbegin: a/b\nsong_begin: x\nsong_end\nend: a/b\nend: a\n",
+        b"song_begin: y\nsong_end\nbegin: c\nend: c\n"]
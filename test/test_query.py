@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+import mpd_pydb
+import pytest
+
+from mpd_pydb.columnar import ColumnarSongs
+from mpd_pydb.query import PathPrefix, Range, TagEquals
+from pathlib import Path
+
+
+@pytest.fixture
+def db():
+    return mpd_pydb.Database.read_file("test/mpd.db.gz")
+
+
+QUERIES = [
+    [TagEquals("Artist", "_ensnare_")],
+    [TagEquals("Name", None)],
+    [Range("mtime", 1432207801, 1432207810)],
+    [Range("Time", maximum=100)],
+    [PathPrefix("Anamanaguchi")],
+    [PathPrefix(Path("Anamanaguchi") / "2013 - Meow")],
+    [PathPrefix("Anamanaguchi/Pop It.mp3")],
+    [PathPrefix("Anamanaguchi/2013")],
+    [PathPrefix("nothing")],
+    [PathPrefix("")],
+    [PathPrefix("_ensnare_"), Range("Time", minimum=200)],
+    [Range("Date", "2011", "2012"), TagEquals("mtime", 1432207800)],
+    [TagEquals("Artist", "nobody")],
+    [TagEquals("Title", "Intro"), TagEquals("Artist", "_ensnare_"),
+     PathPrefix("_ensnare_/2011 - Impeccable Micro")],
+]
+
+
+def _expected(db, query):
+    return [song for song in db.songs
+            if all(predicate.matches(song) for predicate in query)]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+@pytest.mark.parametrize("kwargs", [{}, {"compact": True}])
+def test_read_file_where(db, query, kwargs):
+    selected = mpd_pydb.Database.read_file("test/mpd.db.gz", where=query,
+                                           **kwargs)
+    assert selected.songs == _expected(db, query)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_read_file_where_columnar(db, query):
+    selected = mpd_pydb.Database.read_file("test/mpd.db.gz", where=query,
+                                           columnar=True)
+    assert list(selected.songs) == _expected(db, query)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_select(db, query):
+    assert db.select(*query) == _expected(db, query)
+    db.create_index("Artist")
+    assert db.select(*query) == _expected(db, query)
+
+
+@pytest.fixture(params=["columnar", "shared"])
+def columnar_db(request, tmpdir):
+    db = mpd_pydb.Database.read_file("test/mpd.db.gz", columnar=True)
+    if request.param == "shared":
+        filename = str(tmpdir.join("shared"))
+        db.to_shared(filename)
+        db = mpd_pydb.Database.from_shared(filename)
+    return db
+
+
+class _Custom(object):
+    """
+    A predicate the columns can't check.
+    """
+    def matches(self, song):
+        return song.Track == "1"
+
+
+@pytest.mark.parametrize("query", QUERIES + [
+    [_Custom()],
+    [_Custom(), Range("Time", maximum=100)],
+])
+def test_select_columnar(db, columnar_db, query):
+    assert columnar_db.select(*query) == _expected(db, query)
+
+
+def test_select_columnar_creates_matching_songs(db, columnar_db,
+                                                monkeypatch):
+    created = []
+    song = ColumnarSongs._song
+
+    def counting_song(self, index):
+        created.append(index)
+        return song(self, index)
+
+    monkeypatch.setattr(ColumnarSongs, "_song", counting_song)
+    selected = columnar_db.select(TagEquals("Title", "Intro"),
+                                  Range("Time", maximum=100))
+    assert selected == _expected(db, [TagEquals("Title", "Intro")])
+    assert len(created) == 1
+
+
+def test_path_prefix_matches_whole_components(db):
+    assert db.select(PathPrefix("Anamanaguchi/2013")) == []
+    assert len(db.select(PathPrefix("Anamanaguchi"))) == 2
+
+
+def test_directories_are_skipped(db, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("A skipped song was parsed")
+
+    monkeypatch.setattr(mpd_pydb.db, "_filename", fail)
+    selected = mpd_pydb.Database.read_file("test/mpd.db.gz", compact=True,
+                                           where=[PathPrefix("nothing")])
+    assert selected.songs == []
+
+
+def test_unsupported_tag():
+    with pytest.raises(ValueError):
+        mpd_pydb.Database.read_file("test/mpd.db.gz",
+                                    where=[TagEquals("NotATag", "foo")])
+    with pytest.raises(ValueError):
+        TagEquals("path", "foo")
+
+
+def test_where_is_not_refreshable():
+    selected = mpd_pydb.Database.read_file("test/mpd.db.gz",
+                                           where=[PathPrefix("nothing")])
+    with pytest.raises(ValueError):
+        selected.refresh()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+import mpd_pydb
+import pytest
+
+from mpd_pydb.search import _fold
+from pathlib import Path
+
+
+@pytest.fixture(params=[{}, {"compact": True}, {"columnar": True}])
+def db(request):
+    return mpd_pydb.Database.read_file("test/mpd.db.gz", **request.param)
+
+
+def _substring(db, text, tags=("Title", "Artist", "Album", "Composer")):
+    text = text.lower()
+    return [song for song in db.songs
+            if any(getattr(song, tag) is not None and
+                   text in getattr(song, tag).lower() for tag in tags)]
+
+
+def test_default_tags(db):
+    assert db.create_text_index().tags == ("Title", "Artist", "Album",
+                                           "Composer")
+    assert db.create_text_index() is db.create_text_index()
+
+
+def test_unsupported_tags(db):
+    with pytest.raises(ValueError):
+        db.create_text_index(tags=["NotATag"])
+    index = db.create_text_index(tags=["Title"])
+    with pytest.raises(ValueError):
+        index.prefix("a", tags=["Artist"])
+
+
+def test_complete(db):
+    index = db.create_text_index()
+    assert index.complete("anama") == ["Anamanaguchi"]
+    assert index.complete("ANAMA") == ["Anamanaguchi"]
+    assert index.complete("nothing") == []
+    values = index.complete("", limit=None)
+    assert values == sorted(values, key=_fold)
+    assert len(index.complete("", limit=3)) == 3
+    assert index.complete("m", tags=["Album"]) == ["Meow"]
+
+
+def test_prefix(db):
+    index = db.create_text_index()
+    assert index.prefix("pop") == [db.songs[-1]]
+    assert index.prefix("anamanaguchi") == db.songs[-2:]
+    assert index.prefix("anamanaguchi", limit=1) == db.songs[-2:-1]
+    assert index.prefix("anamanaguchi", tags=["Title"]) == []
+
+
+@pytest.mark.parametrize("text", ["it", "Sound", "ic", "e", "NAGU", "xyz"])
+def test_substring(db, text):
+    index = db.create_text_index()
+    assert sorted(index.substring(text), key=list(db.songs).index) == \
+        _substring(db, text)
+
+
+def test_substring_tags(db):
+    index = db.create_text_index()
+    assert index.substring("micro", tags=["Album"]) == \
+        _substring(db, "micro", ["Album"])
+    assert index.substring("micro", tags=["Title"]) == []
+
+
+def test_fuzzy(db):
+    index = db.create_text_index()
+    assert index.fuzzy("anamanaguxi") == db.songs[-2:]
+    assert index.fuzzy("something else entirely") == []
+    assert index.fuzzy("po") == index.prefix("po")
+
+
+def test_background(db):
+    index = db.create_text_index(background=True)
+    assert index.prefix("pop") == [db.songs[-1]]
+    assert index.wait(0)
+
+
+def test_add_song_updates_text_index():
+    db = mpd_pydb.Database.read_file("test/mpd.db.gz")
+    index = db.create_text_index()
+    song = db.songs[0]._replace(Title="Brand New", path=Path("new.flac"))
+    db.add_song(song)
+    assert index.prefix("brand") == [song]
+    assert index.complete("br") == ["Brand New"]
+
+
+def test_update_from_rebuilds_text_index():
+    db = mpd_pydb.Database.read_file("test/mpd.db.gz")
+    db.songs.insert(0, db.songs.pop())
+    index = db.create_text_index()
+    db.update_from("test/mpd.db.gz")
+    assert db.create_text_index() is not index
+    assert db.create_text_index().substring("it") == \
+        [song for song in db.songs if "it" in song.Title.lower()]
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+import mpd_pydb
+import os
+import pickle
+import pytest
+import stat
+
+from multiprocessing import Pool
+from mpd_pydb.shared import SharedSongs
+
+
+@pytest.fixture
+def db():
+    return mpd_pydb.Database.read_file("test/mpd.db.gz")
+
+
+@pytest.fixture(params=[{}, {"compact": True}, {"columnar": True}])
+def shared_file(request, tmpdir):
+    filename = str(tmpdir.join("shared"))
+    mpd_pydb.Database.read_file("test/mpd.db.gz",
+                                **request.param).to_shared(filename)
+    return filename
+
+
+def _artists(songs):
+    return [song.Artist for song in songs]
+
+
+def test_songs_match_default(shared_file, db):
+    shared = mpd_pydb.Database.from_shared(shared_file)
+    assert isinstance(shared.songs, SharedSongs)
+    assert shared.format_version == db.format_version
+    assert shared.mpd_version == db.mpd_version
+    assert shared.supported_tags == db.supported_tags
+    assert len(shared.songs) == len(db.songs)
+    assert list(shared.songs) == db.songs
+    assert shared.songs[-1] == db.songs[-1]
+    assert shared.songs[2:4] == db.songs[2:4]
+
+
+def test_find(shared_file, db):
+    shared = mpd_pydb.Database.from_shared(shared_file)
+    assert shared.find("AlbumArtist", "_ensnare_") == \
+        db.find("AlbumArtist", "_ensnare_")
+    assert shared.songs.columns["AlbumArtist"].find("_ensnare_") == \
+        list(range(10))
+    assert shared.song_at(db.songs[3].path) == db.songs[3]
+
+
+def test_tags(shared_file, db):
+    shared = mpd_pydb.Database.from_shared(shared_file, tags=["Artist"])
+    assert shared.supported_tags == ["path", "Artist"]
+    assert [song.Artist for song in shared.songs] == _artists(db.songs)
+    with pytest.raises(ValueError):
+        mpd_pydb.Database.from_shared(shared_file, tags=["Foo"])
+
+
+def test_to_shared_tags(tmpdir, db):
+    filename = str(tmpdir.join("shared"))
+    db.to_shared(filename, tags=["Title"])
+    assert mpd_pydb.Database.from_shared(filename).supported_tags == \
+        ["path", "Title"]
+
+
+def test_music_dir(shared_file):
+    shared = mpd_pydb.Database.from_shared(shared_file, music_dir="/music")
+    song = shared.songs[0]
+    assert song.__fspath__() == "/music/" + str(song.path)
+
+
+def test_read_only(shared_file, db):
+    shared = mpd_pydb.Database.from_shared(shared_file)
+    with pytest.raises(TypeError):
+        shared.add_song(db.songs[0])
+
+
+def test_to_dataframe(shared_file, db):
+    pd = pytest.importorskip("pandas")
+    shared = mpd_pydb.Database.from_shared(shared_file)
+    columnar_db = mpd_pydb.Database.read_file("test/mpd.db.gz", columnar=True)
+    pd.testing.assert_frame_equal(shared.to_dataframe(), db.to_dataframe())
+    pd.testing.assert_frame_equal(shared.to_dataframe(compact=True),
+                                  columnar_db.to_dataframe(compact=True))
+
+
+def test_pickle_only_stores_the_filename(shared_file, db):
+    songs = mpd_pydb.Database.from_shared(shared_file).songs
+    data = pickle.dumps(songs)
+    assert len(data) < 1000
+    assert list(pickle.loads(data)) == db.songs
+
+
+def test_workers(shared_file, db):
+    songs = mpd_pydb.Database.from_shared(shared_file).songs
+    pool = Pool(2)
+    try:
+        assert pool.map(_artists, [songs, songs]) == [_artists(db.songs)] * 2
+    finally:
+        pool.close()
+        pool.join()
+
+
+def test_to_shared_replaces_file(shared_file, db):
+    shared = mpd_pydb.Database.from_shared(shared_file)
+    db.to_shared(shared_file, tags=["Title"])
+    assert list(shared.songs) == db.songs
+    assert mpd_pydb.Database.from_shared(shared_file).supported_tags == \
+        ["path", "Title"]
+
+
+def test_permissions(tmpdir, db):
+    filename = str(tmpdir.join("shared"))
+    umask = os.umask(0o022)
+    try:
+        db.to_shared(filename)
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE(os.stat(filename).st_mode) == 0o644
+    os.chmod(filename, 0o640)
+    db.to_shared(filename)
+    assert stat.S_IMODE(os.stat(filename).st_mode) == 0o640
+
+
+def test_empty_database(tmpdir, db):
+    filename = str(tmpdir.join("shared"))
+    empty = mpd_pydb.Database(db.format_version, db.mpd_version,
+                              db.supported_tags)
+    empty.to_shared(filename)
+    shared = mpd_pydb.Database.from_shared(filename)
+    assert isinstance(shared.songs, SharedSongs)
+    assert len(shared.songs) == 0
+    assert shared.select() == []
+
+
+def test_not_a_shared_database(tmpdir):
+    filename = tmpdir.join("shared")
+    filename.write(b"info_begin\n", mode="wb")
+    with pytest.raises(ValueError):
+        mpd_pydb.Database.from_shared(str(filename))
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+import gzip
+import io
+import mpd_pydb
+import pytest
+
+from mpd_pydb.stats import LoadStats
+
+
+@pytest.fixture(scope="module")
+def text():
+    with gzip.open("test/mpd.db.gz", "rb") as db_file:
+        return db_file.read()
+
+
+def check_sizes(stats, text):
+    assert stats.bytes_read == len(text)
+    assert stats.lines == text.count(b"\n")
+    assert stats.directories == text.count(b"\nbegin: ")
+    assert stats.songs == 12
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"compact": True}, {"columnar": True},
+                                    {"workers": 2}])
+def test_read_file_stats(text, kwargs):
+    stats = LoadStats()
+    mpd_pydb.Database.read_file("test/mpd.db.gz", **kwargs)
+    db = mpd_pydb.Database.read_file("test/mpd.db.gz", stats=stats, **kwargs)
+    check_sizes(stats, text)
+    assert list(stats.phases)[:2] == ["decompress", "parse"]
+    assert all(seconds >= 0 for seconds in stats.phases.values())
+    assert stats.peak_memory is None
+    assert len(db.songs) == 12
+
+
+def test_read_file_stats_add_up(text):
+    stats = LoadStats()
+    for _ in range(2):
+        mpd_pydb.Database.read_file("test/mpd.db.gz", stats=stats)
+    assert stats.songs == 24
+    assert stats.lines == 2 * text.count(b"\n")
+
+
+def test_directories_across_blocks():
+    text = b"".join(b"begin: %d\nend: %d\n" % (i, i) for i in range(5000))
+    stats = LoadStats()
+    stream = stats.wrap(io.BytesIO(b"x\n" + text))
+    buffer = bytearray(7)
+    while stream.readinto(buffer):
+        pass
+    assert stats.directories == 5000
+
+
+def test_cached_stats(tmpdir, text):
+    stats = LoadStats()
+    mpd_pydb.Database.read_file("test/mpd.db.gz", cache_dir=str(tmpdir),
+                                stats=stats)
+    check_sizes(stats, text)
+    assert set(stats.phases) >= {"load_cache", "parse", "store_cache",
+                                 "convert"}
+
+    stats = LoadStats()
+    mpd_pydb.Database.read_file("test/mpd.db.gz", cache_dir=str(tmpdir),
+                                indexes=["Artist"], stats=stats)
+    assert stats.lines == 0
+    assert stats.songs == 12
+    assert list(stats.phases) == ["load_cache", "convert", "index"]
+
+
+def test_iter_songs_stats(text):
+    stats = LoadStats()
+    with mpd_pydb.Database.iter_songs("test/mpd.db.gz", stats=stats) as songs:
+        list(songs)
+    assert stats.bytes_read == len(text)
+    assert stats.songs == 0
+
+
+def test_trace_memory():
+    # tracemalloc was added in Python 3.4
+    pytest.importorskip("tracemalloc")
+    stats = LoadStats(trace_memory=True)
+    mpd_pydb.Database.read_file("test/mpd.db.gz", stats=stats)
+    assert stats.peak_memory > 0
+    assert stats.as_dict()["peak_memory"] == stats.peak_memory
+
+
+def test_to_dataframe_stats():
+    pytest.importorskip("pandas")
+    stats = LoadStats()
+    db = mpd_pydb.Database.read_file("test/mpd.db.gz")
+    db.to_dataframe(compact=True, stats=stats)
+    assert list(stats.phases) == ["dataframe", "split_numbers", "compact"]
+
+
+def test_as_dict():
+    stats = LoadStats()
+    mpd_pydb.Database.read_file("test/mpd.db.gz", stats=stats)
+    values = stats.as_dict()
+    assert list(values)[:4] == ["bytes_read", "lines", "directories", "songs"]
+    assert values["parse_seconds"] == stats.phases["parse"]
+    assert "peak_memory" not in values
+    assert repr(stats).startswith("LoadStats(bytes_read=")
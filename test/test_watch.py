@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+import gzip
+import mpd_pydb
+import os
+import pytest
+import shutil
+import threading
+import time
+
+from mpd_pydb.watch import DatabaseWatcher
+
+# How long the tests wait for a database to be read again
+TIMEOUT = 10
+
+
+def _remove_last_song(source, destination):
+    with gzip.open(source, "rb") as db_file:
+        text = db_file.read()
+    start = text.rindex(b"song_begin:")
+    end = text.index(b"song_end\n", start) + len(b"song_end\n")
+    with gzip.open(destination, "wb") as db_file:
+        db_file.write(text[:start] + text[end:])
+
+
+@pytest.fixture
+def filename(tmpdir):
+    filename = str(tmpdir.join("database"))
+    shutil.copy("test/mpd.db.gz", filename)
+    return filename
+
+
+@pytest.fixture(params=[True, False], ids=["inotify", "polling"])
+def inotify(request):
+    if request.param and not os.path.exists("/proc/sys/fs/inotify"):
+        pytest.skip("inotify is not available")
+    return request.param
+
+
+class Reloads(object):
+    def __init__(self):
+        self.databases = []
+        self._event = threading.Event()
+
+    def __call__(self, db):
+        self.databases.append(db)
+        self._event.set()
+
+    def wait(self):
+        assert self._event.wait(TIMEOUT)
+        self._event.clear()
+
+
+def test_reads_database(filename):
+    with mpd_pydb.Database.watch(filename) as watcher:
+        assert len(watcher.database.songs) == \
+            len(mpd_pydb.Database.read_file(filename).songs)
+
+
+def test_swaps_database(filename, inotify):
+    reloads = Reloads()
+    with mpd_pydb.Database.watch(filename, debounce=0.05, poll_interval=0.01,
+                                 inotify=inotify, callback=reloads,
+                                 columnar=True) as watcher:
+        reloads.wait()
+        old = watcher.database
+        songs = len(old.songs)
+        _remove_last_song(filename, filename + ".new")
+        os.rename(filename + ".new", filename)
+        reloads.wait()
+        assert watcher.database is reloads.databases[-1]
+        assert len(watcher.database.songs) == songs - 1
+        assert len(old.songs) == songs
+
+
+def test_debounces_writes(filename, inotify):
+    reloads = Reloads()
+    with mpd_pydb.Database.watch(filename, debounce=0.3, poll_interval=0.01,
+                                 inotify=inotify, callback=reloads):
+        reloads.wait()
+        _remove_last_song(filename, filename)
+        with open(filename, "ab") as db_file:
+            db_file.write(b"")
+        os.utime(filename, None)
+        reloads.wait()
+    assert len(reloads.databases) == 2
+
+
+def test_keeps_database_on_error(filename, inotify):
+    reloads = Reloads()
+    watcher = DatabaseWatcher(mpd_pydb.Database, filename, debounce=0.05,
+                              poll_interval=0.01, inotify=inotify,
+                              callback=reloads)
+    with watcher:
+        reloads.wait()
+        old = watcher.database
+        with open(filename, "wb") as db_file:
+            db_file.write(b"info_begin\nformat: 1\ninfo_end\n")
+        deadline = time.time() + TIMEOUT
+        while watcher.error is None and time.time() < deadline:
+            time.sleep(0.01)
+        assert watcher.error is not None
+        assert watcher.database is old
+        _remove_last_song("test/mpd.db.gz", filename)
+        reloads.wait()
+        assert watcher.error is None
+        assert len(watcher.database.songs) == len(old.songs) - 1
+
+
+def test_start_fails(tmpdir):
+    watcher = DatabaseWatcher(mpd_pydb.Database, str(tmpdir.join("missing")))
+    with pytest.raises(IOError):
+        watcher.start()
+    assert watcher.database is None
+
+
+def test_start_twice(filename):
+    with mpd_pydb.Database.watch(filename) as watcher:
+        with pytest.raises(RuntimeError):
+            watcher.start()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# coding: utf-8
+# License: MIT, see LICENSE for details
+import gzip
+import mpd_pydb
+import os
+import pytest
+import stat
+
+from io import BytesIO
+from mpd_pydb import db as mpd_db
+
+
+@pytest.fixture
+def db():
+    return mpd_pydb.Database.read_file("test/mpd.db.gz")
+
+
+def _assert_same(db, other):
+    assert other.format_version == db.format_version
+    assert other.mpd_version == db.mpd_version
+    assert other.supported_tags == db.supported_tags
+    assert list(other.songs) == list(db.songs)
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"compact": True}, {"columnar": True}])
+def test_round_trip(tmpdir, db, kwargs):
+    filename = str(tmpdir.join("database.gz"))
+    mpd_pydb.Database.read_file("test/mpd.db.gz",
+                                **kwargs).write_file(filename)
+    _assert_same(db, mpd_pydb.Database.read_file(filename))
+
+
+@pytest.mark.parametrize("name, compression, magic",
+                         [("database.gz", None, b"\x1f\x8b"),
+                          ("database", "gzip", b"\x1f\x8b"),
+                          ("database", None, b"info_begin"),
+                          ("database.gz", "plain", b"info_begin")])
+def test_compression(tmpdir, db, name, compression, magic):
+    filename = str(tmpdir.join(name))
+    db.write_file(filename, compression=compression)
+    with open(filename, "rb") as db_file:
+        assert db_file.read(len(magic)) == magic
+    _assert_same(db, mpd_pydb.Database.read_file(filename))
+
+
+def test_zstd(tmpdir, db):
+    pytest.importorskip("zstandard")
+    filename = str(tmpdir.join("database.zst"))
+    db.write_file(filename)
+    with open(filename, "rb") as db_file:
+        assert db_file.read(4) == b"\x28\xb5\x2f\xfd"
+    _assert_same(db, mpd_pydb.Database.read_file(filename))
+
+
+def test_unknown_compression(tmpdir, db):
+    with pytest.raises(ValueError):
+        db.write_file(str(tmpdir.join("database")), compression="bzip2")
+    assert tmpdir.listdir() == []
+
+
+def test_file_object(db):
+    db_file = BytesIO()
+    db.write_file(db_file)
+    db_file.seek(0)
+    _assert_same(db, mpd_pydb.Database.read_file(db_file))
+
+
+def test_file_object_compression(db):
+    db_file = BytesIO()
+    db.write_file(db_file, compression="gzip")
+    assert not db_file.closed
+    assert db_file.getvalue().startswith(b"\x1f\x8b")
+    with gzip.GzipFile(fileobj=BytesIO(db_file.getvalue())) as uncompressed:
+        _assert_same(db, mpd_pydb.Database.read_file(
+            BytesIO(uncompressed.read())))
+    with pytest.raises(ValueError):
+        db.write_file(BytesIO(), compression="bzip2")
+
+
+def test_permissions(tmpdir, db):
+    filename = str(tmpdir.join("database.gz"))
+    umask = os.umask(0o022)
+    try:
+        db.write_file(filename)
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE(os.stat(filename).st_mode) == 0o644
+    os.chmod(filename, 0o640)
+    db.write_file(filename)
+    assert stat.S_IMODE(os.stat(filename).st_mode) == 0o640
+
+
+def test_same_lines_as_mpd(db):
+    """
+    Apart from the order of the tags of each song and the mtimes of
+    directories, the file is the one MPD wrote.
+    """
+    db_file = BytesIO()
+    db.write_file(db_file)
+    with gzip.open("test/mpd.db.gz", "rb") as mpd_file:
+        expected = mpd_file.read().splitlines()
+    lines = db_file.getvalue().splitlines()
+    assert len(lines) == len(expected)
+    assert sorted(line for line in lines if not line.startswith(b"mtime")) \
+        == sorted(line for line in expected if not line.startswith(b"mtime"))
+
+
+def test_nested_directories_and_root_songs():
+    tags = ["Time", "mtime", "path", "Title"]
+    song_type = mpd_db._song_type(tags)
+    db = mpd_pydb.Database(mpd_db._SUPPORTED_FORMAT_VERSION, "0.21", tags)
+    for path, time, mtime in [("a/b/c/1.flac", 0.1, 3),
+                              ("root.flac", 1.0 / 3, 1),
+                              ("a/2.flac", None, 2),
+                              ("a/b/3.flac", 5.0, None)]:
+        db.add_song(song_type(time, mtime, mpd_db.Path(path),
+                              u"Ünïcode: yes", None))
+    db_file = BytesIO()
+    db.write_file(db_file)
+    text = db_file.getvalue().decode("utf-8")
+    assert "directory: a\nmtime: 3\nbegin: a\n" \
+           "directory: b\nmtime: 3\nbegin: a/b\n" \
+           "directory: c\nmtime: 3\nbegin: a/b/c\n" in text
+    assert text.index("end: a\n") < text.index("song_begin: root.flac")
+    assert "Time: 0.100000\n" in text
+    assert "Time: {0!r}\n".format(1.0 / 3) in text
+    db_file.seek(0)
+    songs = mpd_pydb.Database.read_file(db_file).songs
+    assert set(songs) == set(db.songs)
+    assert [str(song.path) for song in songs] == \
+        ["a/b/c/1.flac", "a/b/3.flac", "a/2.flac", "root.flac"]